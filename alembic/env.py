@@ -25,6 +25,8 @@ from api.models.debt import Debt
 from api.models.limit import Limit
 from api.models.click_transaction import ClickTransaction
 from api.models.payme_transaction import PaymeTransaction
+from api.models.user_daily_total import UserDailyTotal
+from api.models.exchange_rate import ExchangeRate
 
 target_metadata = Base.metadata
 
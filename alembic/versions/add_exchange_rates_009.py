@@ -0,0 +1,34 @@
+"""add_exchange_rates_009
+
+Revision ID: add_exchange_rates_009
+Revises: add_user_daily_totals_008
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_exchange_rates_009'
+down_revision: Union[str, None] = 'add_user_daily_totals_008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Historical CBU rates (filled by scripts/import_exchange_rates.py and the rates cache)
+    op.create_table('exchange_rates',
+        sa.Column('currency', sa.String(length=3), nullable=False),
+        sa.Column('rate_date', sa.Date(), nullable=False),
+        sa.Column('nominal', sa.Integer(), nullable=False),
+        sa.Column('rate', sa.Numeric(precision=18, scale=4), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('currency', 'rate_date', name='pk_exchange_rates'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('exchange_rates')
@@ -0,0 +1,56 @@
+"""add_user_daily_totals_008
+
+Revision ID: add_user_daily_totals_008
+Revises: add_text_usage_007
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_user_daily_totals_008'
+down_revision: Union[str, None] = 'add_text_usage_007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 1. Create rollup table (NULLS NOT DISTINCT needs Postgres 15+)
+    op.create_table('user_daily_totals',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('category_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('type', sa.String(length=20), nullable=False),
+        sa.Column('total', sa.Numeric(precision=18, scale=2), nullable=False),
+        sa.Column('tx_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint(
+            'user_id', 'day', 'category_id', 'type',
+            name='uq_user_daily_totals_key',
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+
+    # 2. Backfill from existing transactions
+    op.execute("""
+        INSERT INTO user_daily_totals (user_id, day, category_id, type, total, tx_count)
+        SELECT user_id,
+               CAST(timezone('UTC', transaction_date) AS DATE),
+               category_id,
+               type,
+               SUM(amount),
+               COUNT(id)
+        FROM transactions
+        GROUP BY 1, 2, 3, 4
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('user_daily_totals')
@@ -15,6 +15,9 @@ class Settings(BaseSettings):
     
     # OpenAI
     openai_api_key: str
+    openai_timeout_seconds: float = 30.0
+    openai_media_timeout_seconds: float = 90.0  # Whisper and vision calls
+    openai_max_concurrency: int = 20  # Pooled OpenAI connections per worker (LLM_MAX_CONCURRENCY caps calls)
     
     # Telegram
     telegram_bot_token: str
@@ -29,6 +32,22 @@ class Settings(BaseSettings):
     payme_key: str = "test_key"
     payme_test_mode: bool = False
 
+    # CBU exchange rates cache
+    cbu_rates_url: str = "https://cbu.uz/ru/arkhiv-kursov-valyut/json/"
+    cbu_refresh_interval_seconds: int = 3600
+    cbu_snapshot_path: str = "data/cbu_rates.json"
+
+    # Limit spend counters (in-process, per worker)
+    spend_counter_ttl_seconds: int = 300
+    spend_counter_max_entries: int = 10000
+    spend_reconcile_interval_seconds: int = 600
+
+    # LLM parse-result cache
+    parse_cache_backend: str = "memory"  # memory | disk | redis
+    parse_cache_ttl_seconds: int = 86400
+    parse_cache_max_entries: int = 10000
+    parse_cache_path: str = "data/parse_cache.sqlite3"
+    parse_cache_redis_url: str = "redis://localhost:6379/0"
     
     # API
     api_host: str = "0.0.0.0"
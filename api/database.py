@@ -50,6 +50,16 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+def get_sessionmaker() -> async_sessionmaker:
+    """
+    Dependency for endpoints that open their own sessions.
+
+    Streaming responses outlive get_db() (it is closed before the body is
+    sent), so they take the factory instead and manage the session themselves.
+    """
+    return AsyncSessionLocal
+
+
 async def init_db():
     """Initialize database tables (create all tables)."""
     async with engine.begin() as conn:
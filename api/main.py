@@ -28,15 +28,23 @@ async def lifespan(app: FastAPI):
     
     # Start Scheduler
     import asyncio
-    from .scheduler import start_scheduler
+    from .scheduler import start_scheduler, start_spend_reconciler
     asyncio.create_task(start_scheduler())
+    asyncio.create_task(start_spend_reconciler())
     logging.info("⏰ Scheduler started")
 
+    from .services.currency import rate_cache
+    await rate_cache.start()
+    logging.info("💱 Currency rates cache started")
     
     yield
     
     # Shutdown
     logging.info("👋 Shutting down...")
+    await rate_cache.stop()
+
+    from .services.ai_parser import close_ai_parser
+    await close_ai_parser()
 
 
 # Create FastAPI app
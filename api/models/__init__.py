@@ -6,5 +6,7 @@ from .debt import Debt
 from .limit import Limit
 from .click_transaction import ClickTransaction
 from .payme_transaction import PaymeTransaction
+from .user_daily_total import UserDailyTotal
+from .exchange_rate import ExchangeRate
 
-__all__ = ["User", "Category", "Transaction", "Debt", "Limit", "ClickTransaction", "PaymeTransaction"]
+__all__ = ["User", "Category", "Transaction", "Debt", "Limit", "ClickTransaction", "PaymeTransaction", "UserDailyTotal", "ExchangeRate"]
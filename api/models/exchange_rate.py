@@ -0,0 +1,27 @@
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import String, Numeric, Date, DateTime, Integer, PrimaryKeyConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..database import Base
+
+
+class ExchangeRate(Base):
+    """Historical CBU exchange rate: UZS per `nominal` units of `currency` on `rate_date`."""
+    
+    __tablename__ = "exchange_rates"
+    
+    currency: Mapped[str] = mapped_column(String(3), nullable=False)  # ISO 4217, upper case
+    rate_date: Mapped[date] = mapped_column(Date, nullable=False)
+    nominal: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    rate: Mapped[Decimal] = mapped_column(Numeric(18, 4), nullable=False)
+    
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    # (currency, rate_date) order serves "latest rate on or before a day" lookups
+    __table_args__ = (
+        PrimaryKeyConstraint("currency", "rate_date", name="pk_exchange_rates"),
+    )
+    
+    def __repr__(self) -> str:
+        return f"<ExchangeRate({self.currency} {self.rate_date}: {self.rate}/{self.nominal})>"
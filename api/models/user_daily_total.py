@@ -0,0 +1,41 @@
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy import String, Numeric, Date, Integer, BigInteger, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import UUID
+
+from ..database import Base
+
+
+class UserDailyTotal(Base):
+    """Per-user daily rollup of transactions (one row per day/category/type)."""
+    
+    __tablename__ = "user_daily_totals"
+    
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    user_id: Mapped[UUID] = mapped_column(
+        UUID(as_uuid=True), 
+        ForeignKey("users.id", ondelete="CASCADE"), 
+        nullable=False
+    )
+    day: Mapped[date] = mapped_column(Date, nullable=False)  # UTC day of transaction_date
+    # No FK: a deleted category must not cascade into (or collide within) the rollup
+    category_id: Mapped[Optional[UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+    type: Mapped[str] = mapped_column(String(20), nullable=False)  # income, expense
+    
+    # Aggregates
+    total: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False, default=0)
+    tx_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    
+    # NULLS NOT DISTINCT so uncategorized rows upsert like any other (Postgres 15+)
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "day", "category_id", "type",
+            name="uq_user_daily_totals_key",
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+    
+    def __repr__(self) -> str:
+        return f"<UserDailyTotal(user_id={self.user_id}, day={self.day}, type={self.type}, total={self.total})>"
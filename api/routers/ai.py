@@ -9,7 +9,9 @@ from ..models.category import Category
 from ..models.transaction import Transaction
 from ..schemas.ai import AIParseRequest, AIParseResponse, CategorySuggestRequest, CategorySuggestResponse, CategorySuggestion
 from ..auth.jwt import get_current_user
-from ..services.ai_parser import AITransactionParser
+from ..services.ai_parser import AITransactionParser, get_ai_parser
+from ..services.rollup import apply_transaction_delta
+from ..services.spend_tracker import spend_tracker
 from ..config import get_settings
 
 settings = get_settings()
@@ -24,6 +26,7 @@ async def parse_transaction(
     auto_create: bool = Form(False),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    parser: AITransactionParser = Depends(get_ai_parser),
 ):
     """
     Parse transaction from text, voice, or image.
@@ -36,23 +39,24 @@ async def parse_transaction(
     Returns parsed transaction data with AI confidence score.
     """
     
-    parser = AITransactionParser(api_key=settings.openai_api_key)
     parsed_data = None
     
     # Priority: voice > image > text
     if voice:
         # Transcribe voice first
         audio_data = await voice.read()
-        transcribed_text = parser.transcribe_voice(audio_data, voice.filename or "audio.ogg")
+        transcribed_text = await parser.transcribe_voice(
+            audio_data, voice.filename or "audio.ogg", tier=current_user.subscription_tier
+        )
         # Then parse the transcribed text
-        parsed_data = parser.parse_text(transcribed_text)
+        parsed_data = await parser.parse_text(transcribed_text, tier=current_user.subscription_tier)
     elif image:
         # Parse receipt image
         image_data = await image.read()
-        parsed_data = parser.parse_receipt_image(image_data)
+        parsed_data = await parser.parse_receipt_image(image_data, tier=current_user.subscription_tier)
     elif text:
         # Parse text message
-        parsed_data = parser.parse_text(text)
+        parsed_data = await parser.parse_text(text, tier=current_user.subscription_tier)
     else:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -112,7 +116,13 @@ async def parse_transaction(
             ai_confidence=parsed_data["confidence"],
         )
         db.add(new_transaction)
-        await db.commit()
+        await db.flush()
+        await apply_transaction_delta(db, new_transaction.id)
+        with spend_tracker.writing(current_user.id):
+            await db.commit()
+            if new_transaction.type == "expense" and category_id:
+                await db.refresh(new_transaction)  # transaction_date is set server-side
+                spend_tracker.track(new_transaction)
         auto_created = True
     
     return AIParseResponse(
@@ -133,6 +143,7 @@ async def suggest_category(
     request: CategorySuggestRequest,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    parser: AITransactionParser = Depends(get_ai_parser),
 ):
     """
     Get category suggestions for a transaction description.
@@ -140,11 +151,9 @@ async def suggest_category(
     Uses AI to suggest the most appropriate category.
     """
     
-    parser = AITransactionParser(api_key=settings.openai_api_key)
-    
     # Create a fake transaction text for parsing
     fake_text = f"{request.description} 100 uzs"
-    parsed = parser.parse_text(fake_text)
+    parsed = await parser.parse_text(fake_text, tier=current_user.subscription_tier)
     
     suggestions = []
     
@@ -173,3 +182,23 @@ async def suggest_category(
         suggestions=suggestions,
         best_match=best_match
     )
+
+
+@router.get("/parse-cache/stats")
+async def parse_cache_stats(current_user: User = Depends(get_current_user)):
+    """
+    Parse-result cache metrics for this worker: hit ratio, entries and the
+    LLM latency (ms) and tokens saved by hits.
+    """
+    from ..services.parse_cache import parse_cache
+    return parse_cache.metrics()
+
+
+@router.get("/scheduler/stats")
+async def llm_scheduler_stats(current_user: User = Depends(get_current_user)):
+    """
+    OpenAI call scheduler metrics for this worker, per model: queue depth,
+    in-flight calls, throttling, coalesced duplicates and total wait time.
+    """
+    from shared.llm_scheduler import llm_scheduler
+    return llm_scheduler.metrics()
@@ -1,25 +1,26 @@
 from datetime import datetime, timedelta
-from decimal import Decimal
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, case
 
 from ..database import get_db
 from ..models.user import User
-from ..models.transaction import Transaction
-from ..models.category import Category
 from ..schemas.analytics import (
     BalanceResponse,
     CategoryBreakdownResponse,
-    CategoryBreakdownItem,
     TimeSeriesResponse,
-    TimeSeriesDataPoint,
     AnalyticsSummaryResponse,
-    TrendMetric
 )
 from ..auth.jwt import get_current_user
+from ..services.analytics import (
+    build_balance_response,
+    build_category_breakdown,
+    category_breakdown_query,
+    fetch_dashboard_summary,
+    fetch_trend_series,
+    period_totals_query,
+)
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
@@ -56,74 +57,10 @@ async def get_balance(
         else:  # all
             start_date = datetime(2020, 1, 1)
     
-    # Get income and expense totals for current period
-    result = await db.execute(
-        select(
-            func.sum(case((Transaction.type == 'income', Transaction.amount), else_=0)).label('income'),
-            func.sum(case((Transaction.type == 'expense', Transaction.amount), else_=0)).label('expense')
-        ).where(
-            and_(
-                Transaction.user_id == current_user.id,
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date
-            )
-        )
-    )
-    row = result.one()
-    
-    total_income = Decimal(row.income or 0)
-    total_expense = Decimal(row.expense or 0)
-    balance = total_income - total_expense
-    
-    # Calculate previous period for trend metrics
-    period_duration = end_date - start_date
-    prev_start_date = start_date - period_duration
-    prev_end_date = start_date
-    
-    # Get previous period totals
-    prev_result = await db.execute(
-        select(
-            func.sum(case((Transaction.type == 'income', Transaction.amount), else_=0)).label('income'),
-            func.sum(case((Transaction.type == 'expense', Transaction.amount), else_=0)).label('expense')
-        ).where(
-            and_(
-                Transaction.user_id == current_user.id,
-                Transaction.transaction_date >= prev_start_date,
-                Transaction.transaction_date < prev_end_date
-            )
-        )
-    )
-    prev_row = prev_result.one()
-    
-    prev_income = Decimal(prev_row.income or 0)
-    prev_expense = Decimal(prev_row.expense or 0)
-    prev_balance = prev_income - prev_expense
+    # Current and previous period totals in a single scan
+    result = await db.execute(period_totals_query(current_user.id, start_date, end_date))
     
-    # Calculate percentage changes
-    income_change = None
-    if prev_income > 0:
-        income_change = float((total_income - prev_income) / prev_income * 100)
-    
-    expense_change = None
-    if prev_expense > 0:
-        expense_change = float((total_expense - prev_expense) / prev_expense * 100)
-    
-    balance_change = None
-    if prev_balance != 0:
-        balance_change = float((balance - prev_balance) / abs(prev_balance) * 100)
-    
-    period_label = f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
-    
-    return BalanceResponse(
-        balance=balance,
-        total_income=total_income,
-        total_expense=total_expense,
-        currency=current_user.default_currency,
-        period_label=period_label,
-        income_change=income_change,
-        expense_change=expense_change,
-        balance_change=balance_change
-    )
+    return build_balance_response(result.one(), current_user.default_currency, start_date, end_date)
 
 
 @router.get("/categories", response_model=CategoryBreakdownResponse)
@@ -154,52 +91,9 @@ async def get_category_breakdown(
         start_date = datetime(2020, 1, 1)
     
     # Aggregate by category
-    result = await db.execute(
-        select(
-            Category.id,
-            Category.name,
-            Category.slug,
-            Category.color,
-            func.sum(Transaction.amount).label('total'),
-            func.count(Transaction.id).label('count')
-        ).select_from(Transaction).join(
-            Category, Transaction.category_id == Category.id, isouter=True
-        ).where(
-            and_(
-                Transaction.user_id == current_user.id,
-                Transaction.type == type,
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date
-            )
-        ).group_by(Category.id, Category.name, Category.slug, Category.color)
-    )
-    
-    rows = result.all()
-    total_amount = sum(Decimal(row.total or 0) for row in rows)
+    result = await db.execute(category_breakdown_query(current_user.id, type, start_date, end_date))
     
-    categories = []
-    for row in rows:
-        amount = Decimal(row.total or 0)
-        percentage = float(amount / total_amount * 100) if total_amount > 0 else 0.0
-        
-        categories.append(CategoryBreakdownItem(
-            category_id=str(row.id) if row.id else None,
-            category_name=row.name or "Без категории",
-            category_slug=row.slug or "uncategorized",
-            amount=amount,
-            percentage=f"{round(percentage, 1)}",  # Format as string for frontend
-            transaction_count=row.count,
-            color=row.color
-        ))
-    
-    # Sort by amount descending
-    categories.sort(key=lambda x: x.amount, reverse=True)
-    
-    return CategoryBreakdownResponse(
-        categories=categories,
-        total=total_amount,
-        currency=current_user.default_currency
-    )
+    return build_category_breakdown(result.all(), current_user.default_currency)
 
 
 @router.get("/trends", response_model=TimeSeriesResponse)
@@ -223,66 +117,8 @@ async def get_trends(
     else:  # year
         start_date = end_date - timedelta(days=365)
     
-    # Get all transactions in range
-    result = await db.execute(
-        select(Transaction).where(
-            and_(
-                Transaction.user_id == current_user.id,
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date
-            )
-        ).order_by(Transaction.transaction_date)
-    )
-    transactions = result.scalars().all()
-    
-    # Group by time period
-    data_points = {}
-    current = start_date
-    
-    while current <= end_date:
-        if granularity == "day":
-            key = current.strftime("%Y-%m-%d")
-            next_period = current + timedelta(days=1)
-        elif granularity == "week":
-            key = current.strftime("%Y-W%W")
-            next_period = current + timedelta(days=7)
-        else:  # month
-            key = current.strftime("%Y-%m")
-            next_period = (current.replace(day=1) + timedelta(days=32)).replace(day=1)
-        
-        data_points[key] = {"income": Decimal("0"), "expense": Decimal("0")}
-        current = next_period
-    
-    # Aggregate transactions
-    for tx in transactions:
-        if granularity == "day":
-            key = tx.transaction_date.strftime("%Y-%m-%d")
-        elif granularity == "week":
-            key = tx.transaction_date.strftime("%Y-W%W")
-        else:
-            key = tx.transaction_date.strftime("%Y-%m")
-        
-        if key in data_points:
-            if tx.type == "income":
-                data_points[key]["income"] += tx.amount
-            else:
-                data_points[key]["expense"] += tx.amount
-    
-    # Build response
-    series_data = []
-    running_balance = Decimal("0")
-    
-    for date_key in sorted(data_points.keys()):
-        income = data_points[date_key]["income"]
-        expense = data_points[date_key]["expense"]
-        running_balance += (income - expense)
-        
-        series_data.append(TimeSeriesDataPoint(
-            date=date_key,
-            income=income,
-            expense=expense,
-            balance=running_balance
-        ))
+    # Bucketing and running balance are computed in Postgres (one row per bucket)
+    series_data = await fetch_trend_series(db, current_user.id, start_date, end_date, granularity)
     
     return TimeSeriesResponse(
         data=series_data,
@@ -302,17 +138,9 @@ async def get_summary(
     This is a convenience endpoint for dashboard views.
     """
     
-    # Get balance for current month
-    balance = await get_balance("month", None, None, current_user, db)
-    
-    # Get category breakdown
-    categories = await get_category_breakdown("month", "expense", current_user, db)
-    
-    # Get trends
-    trends = await get_trends("month", "day", current_user, db)
+    # Same 30-day window as /balance, /categories and /trends defaults;
+    # totals, breakdown and daily series are fetched in one statement
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=30)
     
-    return AnalyticsSummaryResponse(
-        balance=balance,
-        category_breakdown=categories,
-        trends=trends
-    )
+    return await fetch_dashboard_summary(db, current_user, start_date, end_date, "day")
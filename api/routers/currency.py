@@ -1,10 +1,12 @@
 """Currency rates API endpoint."""
-from fastapi import APIRouter, Depends
+from datetime import date
+from decimal import Decimal
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from ..database import get_db
-from ..services.currency import fetch_cbu_rates, CURRENCY_FLAGS
+from ..services.currency import rate_cache, get_rate_on, CURRENCY_FLAGS
 from ..auth.jwt import get_current_user
 from ..models.user import User
 
@@ -17,11 +19,11 @@ async def get_currency_rates(
     db: AsyncSession = Depends(get_db)
 ) -> Dict[str, Any]:
     """
-    Get current exchange rates from CBU.
+    Get current exchange rates from CBU (served from the rate cache).
     
     Returns all available currencies with their rates relative to UZS.
     """
-    rates = await fetch_cbu_rates()
+    rates = await rate_cache.get_rates()
     
     # Convert to dict format for API response
     rates_list = []
@@ -44,3 +46,34 @@ async def get_currency_rates(
         "date": date,
         "rates": rates_list
     }
+
+
+@router.get("/convert")
+async def convert_currency(
+    amount: Decimal = Query(..., gt=0),
+    currency: str = Query(..., min_length=3, max_length=3),
+    on_date: Optional[date] = Query(None, alias="date"),
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, Any]:
+    """
+    Convert an amount to UZS at the CBU rate in effect on `date` (default today).
+    
+    Past dates use the stored rate history, so back-dated transactions get
+    the rate of their own day.
+    """
+    if currency.upper() == "UZS":
+        return {"amount": amount, "currency": "UZS", "amount_uzs": amount, "rate": 1, "nominal": 1, "rate_date": None}
+    
+    found = await get_rate_on(currency, on_date)
+    if not found:
+        raise HTTPException(status_code=404, detail=f"No rate for {currency.upper()}")
+    nominal, rate, rate_date = found
+    
+    return {
+        "amount": amount,
+        "currency": currency.upper(),
+        "amount_uzs": round(amount * Decimal(str(rate)) / nominal, 2),
+        "rate": rate,
+        "nominal": nominal,
+        "rate_date": rate_date,
+    }
@@ -4,42 +4,21 @@ from typing import Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, and_
 from dateutil.relativedelta import relativedelta
 
 from ..database import get_db
 from ..models.limit import Limit
-from ..models.transaction import Transaction
 from ..models.category import Category
 from ..models.user import User
 from ..schemas.limit import LimitCreate, LimitUpdate, LimitResponse, LimitSummary
 from ..auth.jwt import get_current_user
+from ..services.limits import fetch_limit_statuses
+from ..services.spend_tracker import spend_tracker
 
 router = APIRouter(prefix="/limits", tags=["limits"])
 
 
-async def calculate_spent(
-    db: AsyncSession,
-    user_id: UUID,
-    category_id: UUID,
-    period_start: date,
-    period_end: date
-) -> Decimal:
-    """Calculate spent amount for a category in a period."""
-    result = await db.execute(
-        select(func.coalesce(func.sum(Transaction.amount), 0)).where(
-            and_(
-                Transaction.user_id == user_id,
-                Transaction.category_id == category_id,
-                Transaction.type == "expense",
-                Transaction.transaction_date >= period_start,
-                Transaction.transaction_date <= period_end
-            )
-        )
-    )
-    return Decimal(str(result.scalar() or 0))
-
-
 def enrich_limit_with_spending(limit: Limit, spent: Decimal, category_name: Optional[str] = None) -> LimitResponse:
     """Enrich limit with spending data."""
     remaining = limit.amount - spent
@@ -102,15 +81,12 @@ async def create_limit(
     
     db.add(limit)
     await db.commit()
-    await db.refresh(limit)
+    spend_tracker.invalidate(current_user.id, limit.category_id)
     
-    # Calculate spent
-    spent = await calculate_spent(
-        db, current_user.id, limit.category_id,
-        limit.period_start, limit.period_end
-    )
+    # Reload with spent (also picks up server-side timestamps)
+    [(limit, category_name, spent)] = await fetch_limit_statuses(db, current_user.id, Limit.id == limit.id)
     
-    return enrich_limit_with_spending(limit, spent, category.name)
+    return enrich_limit_with_spending(limit, spent, category_name)
 
 
 @router.get("", response_model=list[LimitResponse])
@@ -121,35 +97,19 @@ async def list_limits(
     db: AsyncSession = Depends(get_db)
 ):
     """List all limits for current user with spending data."""
-    query = select(Limit).where(Limit.user_id == current_user.id)
-    
+    criteria = []
     if period_start:
-        query = query.where(Limit.period_start >= period_start)
+        criteria.append(Limit.period_start >= period_start)
     if period_end:
-        query = query.where(Limit.period_end <= period_end)
-    
-    query = query.order_by(Limit.period_start.desc())
+        criteria.append(Limit.period_end <= period_end)
     
-    result = await db.execute(query)
-    limits = result.scalars().all()
+    # Limits, category names and spent amounts in one query
+    statuses = await fetch_limit_statuses(db, current_user.id, *criteria)
     
-    # Enrich with spending data
-    enriched_limits = []
-    for limit in limits:
-        spent = await calculate_spent(
-            db, current_user.id, limit.category_id,
-            limit.period_start, limit.period_end
-        )
-        
-        # Get category name
-        cat_result = await db.execute(
-            select(Category.name).where(Category.id == limit.category_id)
-        )
-        category_name = cat_result.scalar()
-        
-        enriched_limits.append(enrich_limit_with_spending(limit, spent, category_name))
-    
-    return enriched_limits
+    return [
+        enrich_limit_with_spending(limit, spent, category_name)
+        for limit, category_name, spent in statuses
+    ]
 
 
 @router.get("/current", response_model=LimitSummary)
@@ -162,15 +122,7 @@ async def get_current_month_limits(
     start_of_month = date(today.year, today.month, 1)
     end_of_month = start_of_month + relativedelta(months=1) - relativedelta(days=1)
     
-    query = select(Limit).where(
-        and_(
-            Limit.user_id == current_user.id,
-           Limit.period_start == start_of_month
-        )
-    )
-    
-    result = await db.execute(query)
-    limits = result.scalars().all()
+    statuses = await fetch_limit_statuses(db, current_user.id, Limit.period_start == start_of_month)
     
     # Enrich with spending data
     enriched_limits = []
@@ -178,18 +130,7 @@ async def get_current_month_limits(
     total_spent = Decimal("0")
     exceeded_count = 0
     
-    for limit in limits:
-        spent = await calculate_spent(
-            db, current_user.id, limit.category_id,
-            limit.period_start, limit.period_end
-        )
-        
-        # Get category name
-        cat_result = await db.execute(
-            select(Category.name).where(Category.id == limit.category_id)
-        )
-        category_name = cat_result.scalar()
-        
+    for limit, category_name, spent in statuses:
         enriched = enrich_limit_with_spending(limit, spent, category_name)
         enriched_limits.append(enriched)
         
@@ -199,7 +140,7 @@ async def get_current_month_limits(
             exceeded_count += 1
     
     return LimitSummary(
-        total_limits=len(limits),
+        total_limits=len(statuses),
         total_budget=total_budget,
         total_spent=total_spent,
         exceeded_count=exceeded_count,
@@ -214,31 +155,12 @@ async def get_limit(
     db: AsyncSession = Depends(get_db)
 ):
     """Get a specific limit by ID."""
-    result = await db.execute(
-        select(Limit).where(
-            and_(
-                Limit.id == limit_id,
-                Limit.user_id == current_user.id
-            )
-        )
-    )
-    limit = result.scalar_one_or_none()
+    statuses = await fetch_limit_statuses(db, current_user.id, Limit.id == limit_id)
     
-    if not limit:
+    if not statuses:
         raise HTTPException(status_code=404, detail="Limit not found")
     
-    # Calculate spent
-    spent = await calculate_spent(
-        db, current_user.id, limit.category_id,
-        limit.period_start, limit.period_end
-    )
-    
-    # Get category name
-    cat_result = await db.execute(
-        select(Category.name).where(Category.id == limit.category_id)
-    )
-    category_name = cat_result.scalar()
-    
+    limit, category_name, spent = statuses[0]
     return enrich_limit_with_spending(limit, spent, category_name)
 
 
@@ -269,19 +191,10 @@ async def update_limit(
         setattr(limit, field, value)
     
     await db.commit()
-    await db.refresh(limit)
-    
-    # Calculate spent
-    spent = await calculate_spent(
-        db, current_user.id, limit.category_id,
-        limit.period_start, limit.period_end
-    )
+    spend_tracker.invalidate(current_user.id, limit.category_id)
     
-    # Get category name
-    cat_result = await db.execute(
-        select(Category.name).where(Category.id == limit.category_id)
-    )
-    category_name = cat_result.scalar()
+    # Reload with spent for the (possibly changed) period
+    [(limit, category_name, spent)] = await fetch_limit_statuses(db, current_user.id, Limit.id == limit_id)
     
     return enrich_limit_with_spending(limit, spent, category_name)
 
@@ -308,5 +221,6 @@ async def delete_limit(
     
     await db.delete(limit)
     await db.commit()
+    spend_tracker.invalidate(current_user.id, limit.category_id)
     
     return None
@@ -3,11 +3,12 @@ from typing import Optional, List
 from uuid import UUID
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from fastapi import APIRouter, Depends, File, HTTPException, status, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select, func, and_, tuple_
 
-from ..database import get_db
+from ..database import get_db, get_sessionmaker
 from ..models.user import User
 from ..models.transaction import Transaction
 from ..models.category import Category
@@ -15,18 +16,60 @@ from ..schemas.transaction import (
     TransactionCreate,
     TransactionUpdate,
     TransactionResponse,
-    TransactionListResponse
+    TransactionListResponse,
+    TransactionBulkCreate,
+    TransactionBulkResponse,
 )
 from ..auth.jwt import get_current_user
 from ..services.limits import check_limit_thresholds  # <--- Added import
+from ..services.bulk_import import (
+    BulkImportError,
+    fetch_user_categories,
+    import_transactions,
+    parse_transactions_csv,
+)
+from ..services.export import (
+    ENCODERS,
+    EXPORT_FORMATS,
+    export_rows_query,
+    parquet_available,
+    stream_export_rows,
+)
+from ..services.spend_tracker import spend_tracker
+from ..services.rollup import apply_transaction_delta, transaction_count_query
+from ..utils.pagination import encode_cursor, decode_cursor
 
 router = APIRouter(prefix="/transactions", tags=["Transactions"])
 
 
+def filtered_transactions_query(
+    user_id: UUID,
+    type: Optional[str] = None,
+    category_id: Optional[UUID] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+):
+    """select(Transaction) for one user with the list/export filters applied."""
+    query = select(Transaction).where(Transaction.user_id == user_id)
+    
+    if type:
+        query = query.where(Transaction.type == type)
+    if category_id:
+        query = query.where(Transaction.category_id == category_id)
+    if start_date:
+        query = query.where(Transaction.transaction_date >= start_date)
+    if end_date:
+        query = query.where(Transaction.transaction_date <= end_date)
+    
+    return query
+
+
 @router.get("", response_model=TransactionListResponse)
 async def list_transactions(
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
     type: Optional[str] = Query(None, pattern="^(income|expense)$"),
     category_id: Optional[UUID] = None,
     start_date: Optional[datetime] = None,
@@ -37,8 +80,10 @@ async def list_transactions(
     """
     List user's transactions with filtering and pagination.
     
-    - **page**: Page number (1-indexed)
+    - **page**: Page number (1-indexed), ignored when `cursor` is given
     - **page_size**: Items per page (1-100)
+    - **cursor**: `next_cursor` from the previous response (keyset pagination)
+    - **include_total**: Return `total` (default: yes for page mode, no for cursor mode)
     - **type**: Filter by income/expense
     - **category_id**: Filter by category
     - **start_date**: Filter by date range (inclusive)
@@ -46,36 +91,92 @@ async def list_transactions(
     """
     
     # Build query
-    query = select(Transaction).where(Transaction.user_id == current_user.id)
+    query = filtered_transactions_query(current_user.id, type, category_id, start_date, end_date)
     
-    if type:
-        query = query.where(Transaction.type == type)
-    if category_id:
-        query = query.where(Transaction.category_id == category_id)
-    if start_date:
-        query = query.where(Transaction.transaction_date >= start_date)
-    if end_date:
-        query = query.where(Transaction.transaction_date <= end_date)
+    # Count total (only when asked for; exact from the rollup when no date filter)
+    if include_total is None:
+        include_total = cursor is None
     
-    # Count total
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
+    total = None
+    if include_total:
+        if start_date or end_date:
+            count_query = select(func.count()).select_from(query.subquery())
+        else:
+            count_query = transaction_count_query(current_user.id, type, category_id)
+        total_result = await db.execute(count_query)
+        total = int(total_result.scalar() or 0)
     
-    # Pagination
+    # Pagination: keyset on (transaction_date, id) when a cursor is given, OFFSET otherwise
     from sqlalchemy.orm import joinedload
-    query = query.order_by(Transaction.transaction_date.desc())
+    if cursor:
+        try:
+            cursor_date, cursor_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = query.where(
+            tuple_(Transaction.transaction_date, Transaction.id) < tuple_(cursor_date, cursor_id)
+        )
+    else:
+        query = query.offset((page - 1) * page_size)
+    
+    query = query.order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
     query = query.options(joinedload(Transaction.category)) # <--- Eager load categories
-    query = query.offset((page - 1) * page_size).limit(page_size)
+    query = query.limit(page_size + 1)  # One extra row tells us whether there is a next page
     
     result = await db.execute(query)
     transactions = result.scalars().all()
     
+    next_cursor = None
+    if len(transactions) > page_size:
+        transactions = transactions[:page_size]
+        last = transactions[-1]
+        next_cursor = encode_cursor(last.transaction_date, last.id)
+    
     return TransactionListResponse(
         total=total,
         items=[TransactionResponse.model_validate(tx) for tx in transactions],
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/export")
+async def export_transactions(
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    type: Optional[str] = Query(None, pattern="^(income|expense)$"),
+    category_id: Optional[UUID] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    session_factory: async_sessionmaker = Depends(get_sessionmaker),
+):
+    """
+    Export user's transactions as a streamed file.
+    
+    - **format**: csv, ndjson or parquet
+    - Same filters as the list endpoint; rows are read through a server-side
+      cursor and written out batch by batch, so memory stays flat.
+    """
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parquet export is not available on this server"
+        )
+    
+    query = export_rows_query(
+        filtered_transactions_query(current_user.id, type, category_id, start_date, end_date)
+    )
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"transactions-{datetime.now().strftime('%Y%m%d')}.{extension}"
+    
+    return StreamingResponse(
+        ENCODERS[format](stream_export_rows(session_factory, query)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
 
@@ -108,23 +209,22 @@ async def create_transaction(
     )
     
     db.add(new_transaction)
-    await db.commit()
-    
-    # Fetch full object with category
-    from sqlalchemy.orm import joinedload
-    result = await db.execute(
-        select(Transaction)
-        .options(joinedload(Transaction.category))
-        .where(Transaction.id == new_transaction.id)
-    )
-    result = await db.execute(
-        select(Transaction)
-        .options(joinedload(Transaction.category))
-        .where(Transaction.id == new_transaction.id)
-    )
-    new_transaction = result.scalar_one()
+    await db.flush()
+    await apply_transaction_delta(db, new_transaction.id)
+    with spend_tracker.writing(current_user.id):
+        await db.commit()
+        
+        # Fetch full object with category
+        from sqlalchemy.orm import joinedload
+        result = await db.execute(
+            select(Transaction)
+            .options(joinedload(Transaction.category))
+            .where(Transaction.id == new_transaction.id)
+        )
+        new_transaction = result.scalar_one()
 
-    # Check limits
+        # Check limits (counter first, so the check sees this transaction)
+        spend_tracker.track(new_transaction)
     if new_transaction.type == "expense" and new_transaction.category_id:
         warning = await check_limit_thresholds(
             db, 
@@ -143,6 +243,51 @@ async def create_transaction(
     return TransactionResponse.model_validate(new_transaction)
 
 
+@router.post("/bulk", response_model=TransactionBulkResponse, status_code=status.HTTP_201_CREATED)
+async def create_transactions_bulk(
+    bulk_data: TransactionBulkCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Create many transactions at once (all or nothing).
+    
+    Limit warnings are returned once per affected category and month.
+    """
+    try:
+        return await import_transactions(db, current_user, bulk_data.items)
+    except BulkImportError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=e.errors
+        )
+
+
+@router.post("/bulk/csv", response_model=TransactionBulkResponse, status_code=status.HTTP_201_CREATED)
+async def import_transactions_csv(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Import transactions from a CSV file (all or nothing).
+    
+    Columns: type, amount, currency, description, category (slug or id),
+    transaction_date. Only type and amount are required.
+    """
+    try:
+        categories = await fetch_user_categories(db, current_user.id)
+        items = parse_transactions_csv(await file.read(), categories)
+        if not items:
+            raise BulkImportError([{"row": 1, "error": "No rows to import"}])
+        return await import_transactions(db, current_user, items, categories)
+    except BulkImportError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=e.errors
+        )
+
+
 @router.get("/{transaction_id}", response_model=TransactionResponse)
 async def get_transaction(
     transaction_id: UUID,
@@ -195,25 +340,33 @@ async def update_transaction(
             detail="Transaction not found"
         )
     
-    # Update fields
+    # Update fields (rollup: remove the old row state, add the new one)
+    old_expense = transaction.type == "expense"
+    old_category_id = transaction.category_id
+    old_amount = transaction.amount
+    old_day = transaction.transaction_date.date()
+    await apply_transaction_delta(db, transaction.id, -1)
     for field, value in update_data.model_dump(exclude_unset=True).items():
         setattr(transaction, field, value)
     
-    await db.commit()
-    # Fetch again with relationship to return full data
-    from sqlalchemy.orm import joinedload
-    result = await db.execute(
-        select(Transaction)
-        .options(joinedload(Transaction.category))
-        .where(Transaction.id == transaction_id)
-    )
-    result = await db.execute(
-        select(Transaction)
-        .options(joinedload(Transaction.category))
-        .where(Transaction.id == transaction_id)
-    )
-    transaction = result.scalar_one()
+    await db.flush()
+    await apply_transaction_delta(db, transaction.id)
+    with spend_tracker.writing(current_user.id):
+        await db.commit()
+        # Fetch again with relationship to return full data
+        from sqlalchemy.orm import joinedload
+        result = await db.execute(
+            select(Transaction)
+            .options(joinedload(Transaction.category))
+            .where(Transaction.id == transaction_id)
+        )
+        transaction = result.scalar_one()
 
+        # Move spend counters from the old state to the new one (expenses only)
+        if old_expense:
+            spend_tracker.apply_delta(current_user.id, old_category_id, old_day, -old_amount)
+        spend_tracker.track(transaction)
+    
     # Check limits (only if expense)
     if transaction.type == "expense" and transaction.category_id:
         # For update, we consider the NEW amount as the one contributing to the threshold
@@ -254,7 +407,10 @@ async def delete_transaction(
             detail="Transaction not found"
         )
     
+    await apply_transaction_delta(db, transaction.id, -1)
     await db.delete(transaction)
-    await db.commit()
+    with spend_tracker.writing(current_user.id):
+        await db.commit()
+        spend_tracker.track(transaction, -1)
     
     return None
@@ -5,8 +5,11 @@ from sqlalchemy import select, and_
 from .database import AsyncSessionLocal
 from .models.user import User
 from .services.notification import send_subscription_expired_message
+from .services.spend_tracker import spend_tracker
+from .config import get_settings
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 async def check_expired_subscriptions():
     """Check for expired subscriptions and downgrade/notify users."""
@@ -61,3 +64,21 @@ async def start_scheduler():
         # Run every 6 hours (6 * 3600 seconds)
         # For testing, user might want faster, but 6h is reasonable for prod
         await asyncio.sleep(6 * 3600)
+
+
+async def reconcile_spend_counters():
+    """Correct drift in the in-process limit spend counters from the rollup."""
+    async with AsyncSessionLocal() as db:
+        try:
+            corrections = await spend_tracker.reconcile(db)
+            if corrections:
+                logger.info(f"🔧 Corrected {corrections} spend counters ({len(spend_tracker)} hot).")
+        except Exception as e:
+            logger.error(f"Error reconciling spend counters: {e}")
+
+
+async def start_spend_reconciler():
+    """Background loop for reconcile_spend_counters()."""
+    while True:
+        await asyncio.sleep(settings.spend_reconcile_interval_seconds)
+        await reconcile_spend_counters()
@@ -48,7 +48,22 @@ class TransactionResponse(TransactionBase):
 
 class TransactionListResponse(BaseModel):
     """Schema for paginated transaction list."""
-    total: int
+    total: Optional[int] = None  # Omitted in cursor mode unless include_total=true
     items: list[TransactionResponse]
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # Pass as `cursor` to fetch the next page
+
+
+BULK_MAX_ROWS = 5000
+
+
+class TransactionBulkCreate(BaseModel):
+    """Schema for creating many transactions in one request."""
+    items: list[TransactionCreate] = Field(..., min_length=1, max_length=BULK_MAX_ROWS)
+
+
+class TransactionBulkResponse(BaseModel):
+    """Schema for bulk import result."""
+    created: int
+    limit_warnings: list[str] = []
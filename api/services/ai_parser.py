@@ -2,13 +2,22 @@ import io
 import json
 import logging
 import re
+import time
 from typing import Dict, Any, Optional
 from decimal import Decimal
 
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI
 from PIL import Image
 
+from shared.llm_scheduler import llm_scheduler
+
+from ..config import get_settings
+
+from .keyword_matcher import KeywordMatcher
+
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
 # Category slugs compatible with UI
@@ -44,6 +53,14 @@ CATEGORY_KEYWORDS = {
     "бургер": "food",
     "макдональдс": "food",
     "kfc": "food",
+    "обед": "food",
+    "ужин": "food",
+    "coffee": "food",
+    "lunch": "food",
+    "dinner": "food",
+    "qahva": "food",
+    "ovqat": "food",
+    "tushlik": "food",
     
     # transport / Транспорт
     "такси": "transport",
@@ -57,6 +74,9 @@ CATEGORY_KEYWORDS = {
     "заправ": "transport",
     "яндекс.такси": "transport",
     "убер": "transport",
+    "taxi": "transport",
+    "taksi": "transport",
+    "benzin": "transport",
     
     # entertainment / Развлечения
     "кино": "entertainment",
@@ -66,6 +86,7 @@ CATEGORY_KEYWORDS = {
     "spotify": "entertainment",
     "netflix": "entertainment",
     "концерт": "entertainment",
+    "kino": "entertainment",
     
     # shopping / Покупки
     "покупк": "shopping",
@@ -92,6 +113,7 @@ CATEGORY_KEYWORDS = {
     "анализ": "health",
     "апт": "health",
     "лекарств": "health",
+    "apteka": "health",
     
     # education / Образование
     "курс": "education",
@@ -121,14 +143,119 @@ CATEGORY_KEYWORDS = {
     "зп": "salary",
     "аванс": "salary",
     "премия": "salary",
+    "salary": "salary",
+    "maosh": "salary",
+    "ish haqi": "salary",
 }
 
+# Compiled once; matching cost no longer grows with the table size
+CATEGORY_MATCHER = KeywordMatcher(CATEGORY_KEYWORDS)
+
+INCOME_KEYWORDS = [
+    "зарплат", "аванс", "премия", "возврат", "перевод", "получ", "зачисл", "продал", "продаж", "вернул",
+]
+
+# Local fast path: messages like "Taxi 50k" are resolved without the LLM
+# when the amount, currency and category are all unambiguous.
+FAST_PATH_MIN_CONFIDENCE = 0.7
+FAST_PATH_MAX_WORDS = 6
+# Debts and negated messages ("не купил кофе") look like plain expenses to
+# the keyword table, so they always go to the LLM
+FAST_PATH_DEBT_KEYWORDS = ("долг", "qarz", "занял", "одолжил")
+FAST_PATH_NEGATION = re.compile(r"\b(?:не|not|emas)\b", re.IGNORECASE)
+
+# "30к", "25 тыщ", "60 ming", "1.5 млн", "112 000", "$500"
+AMOUNT_PATTERN = re.compile(
+    r"(?<![\w.,])(\d+(?:[ \u00a0.,]\d+)*)\s*"
+    r"(кк|kk|к|k|тыщ\w*|тыс\w*|штук\w*|косар\w*|ming|млн|миллион\w*|лям\w*|mln)?(?!\w)",
+    re.IGNORECASE,
+)
+
+CURRENCY_PATTERNS = [
+    ("usd", re.compile(r"\$|\busd\b|доллар\w*|dollar\w*|бакс\w*", re.IGNORECASE)),
+    ("eur", re.compile(r"€|\beur(?:o|os)?\b|\bевро\b", re.IGNORECASE)),
+    ("rub", re.compile(r"₽|\brub(?:l\w*)?\b|\bруб(?:л\w*)?\b", re.IGNORECASE)),
+    ("gbp", re.compile(r"£|\bgbp\b|фунт\w*|\bpounds?\b", re.IGNORECASE)),
+    ("cny", re.compile(r"¥|\bcny\b|юан\w*|\byuan\b", re.IGNORECASE)),
+    ("kzt", re.compile(r"₸|\bkzt\b|тенге|\btenge\b", re.IGNORECASE)),
+    ("aed", re.compile(r"\baed\b|дирхам\w*|dirham\w*", re.IGNORECASE)),
+    ("try", re.compile(r"₺|\bлир[аы]?\b|\blira\b", re.IGNORECASE)),
+    ("uzs", re.compile(r"\buzs\b|\bс[уў]м\b|\bso['ʻ’]?m\b|\bsum\b", re.IGNORECASE)),
+]
+
+
+def _amount_multiplier(suffix: Optional[str]) -> int:
+    if not suffix:
+        return 1
+    suffix = suffix.lower()
+    if suffix in ("кк", "kk") or suffix.startswith(("млн", "миллион", "лям", "mln")):
+        return 1_000_000
+    return 1000
+
+
+def _number_value(raw: str, has_suffix: bool) -> Optional[Decimal]:
+    """Read "112 000", "1,000", "2.5" or "12,50"; None when the grouping is ambiguous."""
+    parts = re.split(r"([ \u00a0.,])", raw)
+    groups, separators = parts[0::2], parts[1::2]
+    if not separators:
+        return Decimal(raw)
+    if len(separators) == 1 and separators[0] in ".," and (has_suffix or len(groups[1]) != 3):
+        return Decimal(f"{groups[0]}.{groups[1]}")
+    if len(set(separators)) == 1 and all(len(group) == 3 for group in groups[1:]):
+        return Decimal("".join(groups))
+    return None
+
+
+def extract_amounts(text: str) -> list[tuple[Optional[Decimal], tuple[int, int]]]:
+    """Find every amount in the text, expanding shorthand like "30к" or "2 лям"."""
+    amounts = []
+    for match in AMOUNT_PATTERN.finditer(text):
+        value = _number_value(match.group(1), bool(match.group(2)))
+        if value is not None:
+            value *= _amount_multiplier(match.group(2))
+            if value == value.to_integral_value():
+                value = value.to_integral_value()
+        amounts.append((value, match.span()))
+    return amounts
+
+
+def detect_currencies(text: str) -> list[str]:
+    """Currency codes mentioned in the text, in CURRENCY_PATTERNS order."""
+    return [code for code, pattern in CURRENCY_PATTERNS if pattern.search(text)]
+
 
 class AITransactionParser:
-    """AI-powered transaction parser using OpenAI."""
+    """
+    AI-powered transaction parser using OpenAI.
+
+    Create it once per process (see get_ai_parser()): the client keeps a
+    pooled HTTP transport of max_concurrency connections. How many calls
+    run at once, and in which order waiting tiers are served, is up to
+    llm_scheduler (LLM_MAX_CONCURRENCY).
+    """
     
-    def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        timeout: float = settings.openai_timeout_seconds,
+        media_timeout: float = settings.openai_media_timeout_seconds,
+        max_concurrency: int = settings.openai_max_concurrency,
+    ):
+        self.timeout = timeout
+        self.media_timeout = media_timeout
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            timeout=timeout,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_concurrency,
+                    max_keepalive_connections=max_concurrency,
+                ),
+            ),
+        )
+
+    async def close(self) -> None:
+        await self.client.close()
 
     async def check_limits(self, user, limit_type: str) -> bool:
         """
@@ -206,10 +333,29 @@ class AITransactionParser:
             return "gpt-5.1"
         return "gpt-5-nano"
     
-    async def parse_text(self, text: str, model_name: str = "gpt-5-nano") -> Dict[str, Any]:
+    async def parse_text(
+        self,
+        text: str,
+        model_name: str = "gpt-5-nano",
+        tier: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
         Parse transaction from text message.
         """
+        local = self._fast_parse(text)
+        if local is not None:
+            logger.info(
+                f"Parsed locally: type={local['type']}, amount={local['amount']} {local['currency']}, "
+                f"category={local['category_slug']}, confidence={local['confidence']:.2f}"
+            )
+            return local
+
+        from .parse_cache import parse_cache
+        cached = await parse_cache.lookup(text, model_name)
+        if cached is not None:
+            logger.info(f"Parse cache hit: amount={cached['amount']} {cached['currency']}, category={cached['category_slug']}")
+            return cached
+
         logger.info(f"AI parsing text: {text[:100]}... (Model: {model_name})")
         
         system_prompt = (
@@ -258,13 +404,17 @@ class AITransactionParser:
 
         
         try:
-            completion = await self.client.chat.completions.create(
+            started = time.perf_counter()
+            completion = await llm_scheduler.chat(
+                self.client,
+                tier=tier,
                 model=model_name,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": f"Текст: {text}"},
                 ],
                 response_format={"type": "json_object"},
+                timeout=self.timeout,
             )
             
             data = json.loads(completion.choices[0].message.content)
@@ -300,13 +450,25 @@ class AITransactionParser:
                 f"category={result['category_slug']}, confidence={result['confidence']:.2f}"
             )
             
+            await parse_cache.store(
+                text,
+                model_name,
+                result,
+                latency_ms=(time.perf_counter() - started) * 1000,
+                tokens=completion.usage.total_tokens if completion.usage else 0,
+            )
             return result
             
         except Exception as e:
             logger.exception("AI parsing failed, using fallback")
             return self._fallback_parse(text)
     
-    def transcribe_voice(self, audio_data: bytes, filename: str = "audio.ogg") -> str:
+    async def transcribe_voice(
+        self,
+        audio_data: bytes,
+        filename: str = "audio.ogg",
+        tier: Optional[str] = None,
+    ) -> str:
         """
         Transcribe voice message using Whisper API.
         
@@ -323,10 +485,15 @@ class AITransactionParser:
             fileobj = io.BytesIO(audio_data)
             fileobj.name = filename
             
-            transcript = self.client.audio.transcriptions.create(
-                model="whisper-1",
-                file=(filename, fileobj),
-                response_format="text",
+            transcript = await llm_scheduler.run(
+                "whisper-1",
+                lambda: self.client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=(filename, fileobj),
+                    response_format="text",
+                    timeout=self.media_timeout,
+                ),
+                tier=tier,
             )
             
             logger.info(f"Transcription: {transcript[:100]}...")
@@ -336,7 +503,7 @@ class AITransactionParser:
             logger.exception("Voice transcription failed")
             raise
     
-    def parse_receipt_image(self, image_data: bytes) -> Dict[str, Any]:
+    async def parse_receipt_image(self, image_data: bytes, tier: Optional[str] = None) -> Dict[str, Any]:
         """
         Parse receipt from image using GPT Vision.
         
@@ -372,7 +539,9 @@ class AITransactionParser:
                 "- Если неясно → other"
             )
             
-            completion = self.client.chat.completions.create(
+            completion = await llm_scheduler.chat(
+                self.client,
+                tier=tier,
                 model="gpt-5-nano",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -390,6 +559,7 @@ class AITransactionParser:
                     }
                 ],
                 response_format={"type": "json_object"},
+                timeout=self.media_timeout,
             )
             
             data = json.loads(completion.choices[0].message.content)
@@ -410,44 +580,40 @@ class AITransactionParser:
             logger.exception("Receipt parsing failed")
             raise
     
+    def _keyword_matches(self, text: str) -> list[tuple[str, str]]:
+        """All (keyword, slug) pairs from CATEGORY_KEYWORDS found in the text."""
+        return CATEGORY_MATCHER.find_all(text)
+
     def _guess_category_by_keywords(self, text: str) -> tuple[Optional[str], float]:
         """Fallback keyword-based categorization."""
-        text_lower = text.lower()
-        best_slug = None
-        best_score = 0.0
+        match = CATEGORY_MATCHER.longest(text)
+        if match is None:
+            return None, 0.0
         
-        for keyword, slug in CATEGORY_KEYWORDS.items():
-            if keyword in text_lower:
-                # Longer keywords = higher confidence
-                score = min(1.0, 0.5 + 0.05 * len(keyword))
-                if score > best_score:
-                    best_score = score
-                    best_slug = slug
-        
-        return best_slug, best_score
+        # Longer keywords = higher confidence
+        keyword, slug = match
+        return slug, min(1.0, 0.5 + 0.05 * len(keyword))
     
     def _fallback_parse(self, text: str) -> Dict[str, Any]:
         """Fallback parser using regex when AI fails."""
-        # Try to extract amount
-        amount_match = re.search(r"(\d[\d\s,.]+)", text.replace(" ", ""))
-        amount = Decimal(amount_match.group(1).replace(",", ".")) if amount_match else Decimal("0")
+        # Try to extract amount, shorthand first ("30к", "2 лям")
+        amounts = [value for value, _ in extract_amounts(text) if value is not None]
+        if amounts:
+            amount = amounts[0]
+        else:
+            amount_match = re.search(r"(\d[\d\s,.]+)", text.replace(" ", ""))
+            amount = Decimal(amount_match.group(1).replace(",", ".")) if amount_match else Decimal("0")
         
         # Try to detect currency
-        currency = "uzs"
-        if re.search(r"\b(usd|dollar|доллар)", text, re.I):
-            currency = "usd"
-        elif re.search(r"\b(eur|euro|евро)", text, re.I):
-            currency = "eur"
-        elif re.search(r"\b(rub|рубл)", text, re.I):
-            currency = "rub"
+        currencies = detect_currencies(text)
+        currency = currencies[0] if currencies else "uzs"
         
         # Guess category by keywords
         category_slug, confidence = self._guess_category_by_keywords(text)
         
         # Detect income vs expense
         tx_type = "expense"
-        income_keywords = ["зарплат", "аванс", "премия", "возврат", "перевод", "получ", "зачисл"]
-        if any(kw in text.lower() for kw in income_keywords):
+        if category_slug == "salary" or any(kw in text.lower() for kw in INCOME_KEYWORDS):
             tx_type = "income"
             if not category_slug:
                 category_slug = "salary"
@@ -461,3 +627,66 @@ class AITransactionParser:
             "category_slug": category_slug,
             "confidence": confidence,
         }
+
+    def _fast_parse(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Resolve short, unambiguous messages locally.
+
+        Returns None whenever the LLM should decide: more than one amount or
+        currency, a signed amount, conflicting category keywords, an income
+        word on an expense category, debt words, a negation, or keyword
+        confidence below FAST_PATH_MIN_CONFIDENCE.
+
+        Only the API's parse endpoints use this; the bot's AIAgent resolves
+        messages against each user's own categories and stays on the LLM.
+        """
+        if "?" in text or len(text.split()) > FAST_PATH_MAX_WORDS:
+            return None
+        lowered = text.lower()
+        if any(kw in lowered for kw in FAST_PATH_DEBT_KEYWORDS) or FAST_PATH_NEGATION.search(text):
+            return None
+
+        amounts = extract_amounts(text)
+        if len(amounts) != 1 or amounts[0][0] is None or amounts[0][0] <= 0:
+            return None
+        start = amounts[0][1][0]
+        if start > 0 and text[start - 1] in "-−":  # "Кофе -50к": refund or correction?
+            return None
+        if len(detect_currencies(text)) > 1:
+            return None
+        if len({slug for _, slug in self._keyword_matches(text)}) != 1:
+            return None
+
+        result = self._fallback_parse(text)
+        if result["confidence"] < FAST_PATH_MIN_CONFIDENCE:
+            return None
+        if result["type"] == "income" and result["category_slug"] != "salary":
+            return None
+
+        result["amount"] = amounts[0][0]
+        start, end = amounts[0][1]
+        description = text[:start] + text[end:]
+        for _, pattern in CURRENCY_PATTERNS:
+            description = pattern.sub(" ", description)
+        description = " ".join(description.strip(" .,:;-—").split())
+        if description:
+            result["description"] = (description[0].upper() + description[1:])[:500]
+        return result
+
+
+_parser: Optional[AITransactionParser] = None
+
+
+def get_ai_parser() -> AITransactionParser:
+    """Process-wide parser (FastAPI dependency); created on first use."""
+    global _parser
+    if _parser is None:
+        _parser = AITransactionParser(api_key=settings.openai_api_key)
+    return _parser
+
+
+async def close_ai_parser() -> None:
+    global _parser
+    if _parser is not None:
+        await _parser.close()
+        _parser = None
@@ -0,0 +1,375 @@
+"""SQL-side aggregation helpers for analytics endpoints (read from user_daily_totals)."""
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, func, and_, or_, case, true, union_all, literal_column, cast, String, JSON, DateTime
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.category import Category
+from ..models.transaction import Transaction
+from ..models.user_daily_total import UserDailyTotal
+from ..models.user import User
+from ..schemas.analytics import (
+    AnalyticsSummaryResponse,
+    BalanceResponse,
+    CategoryBreakdownItem,
+    CategoryBreakdownResponse,
+    TimeSeriesDataPoint,
+    TimeSeriesResponse,
+)
+from .rollup import transaction_day
+
+# Postgres date_trunc units and generate_series steps per granularity.
+# Values are inlined into SQL, so keep them a fixed whitelist.
+BUCKET_UNITS = {
+    "day": ("'day'", "interval '1 day'"),
+    "week": ("'week'", "interval '1 week'"),
+    "month": ("'month'", "interval '1 month'"),
+}
+
+# Label format per granularity (same keys the frontend already consumes)
+BUCKET_LABELS = {
+    "day": "%Y-%m-%d",
+    "week": "%Y-W%W",
+    "month": "%Y-%m",
+}
+
+
+def bucket_expr(granularity: str, day_column):
+    """date_trunc() of a rollup day, as a naive timestamp."""
+    unit, _ = BUCKET_UNITS[granularity]
+    return func.date_trunc(literal_column(unit), cast(day_column, DateTime))
+
+
+def utc_window(start_date: datetime, end_date: datetime) -> Tuple[datetime, datetime]:
+    """Window bounds in UTC; naive values are server-local time, as datetime.now() returns."""
+    return start_date.astimezone(timezone.utc), end_date.astimezone(timezone.utc)
+
+
+def day_range(start_date: datetime, end_date: datetime) -> Tuple[date, date]:
+    """
+    Inclusive range of UTC days lying entirely inside the window.
+
+    The range is empty (start after end) when the window covers no whole day.
+    """
+    start, end = utc_window(start_date, end_date)
+    first_day = start.date() if start.time() == time.min else start.date() + timedelta(days=1)
+    last_day = (end + timedelta(microseconds=1)).date() - timedelta(days=1)
+    return first_day, last_day
+
+
+def _in_days(start_day: date, end_day: date):
+    return and_(UserDailyTotal.day >= start_day, UserDailyTotal.day <= end_day)
+
+
+def window_totals(user_id: UUID, start_date: datetime, end_date: datetime, type: Optional[str] = None):
+    """
+    Per (day, category, type) totals for exactly [start_date, end_date].
+
+    Whole UTC days come from the rollup; the partial first and last days are
+    summed from transactions, so windows keep their sub-day bounds.
+    """
+    start, end = utc_window(start_date, end_date)
+    first_day, last_day = day_range(start_date, end_date)
+    whole_days_start = datetime.combine(first_day, time.min, timezone.utc)
+    whole_days_end = datetime.combine(last_day + timedelta(days=1), time.min, timezone.utc)
+
+    full_days = select(
+        UserDailyTotal.day,
+        UserDailyTotal.category_id,
+        UserDailyTotal.type,
+        UserDailyTotal.total,
+        UserDailyTotal.tx_count,
+    ).where(and_(UserDailyTotal.user_id == user_id, _in_days(first_day, last_day)))
+
+    day = transaction_day()
+    edges = select(
+        day.label("day"),
+        Transaction.category_id,
+        Transaction.type,
+        func.sum(Transaction.amount).label("total"),
+        func.count().label("tx_count"),
+    ).where(
+        and_(
+            Transaction.user_id == user_id,
+            Transaction.transaction_date >= start,
+            Transaction.transaction_date <= end,
+            or_(Transaction.transaction_date < whole_days_start, Transaction.transaction_date >= whole_days_end),
+        )
+    ).group_by(day, Transaction.category_id, Transaction.type)
+
+    if type is not None:
+        full_days = full_days.where(UserDailyTotal.type == type)
+        edges = edges.where(Transaction.type == type)
+    return union_all(full_days, edges).subquery()
+
+
+def trend_series_query(user_id: UUID, start_date: datetime, end_date: datetime, granularity: str):
+    """
+    Build a single statement returning one row per bucket.
+
+    Buckets come from generate_series() so empty periods are still present,
+    per-bucket totals are grouped from the daily rollup, and the running
+    balance is a window sum over the buckets.
+    """
+    unit, step = BUCKET_UNITS[granularity]
+    start, end = (bound.replace(tzinfo=None) for bound in utc_window(start_date, end_date))
+
+    series = select(
+        func.generate_series(
+            func.date_trunc(literal_column(unit), start),
+            func.date_trunc(literal_column(unit), end),
+            literal_column(step),
+        ).label("bucket")
+    ).cte("series")
+
+    window = window_totals(user_id, start_date, end_date)
+    bucket = bucket_expr(granularity, window.c.day)
+    totals = select(
+        bucket.label("bucket"),
+        func.sum(case((window.c.type == "income", window.c.total), else_=0)).label("income"),
+        func.sum(case((window.c.type == "expense", window.c.total), else_=0)).label("expense"),
+    ).group_by(literal_column("1")).cte("totals")
+
+    income = func.coalesce(totals.c.income, 0)
+    expense = func.coalesce(totals.c.expense, 0)
+
+    return select(
+        series.c.bucket,
+        income.label("income"),
+        expense.label("expense"),
+        func.sum(income - expense).over(order_by=series.c.bucket).label("balance"),
+    ).select_from(
+        series.outerjoin(totals, totals.c.bucket == series.c.bucket)
+    ).order_by(series.c.bucket)
+
+
+async def fetch_trend_series(
+    db: AsyncSession,
+    user_id: UUID,
+    start_date: datetime,
+    end_date: datetime,
+    granularity: str = "day",
+) -> List[TimeSeriesDataPoint]:
+    """Run the bucketing query and map rows to response data points."""
+    result = await db.execute(trend_series_query(user_id, start_date, end_date, granularity))
+    label_format = BUCKET_LABELS[granularity]
+
+    return [
+        TimeSeriesDataPoint(
+            date=row.bucket.strftime(label_format),
+            income=Decimal(row.income or 0),
+            expense=Decimal(row.expense or 0),
+            balance=Decimal(row.balance or 0),
+        )
+        for row in result.all()
+    ]
+
+
+def _income_expense(window, prefix: str = ""):
+    is_income = window.c.type == "income"
+    is_expense = window.c.type == "expense"
+    return select(
+        func.sum(window.c.total).filter(is_income).label(f"{prefix}income"),
+        func.sum(window.c.total).filter(is_expense).label(f"{prefix}expense"),
+    ).subquery()
+
+
+def period_totals_query(user_id: UUID, start_date: datetime, end_date: datetime):
+    """
+    Current and previous period income/expense in one statement.
+
+    The previous period has the same length and ends where the current one
+    starts; each period is an exact window (see window_totals).
+    """
+    prev_start_date = start_date - (end_date - start_date)
+    prev_end_date = start_date - timedelta(microseconds=1)
+    current = _income_expense(window_totals(user_id, start_date, end_date))
+    previous = _income_expense(window_totals(user_id, prev_start_date, prev_end_date), prefix="prev_")
+
+    return select(
+        current.c.income,
+        current.c.expense,
+        previous.c.prev_income,
+        previous.c.prev_expense,
+    ).select_from(current.join(previous, true()))
+
+
+def build_balance_response(
+    totals: Any,
+    currency: str,
+    start_date: datetime,
+    end_date: datetime,
+) -> BalanceResponse:
+    """Build BalanceResponse (with % change vs previous period) from a totals row."""
+    total_income = Decimal(totals.income or 0)
+    total_expense = Decimal(totals.expense or 0)
+    balance = total_income - total_expense
+
+    prev_income = Decimal(totals.prev_income or 0)
+    prev_expense = Decimal(totals.prev_expense or 0)
+    prev_balance = prev_income - prev_expense
+
+    income_change = None
+    if prev_income > 0:
+        income_change = float((total_income - prev_income) / prev_income * 100)
+
+    expense_change = None
+    if prev_expense > 0:
+        expense_change = float((total_expense - prev_expense) / prev_expense * 100)
+
+    balance_change = None
+    if prev_balance != 0:
+        balance_change = float((balance - prev_balance) / abs(prev_balance) * 100)
+
+    return BalanceResponse(
+        balance=balance,
+        total_income=total_income,
+        total_expense=total_expense,
+        currency=currency,
+        period_label=f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
+        income_change=income_change,
+        expense_change=expense_change,
+        balance_change=balance_change,
+    )
+
+
+def category_breakdown_query(user_id: UUID, type: str, start_date: datetime, end_date: datetime):
+    """Per-category totals for one transaction type over an exact window."""
+    window = window_totals(user_id, start_date, end_date, type=type)
+
+    return select(
+        Category.id,
+        Category.name,
+        Category.slug,
+        Category.color,
+        func.sum(window.c.total).label("total"),
+        func.sum(window.c.tx_count).label("count"),
+    ).select_from(window).join(
+        Category, window.c.category_id == Category.id, isouter=True
+    ).group_by(
+        Category.id, Category.name, Category.slug, Category.color
+    ).having(func.sum(window.c.tx_count) > 0)
+
+
+def build_category_breakdown(
+    rows: Iterable[Tuple[Optional[Any], Optional[str], Optional[str], Optional[str], Any, int]],
+    currency: str,
+) -> CategoryBreakdownResponse:
+    """Build CategoryBreakdownResponse from (id, name, slug, color, total, count) rows."""
+    rows = [(cat_id, name, slug, color, Decimal(total or 0), count) for cat_id, name, slug, color, total, count in rows]
+    total_amount = sum((row[4] for row in rows), Decimal("0"))
+
+    categories = []
+    for cat_id, name, slug, color, amount, count in rows:
+        percentage = float(amount / total_amount * 100) if total_amount > 0 else 0.0
+
+        categories.append(CategoryBreakdownItem(
+            category_id=str(cat_id) if cat_id else None,
+            category_name=name or "Без категории",
+            category_slug=slug or "uncategorized",
+            amount=amount,
+            percentage=f"{round(percentage, 1)}",  # Format as string for frontend
+            transaction_count=count,
+            color=color,
+        ))
+
+    # Sort by amount descending
+    categories.sort(key=lambda x: x.amount, reverse=True)
+
+    return CategoryBreakdownResponse(
+        categories=categories,
+        total=total_amount,
+        currency=currency,
+    )
+
+
+def dashboard_summary_query(user_id: UUID, start_date: datetime, end_date: datetime, granularity: str = "day"):
+    """
+    Fuse period totals, expense breakdown and the trend series into one statement.
+
+    Totals come back as plain columns; the breakdown and the series are
+    aggregated into JSON arrays (amounts as text to keep Decimal precision),
+    so the whole dashboard is a single round trip on one connection.
+    """
+    totals = period_totals_query(user_id, start_date, end_date).cte("period_totals")
+    breakdown = category_breakdown_query(user_id, "expense", start_date, end_date).cte("category_totals")
+    series = trend_series_query(user_id, start_date, end_date, granularity).cte("trend_rows")
+
+    breakdown_json = select(
+        func.coalesce(
+            func.json_agg(
+                func.json_build_array(
+                    breakdown.c.id,
+                    breakdown.c.name,
+                    breakdown.c.slug,
+                    breakdown.c.color,
+                    cast(breakdown.c.total, String),
+                    breakdown.c.count,
+                )
+            ),
+            literal_column("'[]'::json"),
+            type_=JSON,
+        )
+    ).scalar_subquery()
+
+    series_json = select(
+        func.coalesce(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_array(
+                        series.c.bucket,
+                        cast(series.c.income, String),
+                        cast(series.c.expense, String),
+                        cast(series.c.balance, String),
+                    ),
+                    series.c.bucket,
+                )
+            ),
+            literal_column("'[]'::json"),
+            type_=JSON,
+        )
+    ).scalar_subquery()
+
+    return select(
+        totals.c.income,
+        totals.c.expense,
+        totals.c.prev_income,
+        totals.c.prev_expense,
+        breakdown_json.label("categories"),
+        series_json.label("series"),
+    )
+
+
+async def fetch_dashboard_summary(
+    db: AsyncSession,
+    user: User,
+    start_date: datetime,
+    end_date: datetime,
+    granularity: str = "day",
+) -> AnalyticsSummaryResponse:
+    """Run the fused dashboard statement and map it to AnalyticsSummaryResponse."""
+    result = await db.execute(dashboard_summary_query(user.id, start_date, end_date, granularity))
+    row = result.one()
+    currency = user.default_currency
+    label_format = BUCKET_LABELS[granularity]
+
+    # json_agg() serializes timestamps as ISO strings and keeps series order
+    series_data = [
+        TimeSeriesDataPoint(
+            date=datetime.fromisoformat(bucket).strftime(label_format),
+            income=Decimal(income),
+            expense=Decimal(expense),
+            balance=Decimal(balance),
+        )
+        for bucket, income, expense, balance in row.series
+    ]
+
+    return AnalyticsSummaryResponse(
+        balance=build_balance_response(row, currency, start_date, end_date),
+        category_breakdown=build_category_breakdown(row.categories, currency),
+        trends=TimeSeriesResponse(data=series_data, granularity=granularity, currency=currency),
+    )
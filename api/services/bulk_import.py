@@ -0,0 +1,161 @@
+"""Bulk transaction import: CSV parsing, batched insert and per-category limit checks."""
+import csv
+import io
+import logging
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from pydantic import ValidationError
+from sqlalchemy import select, insert, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.category import Category
+from ..models.transaction import Transaction
+from ..models.user import User
+from ..schemas.transaction import BULK_MAX_ROWS, TransactionBulkResponse, TransactionCreate
+from .limits import check_limit_thresholds
+from .rollup import add_transactions_to_rollup
+from .spend_tracker import spend_tracker
+
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = {"type", "amount", "currency", "description", "category", "transaction_date"}
+INSERT_CHUNK_ROWS = 1000  # Rows per INSERT ... VALUES; stays under asyncpg's 32767 bind parameters
+
+
+class BulkImportError(ValueError):
+    """Raised with per-row errors when a batch cannot be imported."""
+
+    def __init__(self, errors: List[Dict]):
+        super().__init__(f"{len(errors)} invalid rows")
+        self.errors = errors
+
+
+async def fetch_user_categories(db: AsyncSession, user_id: UUID) -> Dict[str, UUID]:
+    """All categories the user may assign, keyed by both id and slug (one query)."""
+    result = await db.execute(
+        select(Category.id, Category.slug, Category.user_id).where(
+            or_(Category.is_default == True, Category.user_id == user_id)
+        )
+    )
+    lookup: Dict[str, UUID] = {}
+    own_slugs = set()
+    for category_id, slug, owner_id in result.all():
+        lookup[str(category_id)] = category_id
+        # User's own categories win over defaults with the same slug
+        if not slug or slug in own_slugs:
+            continue
+        if owner_id == user_id:
+            own_slugs.add(slug)
+            lookup[slug] = category_id
+        elif slug not in lookup:
+            lookup[slug] = category_id
+    return lookup
+
+
+def parse_transactions_csv(content: bytes, categories: Dict[str, UUID]) -> List[TransactionCreate]:
+    """
+    Parse an uploaded CSV into validated transactions.
+
+    Expected header: type, amount and optionally currency, description,
+    category (slug or id) and transaction_date (ISO 8601).
+    """
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise BulkImportError([{"row": 0, "error": "File must be UTF-8 encoded"}])
+
+    reader = csv.DictReader(io.StringIO(text))
+    header = {name.strip() for name in reader.fieldnames or []}
+    missing = {"type", "amount"} - header
+    if missing:
+        raise BulkImportError([{"row": 1, "error": f"Missing columns: {', '.join(sorted(missing))}"}])
+
+    items: List[TransactionCreate] = []
+    errors: List[Dict] = []
+    for row_number, row in enumerate(reader, start=2):
+        if len(items) + len(errors) >= BULK_MAX_ROWS:
+            errors.append({"row": row_number, "error": f"Too many rows (max {BULK_MAX_ROWS})"})
+            break
+
+        row = {key.strip(): (value or "").strip() for key, value in row.items() if key and key.strip() in CSV_COLUMNS}
+        category = row.pop("category", "").lower()
+        if category:
+            if category not in categories:
+                errors.append({"row": row_number, "error": f"Unknown category: {category}"})
+                continue
+            row["category_id"] = categories[category]
+
+        try:
+            items.append(TransactionCreate.model_validate({key: value for key, value in row.items() if value != ""}))
+        except ValidationError as e:
+            first = e.errors()[0]
+            errors.append({"row": row_number, "error": f"{'.'.join(map(str, first['loc']))}: {first['msg']}"})
+
+    if errors:
+        raise BulkImportError(errors)
+    return items
+
+
+async def import_transactions(
+    db: AsyncSession,
+    user: User,
+    items: List[TransactionCreate],
+    categories: Optional[Dict[str, UUID]] = None,
+) -> TransactionBulkResponse:
+    """
+    Insert a batch of transactions in one transaction.
+
+    Categories are checked against one pre-fetched set, rows go in as
+    multi-row INSERT ... VALUES statements of INSERT_CHUNK_ROWS rows, the
+    rollup is updated with one grouped upsert, and limit thresholds are
+    checked once per affected (category, month) with the batch's total
+    for it.
+    """
+    if categories is None:
+        categories = await fetch_user_categories(db, user.id)
+
+    errors = [
+        {"index": index, "error": f"Invalid category: {item.category_id}"}
+        for index, item in enumerate(items)
+        if item.category_id and str(item.category_id) not in categories
+    ]
+    if errors:
+        raise BulkImportError(errors)
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    added: Dict[Tuple[UUID, date], Tuple[Decimal, date]] = {}
+    for item in items:
+        row = item.model_dump()
+        row["id"] = uuid4()
+        row["user_id"] = user.id
+        row["transaction_date"] = row["transaction_date"] or now
+        rows.append(row)
+
+        if item.type == "expense" and item.category_id:
+            tx_day = row["transaction_date"].date()
+            key = (item.category_id, tx_day.replace(day=1))
+            total, last_day = added.get(key, (Decimal("0"), tx_day))
+            added[key] = (total + item.amount, max(last_day, tx_day))
+
+    for start in range(0, len(rows), INSERT_CHUNK_ROWS):
+        await db.execute(insert(Transaction).values(rows[start:start + INSERT_CHUNK_ROWS]))
+    await add_transactions_to_rollup(db, [row["id"] for row in rows])
+    with spend_tracker.writing(user.id):
+        await db.commit()
+        for (category_id, _), (amount_added, tx_day) in added.items():
+            spend_tracker.apply_delta(user.id, category_id, tx_day, amount_added)
+
+    warnings = []
+    for (category_id, _), (amount_added, tx_day) in added.items():
+        warning = await check_limit_thresholds(
+            db, user.id, category_id, amount_added, tx_day, user.language
+        )
+        if warning:
+            warnings.append(warning)
+
+    logger.info(f"Bulk imported {len(rows)} transactions for user {user.id}")
+    return TransactionBulkResponse(created=len(rows), limit_warnings=warnings)
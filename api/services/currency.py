@@ -1,10 +1,18 @@
 """Currency exchange rates service using CBU (Central Bank of Uzbekistan) API."""
+import asyncio
+import json
+import os
 import httpx
 import logging
-from typing import Dict, List, Optional
-from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from datetime import date, datetime, timezone
+
+from ..config import get_settings
+from .exchange_rates import parse_cbu_date, rate_history, store_daily_rates
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 CBU_API_URL = "https://cbu.uz/ru/arkhiv-kursov-valyut/json/"
 
@@ -123,9 +131,142 @@ async def fetch_cbu_rates() -> List[CurrencyRate]:
         raise
 
 
+class CBURateCache:
+    """
+    In-memory CBU rates keyed by currency code, refreshed in the background.
+    
+    One shared httpx.AsyncClient is used for all refreshes. Every good
+    download is written to a JSON snapshot, which is loaded on start so a
+    restart during a CBU outage still serves the last known rates.
+    """
+    
+    def __init__(
+        self,
+        url: str = CBU_API_URL,
+        snapshot_path: Optional[str] = None,
+        refresh_interval: float = 3600,
+        timeout: float = 10.0,
+        on_refresh: Optional[Callable[[List[dict]], Awaitable[None]]] = None,
+    ):
+        self.url = url
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self.on_refresh = on_refresh
+        
+        self._rates: Dict[str, CurrencyRate] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.updated_at: Optional[datetime] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+    
+    def _store(self, items: List[dict], updated_at: datetime) -> None:
+        # Swap the whole dict so readers never see a half-filled one
+        self._rates = {rate.code: rate for rate in (CurrencyRate(item) for item in items)}
+        self.updated_at = updated_at
+    
+    def load_snapshot(self) -> bool:
+        """Load the last persisted rates, if any."""
+        if not self.snapshot_path or not self.snapshot_path.exists():
+            return False
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._store(snapshot["rates"], datetime.fromisoformat(snapshot["updated_at"]))
+            logger.info(f"Loaded {len(self._rates)} CBU rates from snapshot ({self.updated_at})")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to load CBU rates snapshot: {e}")
+            return False
+    
+    def _save_snapshot(self, items: List[dict]) -> None:
+        if not self.snapshot_path:
+            return
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.snapshot_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"updated_at": self.updated_at.isoformat(), "rates": items}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            logger.error(f"Failed to save CBU rates snapshot: {e}")
+    
+    async def refresh(self) -> bool:
+        """Download rates once; on failure keep serving the previous ones."""
+        try:
+            response = await self.client.get(self.url)
+            response.raise_for_status()
+            items = response.json()
+        except Exception as e:
+            logger.error(f"Failed to refresh CBU rates: {e}")
+            return False
+        
+        self._store(items, datetime.now(timezone.utc))
+        self._save_snapshot(items)
+        logger.info(f"Refreshed {len(self._rates)} CBU rates")
+        if self.on_refresh:
+            await self.on_refresh(items)
+        return True
+    
+    async def _ensure_loaded(self) -> None:
+        # Cold cache: one caller downloads, concurrent callers wait for it
+        if self._rates:
+            return
+        async with self._lock:
+            if not self._rates and not self.load_snapshot():
+                await self.refresh()
+    
+    async def get_rates(self) -> List[CurrencyRate]:
+        """All rates in CBU order (empty list if never loaded)."""
+        await self._ensure_loaded()
+        return list(self._rates.values())
+    
+    async def get_rate(self, currency_code: str) -> Optional[CurrencyRate]:
+        await self._ensure_loaded()
+        return self._rates.get(currency_code.upper())
+    
+    async def _refresh_loop(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+    
+    async def start(self) -> None:
+        """Load the snapshot and start the background refresh loop (first refresh runs immediately)."""
+        self.load_snapshot()
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+    
+    async def stop(self) -> None:
+        """Stop the refresh loop and close the shared client."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+
+rate_cache = CBURateCache(
+    url=settings.cbu_rates_url,
+    snapshot_path=settings.cbu_snapshot_path,
+    refresh_interval=settings.cbu_refresh_interval_seconds,
+    on_refresh=store_daily_rates,  # Every good download also lands in exchange_rates
+)
+
+
 async def get_rate_for_currency(currency_code: str) -> Optional[CurrencyRate]:
     """
-    Get rate for a specific currency.
+    Get rate for a specific currency (from rate_cache).
     
     Args:
         currency_code: ISO 4217 currency code (e.g., "USD", "EUR")
@@ -134,27 +275,43 @@ async def get_rate_for_currency(currency_code: str) -> Optional[CurrencyRate]:
         CurrencyRate object or None if not found
     """
     try:
-        rates = await fetch_cbu_rates()
-        currency_code = currency_code.upper()
-        
-        for rate in rates:
-            if rate.code == currency_code:
-                return rate
-                
-        return None
+        return await rate_cache.get_rate(currency_code)
         
     except Exception as e:
         logger.error(f"Failed to get rate for {currency_code}: {e}")
         return None
 
 
-async def convert_to_uzs(amount: float, from_currency: str) -> Optional[float]:
+async def get_rate_on(currency_code: str, on_date: Optional[date] = None) -> Optional[Tuple[int, float, str]]:
+    """
+    (nominal, rate, rate date) to use for a conversion on `on_date`.
+    
+    Past dates come from the exchange_rates history; today, no date, or a
+    date before the stored history falls back to the live rate cache.
+    """
+    if on_date and on_date < date.today():
+        try:
+            historical = await rate_history.rate_on(currency_code, on_date)
+        except Exception as e:
+            logger.error(f"Historical rate lookup failed for {currency_code} on {on_date}: {e}")
+            historical = None
+        if historical:
+            return historical.nominal, float(historical.rate), historical.rate_date.isoformat()
+    
+    rate = await get_rate_for_currency(currency_code)
+    if not rate:
+        return None
+    return rate.nominal, rate.rate, parse_cbu_date(rate.date).isoformat() if rate.date else ""
+
+
+async def convert_to_uzs(amount: float, from_currency: str, on_date: Optional[date] = None) -> Optional[float]:
     """
     Convert amount from foreign currency to UZS.
     
     Args:
         amount: Amount in foreign currency
         from_currency: Source currency code
+        on_date: Transaction date (uses that day's CBU rate; default today)
         
     Returns:
         Amount in UZS or None if conversion failed
@@ -162,15 +319,16 @@ async def convert_to_uzs(amount: float, from_currency: str) -> Optional[float]:
     if from_currency.upper() == "UZS":
         return amount
         
-    rate = await get_rate_for_currency(from_currency)
-    if not rate:
+    found = await get_rate_on(from_currency, on_date)
+    if not found:
         return None
+    nominal, rate, rate_date = found
     
     # CBU rates are already per 1 unit (or per Nominal units)
     # Rate is how many UZS for 1 (or Nominal) unit of currency
-    uzs_amount = amount * (rate.rate / rate.nominal)
+    uzs_amount = amount * (rate / nominal)
     
-    logger.info(f"Converted {amount} {from_currency} → {uzs_amount:.2f} UZS (rate: {rate.rate})")
+    logger.info(f"Converted {amount} {from_currency} → {uzs_amount:.2f} UZS (rate: {rate} on {rate_date})")
     return uzs_amount
 
 
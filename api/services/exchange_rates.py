@@ -0,0 +1,152 @@
+"""Historical exchange-rate store (exchange_rates table) and date-accurate lookups."""
+import json
+import logging
+import time
+from bisect import bisect_right
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..database import AsyncSessionLocal
+from ..models.exchange_rate import ExchangeRate
+
+logger = logging.getLogger(__name__)
+
+# All currencies for one day
+CBU_ARCHIVE_URL = "https://cbu.uz/ru/arkhiv-kursov-valyut/json/all/{day}/"
+
+UPSERT_CHUNK_SIZE = 1000
+
+
+class HistoricalRate(NamedTuple):
+    """Rate in effect on a day (UZS per `nominal` units)."""
+    rate_date: date
+    nominal: int
+    rate: Decimal
+
+
+def parse_cbu_date(value: str) -> date:
+    """CBU dates are DD.MM.YYYY."""
+    return datetime.strptime(value, "%d.%m.%Y").date()
+
+
+def rows_from_cbu(items: Iterable[dict]) -> List[dict]:
+    """Map CBU JSON items to exchange_rates rows."""
+    return [
+        {
+            "currency": item["Ccy"].upper(),
+            "rate_date": parse_cbu_date(item["Date"]),
+            "nominal": int(item.get("Nominal", "1")),
+            "rate": Decimal(item["Rate"]),
+        }
+        for item in items
+        if item.get("Ccy") and item.get("Date") and item.get("Rate")
+    ]
+
+
+def load_fixture_rows(directory: str) -> List[dict]:
+    """Read every *.json file in a directory (each a CBU response) into rows."""
+    rows = []
+    for path in sorted(Path(directory).glob("*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            rows.extend(rows_from_cbu(json.load(f)))
+    return rows
+
+
+async def fetch_archive_day(client: httpx.AsyncClient, day: date) -> List[dict]:
+    """Download CBU rates for one past day (raw JSON items)."""
+    response = await client.get(CBU_ARCHIVE_URL.format(day=day.isoformat()))
+    response.raise_for_status()
+    return response.json()
+
+
+async def upsert_rates(db: AsyncSession, rows: List[dict]) -> int:
+    """Insert or overwrite rates in chunks of multi-row INSERTs. Caller commits."""
+    # One row per key, otherwise ON CONFLICT would touch a row twice in one statement
+    rows = list({(row["currency"], row["rate_date"]): row for row in rows}.values())
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = insert(ExchangeRate).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["currency", "rate_date"],
+                set_={"nominal": stmt.excluded.nominal, "rate": stmt.excluded.rate},
+            )
+        )
+    return len(rows)
+
+
+class RateHistory:
+    """
+    Per-currency rate series cached in memory.
+
+    The first lookup for a currency loads its whole history in one indexed
+    query; later lookups are a bisect over the sorted dates. A day without
+    a published rate (weekends, holidays) uses the latest earlier one.
+    """
+
+    def __init__(self, session_factory: Optional[async_sessionmaker] = None, ttl_seconds: float = 3600):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self._series: Dict[str, Tuple[float, List[date], List[HistoricalRate]]] = {}
+
+    def prime(self, currency: str, rates: Iterable[HistoricalRate]) -> None:
+        """Install a series directly (used after loading and for offline fixtures)."""
+        ordered = sorted(rates, key=lambda r: r.rate_date)
+        self._series[currency.upper()] = (
+            time.monotonic() + self.ttl_seconds,
+            [r.rate_date for r in ordered],
+            ordered,
+        )
+
+    def invalidate(self, currency: Optional[str] = None) -> None:
+        if currency:
+            self._series.pop(currency.upper(), None)
+        else:
+            self._series.clear()
+
+    async def _load(self, currency: str) -> None:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(ExchangeRate.rate_date, ExchangeRate.nominal, ExchangeRate.rate)
+                .where(ExchangeRate.currency == currency)
+                .order_by(ExchangeRate.rate_date)
+            )
+            self.prime(currency, (HistoricalRate(*row) for row in result.all()))
+
+    async def rate_on(self, currency: str, day: date) -> Optional[HistoricalRate]:
+        """Rate in effect on `day`, or None if the history starts later."""
+        currency = currency.upper()
+        cached = self._series.get(currency)
+        if cached is None or cached[0] <= time.monotonic():
+            if self.session_factory is None:
+                return None
+            await self._load(currency)
+            cached = self._series[currency]
+
+        _, dates, rates = cached
+        index = bisect_right(dates, day) - 1
+        return rates[index] if index >= 0 else None
+
+
+rate_history = RateHistory(AsyncSessionLocal)
+
+
+async def store_daily_rates(items: List[dict]) -> None:
+    """Persist a fresh CBU download (today's rates) into the history."""
+    rows = rows_from_cbu(items)
+    if not rows:
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            await upsert_rates(db, rows)
+            await db.commit()
+        for currency in {row["currency"] for row in rows}:
+            rate_history.invalidate(currency)
+    except Exception as e:
+        logger.error(f"Failed to store daily CBU rates: {e}")
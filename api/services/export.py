@@ -0,0 +1,167 @@
+"""Streaming encoders for transaction exports (CSV, NDJSON, Parquet)."""
+import csv
+import io
+import json
+import logging
+from typing import AsyncIterable, AsyncIterator, Sequence
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from ..models.category import Category
+from ..models.transaction import Transaction
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+EXPORT_COLUMNS = ["id", "transaction_date", "type", "amount", "currency", "category", "description"]
+
+# Rows fetched per server-side cursor round trip, and rows per Parquet row group
+EXPORT_BATCH_SIZE = 5000
+
+
+def export_rows_query(filtered_query):
+    """
+    Turn a filtered select(Transaction) into a plain-column export select.
+
+    Columns instead of ORM entities, so streamed rows never enter the
+    session identity map.
+    """
+    return filtered_query.with_only_columns(
+        Transaction.id,
+        Transaction.transaction_date,
+        Transaction.type,
+        Transaction.amount,
+        Transaction.currency,
+        Category.slug,
+        Transaction.description,
+    ).outerjoin(
+        Category, Transaction.category_id == Category.id
+    ).order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
+
+
+async def stream_export_rows(
+    session_factory: async_sessionmaker,
+    query,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[Sequence]:
+    """Yield row batches from a server-side cursor on a session owned by the stream."""
+    async with session_factory() as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield partition
+
+
+def _row_values(row) -> list:
+    tx_id, tx_date, type_, amount, currency, category, description = row
+    return [str(tx_id), tx_date.isoformat(), type_, str(amount), currency, category or "", description or ""]
+
+
+async def csv_chunks(batches: AsyncIterable[Sequence]) -> AsyncIterator[bytes]:
+    """Encode row batches as CSV, one chunk per batch (header first)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    async for batch in batches:
+        writer.writerows(_row_values(row) for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def ndjson_chunks(batches: AsyncIterable[Sequence]) -> AsyncIterator[bytes]:
+    """Encode row batches as newline-delimited JSON objects."""
+    async for batch in batches:
+        lines = [
+            json.dumps(dict(zip(EXPORT_COLUMNS, _row_values(row))), ensure_ascii=False)
+            for row in batch
+        ]
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink:
+    """
+    Write-only file object that hands out what was written so far.
+
+    Keeps a running position so the Parquet footer offsets stay correct
+    even though written bytes are released after every row group.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def parquet_chunks(batches: AsyncIterable[Sequence]) -> AsyncIterator[bytes]:
+    """
+    Encode row batches as Parquet, one row group per batch.
+
+    Only the current batch is buffered; the footer is emitted last. Needs pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(name, pa.string()) for name in EXPORT_COLUMNS])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+
+    try:
+        async for batch in batches:
+            if not batch:
+                continue
+            columns = zip(*(_row_values(row) for row in batch))
+            writer.write_table(pa.Table.from_arrays([pa.array(col, pa.string()) for col in columns], schema=schema))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+
+    tail = sink.drain()
+    if tail:
+        yield tail
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+ENCODERS = {
+    "csv": csv_chunks,
+    "ndjson": ndjson_chunks,
+    "parquet": parquet_chunks,
+}
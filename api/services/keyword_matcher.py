@@ -0,0 +1,85 @@
+"""
+Multi-pattern keyword matching (Aho–Corasick).
+
+The automaton is compiled once per keyword table and then finds every
+keyword occurring in a text in a single pass, independent of how many
+keywords the table holds.
+"""
+from collections import deque
+from typing import Generic, Mapping, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class KeywordMatcher(Generic[V]):
+    """Case-insensitive substring matcher over a keyword -> value table."""
+
+    def __init__(self, keywords: Mapping[str, V]):
+        self.keywords: list[str] = []
+        self.values: list[V] = []
+        # Node 0 is the root; each node has transitions, a failure link and
+        # the ids of every keyword ending there (own + via failure links).
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[int, ...]] = [()]
+
+        for keyword, value in keywords.items():
+            keyword = keyword.lower()
+            if not keyword:
+                continue
+            node = 0
+            for char in keyword:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = next_node
+            self._out[node] += (len(self.keywords),)
+            self.keywords.append(keyword)
+            self.values.append(value)
+
+        self._link()
+
+    def _link(self) -> None:
+        """Breadth-first pass that sets failure links and merges outputs."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] += self._out[self._fail[child]]
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def _scan(self, text: str) -> set[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: set[int] = set()
+        node = 0
+        for char in text.lower():
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+    def find_all(self, text: str) -> list[tuple[str, V]]:
+        """Every (keyword, value) found in the text, in table order."""
+        return [(self.keywords[i], self.values[i]) for i in sorted(self._scan(text))]
+
+    def longest(self, text: str) -> Optional[tuple[str, V]]:
+        """The longest keyword found in the text; earlier table entries win ties."""
+        found = self._scan(text)
+        if not found:
+            return None
+        best = min(found, key=lambda i: (-len(self.keywords[i]), i))
+        return self.keywords[best], self.values[best]
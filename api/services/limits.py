@@ -1,15 +1,58 @@
 
 from datetime import date
 from decimal import Decimal
-from typing import Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func
 
 from ..models.limit import Limit
-from ..models.transaction import Transaction
 from ..models.category import Category
+from ..models.user_daily_total import UserDailyTotal
+from .rollup import spent_query
+from .spend_tracker import month_key, spend_tracker
+
+
+def limit_status_query(user_id: UUID, *criteria):
+    """
+    Limits with category name and spent amount, for any number of limits.
+
+    One statement: limits LEFT JOIN categories and the expense rows of the
+    daily rollup inside each limit's period, grouped per limit. Extra
+    `criteria` are applied to Limit (e.g. period filters, Limit.id == x).
+    """
+    spent = func.coalesce(func.sum(UserDailyTotal.total), 0)
+
+    return select(Limit, Category.name, spent.label("spent")).outerjoin(
+        Category, Category.id == Limit.category_id
+    ).outerjoin(
+        UserDailyTotal,
+        and_(
+            UserDailyTotal.user_id == Limit.user_id,
+            UserDailyTotal.category_id == Limit.category_id,
+            UserDailyTotal.type == "expense",
+            UserDailyTotal.day >= Limit.period_start,
+            UserDailyTotal.day <= Limit.period_end,
+        ),
+    ).where(
+        Limit.user_id == user_id, *criteria
+    ).group_by(Limit.id, Category.name)
+
+
+async def fetch_limit_statuses(
+    db: AsyncSession,
+    user_id: UUID,
+    *criteria,
+) -> List[Tuple[Limit, Optional[str], Decimal]]:
+    """Run limit_status_query() and return (limit, category_name, spent) tuples, newest period first."""
+    result = await db.execute(
+        limit_status_query(user_id, *criteria)
+        .order_by(Limit.period_start.desc(), Category.name)
+        .execution_options(populate_existing=True)  # Fresh server-side timestamps after commit
+    )
+    return [(limit, category_name, Decimal(str(spent))) for limit, category_name, spent in result.all()]
+
 
 async def check_limit_thresholds(
     db: AsyncSession,
@@ -23,43 +66,58 @@ async def check_limit_thresholds(
     Check if adding 'amount_added' to 'category_id' expenses crosses any limit thresholds.
     Returns a warning message if crossed, else None.
     Thresholds: 50%, 75%, 90%, 100%.
+    
+    Reads the in-process spend counter (see spend_tracker); callers apply
+    their committed delta to it first, inside spend_tracker.writing().
+    Cold counters are seeded from SQL.
     """
-    # 1. Find active limit for this category and month
-    # Assuming monthly limits aligned with calendar month for now
-    start_of_month = date(transaction_date.year, transaction_date.month, 1)
+    key = month_key(user_id, category_id, transaction_date)
+    entry = spend_tracker.get(key)
     
-    limit_result = await db.execute(
-        select(Limit).where(
-            and_(
-                Limit.user_id == user_id,
-                Limit.category_id == category_id,
-                Limit.period_start == start_of_month
+    if entry is None:
+        # Cold counter: limit + category name in one query, spent from the rollup
+        # Assuming monthly limits aligned with calendar month for now
+        with spend_tracker.seeding(user_id) as ticket:
+            limit_result = await db.execute(
+                select(Limit.amount, Limit.period_start, Limit.period_end, Category.name)
+                .outerjoin(Category, Category.id == Limit.category_id)
+                .where(
+                    and_(
+                        Limit.user_id == user_id,
+                        Limit.category_id == category_id,
+                        Limit.period_start == key[2]
+                    )
+                )
+            )
+            limit_row = limit_result.first()
+            
+            spent = Decimal("0")
+            if limit_row:
+                spent_result = await db.execute(
+                    spent_query(user_id, category_id, limit_row.period_start, limit_row.period_end)
+                )
+                spent = Decimal(str(spent_result.scalar() or 0))
+            
+            # Not cached when a write of this user overlapped the reads
+            entry = spend_tracker.seed(
+                key,
+                limit_row.amount if limit_row else None,
+                limit_row.name if limit_row else None,
+                spent,
+                period_end=limit_row.period_end if limit_row else None,
+                ticket=ticket,
             )
-        )
-    )
-    limit = limit_result.scalar_one_or_none()
     
-    if not limit or limit.amount <= 0:
+    if entry.limit_amount is None or entry.limit_amount <= 0:
         return None
-        
-    spent_result = await db.execute(
-        select(func.coalesce(func.sum(Transaction.amount), 0)).where(
-            and_(
-                Transaction.user_id == user_id,
-                Transaction.category_id == category_id,
-                Transaction.type == "expense",
-                Transaction.transaction_date >= limit.period_start,
-                Transaction.transaction_date <= limit.period_end,
-            )
-        )
-    )
-    spent_db = Decimal(str(spent_result.scalar() or 0))
-    total_spent = spent_db
+    
+    total_spent = entry.spent
+    limit_amount = entry.limit_amount
     
     spent_before = total_spent - amount_added
     
-    percent_before = (spent_before / limit.amount) * 100
-    percent_after = (total_spent / limit.amount) * 100
+    percent_before = (spent_before / limit_amount) * 100
+    percent_after = (total_spent / limit_amount) * 100
     
     thresholds = [50, 75, 90, 100]
     crossed_threshold = None
@@ -71,8 +129,7 @@ async def check_limit_thresholds(
     if not crossed_threshold:
         return None
         
-    cat_result = await db.execute(select(Category.name).where(Category.id == category_id))
-    category_name = cat_result.scalar() or "Category"
+    category_name = entry.category_name or "Category"
     
     # Localization
     lang = language if language in ['ru', 'uz', 'en'] else 'en'
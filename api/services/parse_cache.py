@@ -0,0 +1,239 @@
+"""
+Cache of LLM parse decisions keyed by normalized message text.
+
+"Кофе 15к", "кофе 15 000" and "КОФЕ 15000" share the key "кофе <amount>":
+text is lowercased, the single amount is abstracted and currency words
+move to the end as "<code>" ("$4" and "4 dollars" match). Only the
+amount-independent decision (type, currency, category, description) is
+cached; the concrete amount of each message is re-applied on a hit. Messages with zero or several amounts are never
+cached, nor are results whose LLM amount disagrees with the local one.
+
+Entries live in an in-process LRU with a TTL, optionally backed by a
+shared disk (SQLite) or Redis store so workers and restarts reuse them.
+"""
+import asyncio
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import get_settings
+from .ai_parser import CURRENCY_PATTERNS, extract_amounts
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+DECISION_FIELDS = ("type", "currency", "description", "category_slug", "confidence")
+
+
+def normalize_message(text: str) -> Optional[Tuple[str, Decimal]]:
+    """Return (normalized text, amount), or None when the message has not exactly one amount."""
+    amounts = extract_amounts(text)
+    if len(amounts) != 1 or amounts[0][0] is None:
+        return None
+
+    amount, (start, end) = amounts[0]
+    normalized = f"{text[:start]} <amount> {text[end:]}".lower()
+    currencies = []
+    for code, pattern in CURRENCY_PATTERNS:
+        normalized, found = pattern.subn(" ", normalized)
+        if found:
+            currencies.append(f"<{code}>")
+    normalized = re.sub(r"[^\w<> ]+", " ", normalized)
+    return " ".join(normalized.split() + currencies), amount
+
+
+class SQLiteBackend:
+    """Parse decisions in a local SQLite file, shared by the workers of one host."""
+
+    def __init__(self, path: str, max_entries: int):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS parse_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS parse_cache_expires ON parse_cache (expires_at)")
+        self._db.commit()
+
+    def _get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM parse_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set(self, key: str, value: dict, ttl_seconds: float) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO parse_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time() + ttl_seconds),
+            )
+            self._db.execute("DELETE FROM parse_cache WHERE expires_at <= ?", (time.time(),))
+            self._db.execute(
+                "DELETE FROM parse_cache WHERE key IN "
+                "(SELECT key FROM parse_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    async def get(self, key: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: dict, ttl_seconds: float) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl_seconds)
+
+
+class RedisBackend:
+    """Parse decisions in Redis, shared by every API instance."""
+
+    def __init__(self, url: str, prefix: str = "parse_cache:"):
+        import redis.asyncio as redis  # Optional dependency
+
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[dict]:
+        value = await self._redis.get(self.prefix + key)
+        return json.loads(value) if value else None
+
+    async def set(self, key: str, value: dict, ttl_seconds: float) -> None:
+        await self._redis.set(self.prefix + key, json.dumps(value, ensure_ascii=False), ex=int(ttl_seconds))
+
+
+class ParseCache:
+    """TTL + LRU bounded parse-decision cache with an optional shared backend."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int, backend=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.backend = backend
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "uncacheable": 0,
+            "stores": 0,
+            "evictions": 0,
+            "backend_errors": 0,
+            "saved_latency_ms": 0.0,
+            "saved_tokens": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "hit_ratio": round(self.hit_ratio, 4), "entries": len(self)}
+
+    def _remember(self, key: str, entry: dict, expires_at: float) -> None:
+        self._entries[key] = (expires_at, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def _load(self, key: str) -> Optional[dict]:
+        cached = self._entries.get(key)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                return cached[1]
+            del self._entries[key]
+
+        if self.backend is None:
+            return None
+        try:
+            entry = await self.backend.get(key)
+        except Exception:
+            logger.exception("Parse cache backend read failed")
+            self.stats["backend_errors"] += 1
+            return None
+        if entry is not None:
+            self._remember(key, entry, time.monotonic() + self.ttl_seconds)
+        return entry
+
+    async def lookup(self, text: str, model_name: str) -> Optional[Dict[str, Any]]:
+        """Cached parse result with this message's amount, or None."""
+        normalized = normalize_message(text)
+        if normalized is None:
+            self.stats["uncacheable"] += 1
+            return None
+
+        key, amount = normalized
+        entry = await self._load(f"{model_name}:{key}")
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        self.stats["saved_latency_ms"] += entry["latency_ms"]
+        self.stats["saved_tokens"] += entry["tokens"]
+        return {**entry["decision"], "amount": amount}
+
+    async def store(
+        self,
+        text: str,
+        model_name: str,
+        result: Dict[str, Any],
+        latency_ms: float,
+        tokens: int,
+    ) -> bool:
+        """Cache the decision part of an LLM result; returns whether it was cacheable."""
+        normalized = normalize_message(text)
+        if normalized is None or Decimal(str(result["amount"])) != normalized[1]:
+            return False
+
+        key = f"{model_name}:{normalized[0]}"
+        entry = {
+            "decision": {field: result[field] for field in DECISION_FIELDS},
+            "latency_ms": latency_ms,
+            "tokens": tokens,
+        }
+        self._remember(key, entry, time.monotonic() + self.ttl_seconds)
+        self.stats["stores"] += 1
+
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, entry, self.ttl_seconds)
+            except Exception:
+                logger.exception("Parse cache backend write failed")
+                self.stats["backend_errors"] += 1
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def build_backend(kind: str):
+    """Shared store for the configured backend; None keeps the cache in memory only."""
+    if kind == "disk":
+        return SQLiteBackend(settings.parse_cache_path, settings.parse_cache_max_entries)
+    if kind == "redis":
+        try:
+            return RedisBackend(settings.parse_cache_redis_url)
+        except ImportError:
+            logger.error("PARSE_CACHE_BACKEND=redis but the redis package is not installed; using memory")
+    elif kind != "memory":
+        logger.error(f"Unknown parse cache backend {kind!r}; using memory")
+    return None
+
+
+parse_cache = ParseCache(
+    ttl_seconds=settings.parse_cache_ttl_seconds,
+    max_entries=settings.parse_cache_max_entries,
+    backend=build_backend(settings.parse_cache_backend),
+)
@@ -0,0 +1,186 @@
+"""Incremental maintenance of the user_daily_totals rollup."""
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import select, func, and_, delete, cast, Date, literal, literal_column, Integer
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.transaction import Transaction
+from ..models.user_daily_total import UserDailyTotal
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_KEY = ["user_id", "day", "category_id", "type"]
+
+
+def transaction_day(column=Transaction.transaction_date):
+    """UTC calendar day of a timestamptz column (the rollup's `day`)."""
+    # Inlined literal so the same expression can appear in SELECT and GROUP BY
+    return cast(func.timezone(literal_column("'UTC'"), column), Date)
+
+
+def _upsert(rows_select):
+    """INSERT ... SELECT into the rollup, adding to existing rows on conflict."""
+    stmt = insert(UserDailyTotal).from_select(
+        ["user_id", "day", "category_id", "type", "total", "tx_count"],
+        rows_select,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=ROLLUP_KEY,
+        set_={
+            "total": UserDailyTotal.total + stmt.excluded.total,
+            "tx_count": UserDailyTotal.tx_count + stmt.excluded.tx_count,
+        },
+    )
+
+
+async def apply_transaction_delta(db: AsyncSession, transaction_id: UUID, sign: int = 1) -> None:
+    """
+    Add (sign=1) or subtract (sign=-1) a stored transaction from the rollup.
+
+    Reads the row as the database sees it, so call it after flush() for
+    inserts/updates and before delete() for deletions. Runs inside the
+    caller's transaction; nothing is committed here.
+
+    Updates are expressed as -1 on the old row state, then +1 on the new one.
+    """
+    await db.execute(
+        _upsert(
+            select(
+                Transaction.user_id,
+                transaction_day(),
+                Transaction.category_id,
+                Transaction.type,
+                Transaction.amount * sign,
+                literal(sign, Integer),
+            ).where(Transaction.id == transaction_id)
+        )
+    )
+
+
+async def add_transactions_to_rollup(db: AsyncSession, transaction_ids: List[UUID]) -> None:
+    """Add freshly inserted transactions to the rollup with one grouped upsert."""
+    if transaction_ids:
+        await db.execute(_upsert(_raw_totals_select(transaction_ids=transaction_ids)))
+
+
+def spent_query(user_id: UUID, category_id: UUID, period_start: date, period_end: date):
+    """Expense total for one category over an inclusive day range."""
+    return select(func.coalesce(func.sum(UserDailyTotal.total), 0)).where(
+        and_(
+            UserDailyTotal.user_id == user_id,
+            UserDailyTotal.category_id == category_id,
+            UserDailyTotal.type == "expense",
+            UserDailyTotal.day >= period_start,
+            UserDailyTotal.day <= period_end,
+        )
+    )
+
+
+def transaction_count_query(user_id: UUID, type: Optional[str] = None, category_id: Optional[UUID] = None):
+    """Exact transaction count for a user (optionally by type/category), from the rollup."""
+    query = select(func.coalesce(func.sum(UserDailyTotal.tx_count), 0)).where(
+        UserDailyTotal.user_id == user_id
+    )
+    if type:
+        query = query.where(UserDailyTotal.type == type)
+    if category_id:
+        query = query.where(UserDailyTotal.category_id == category_id)
+    return query
+
+
+def _raw_totals_select(user_id: Optional[UUID] = None, transaction_ids: Optional[List[UUID]] = None):
+    """Rollup rows recomputed from the raw transactions table (optionally a subset of rows)."""
+    query = select(
+        Transaction.user_id,
+        transaction_day().label("day"),
+        Transaction.category_id,
+        Transaction.type,
+        func.sum(Transaction.amount).label("total"),
+        func.count(Transaction.id).label("tx_count"),
+    )
+    if user_id:
+        query = query.where(Transaction.user_id == user_id)
+    if transaction_ids is not None:
+        query = query.where(Transaction.id.in_(transaction_ids))
+    return query.group_by(
+        Transaction.user_id, transaction_day(), Transaction.category_id, Transaction.type
+    )
+
+
+async def rebuild_daily_totals(db: AsyncSession, user_id: Optional[UUID] = None) -> int:
+    """
+    Recompute the rollup from raw transactions (all users, or one user).
+
+    Used for the initial backfill and to repair drift from writes that
+    bypass the API (manual SQL, category reseeds). Caller commits.
+    """
+    delete_stmt = delete(UserDailyTotal)
+    if user_id:
+        delete_stmt = delete_stmt.where(UserDailyTotal.user_id == user_id)
+    await db.execute(delete_stmt)
+
+    result = await db.execute(_upsert(_raw_totals_select(user_id)))
+    logger.info(f"Rebuilt daily totals ({'user ' + str(user_id) if user_id else 'all users'}): {result.rowcount} rows")
+    return result.rowcount
+
+
+async def find_rollup_drift(db: AsyncSession, user_id: Optional[UUID] = None) -> List[Dict[str, Any]]:
+    """
+    Diff the rollup against the raw table.
+
+    Returns one entry per (user, day, category, type) key whose total or
+    count differs; rows with a zero count are treated as absent.
+    """
+    raw = _raw_totals_select(user_id).subquery("raw")
+
+    rollup_query = select(UserDailyTotal).where(UserDailyTotal.tx_count != 0)
+    if user_id:
+        rollup_query = rollup_query.where(UserDailyTotal.user_id == user_id)
+    rollup = rollup_query.subquery("rollup")
+
+    key_match = and_(
+        raw.c.user_id == rollup.c.user_id,
+        raw.c.day == rollup.c.day,
+        raw.c.category_id.is_not_distinct_from(rollup.c.category_id),
+        raw.c.type == rollup.c.type,
+    )
+    raw_total = func.coalesce(raw.c.total, 0)
+    raw_count = func.coalesce(raw.c.tx_count, 0)
+    rollup_total = func.coalesce(rollup.c.total, 0)
+    rollup_count = func.coalesce(rollup.c.tx_count, 0)
+
+    result = await db.execute(
+        select(
+            func.coalesce(raw.c.user_id, rollup.c.user_id).label("user_id"),
+            func.coalesce(raw.c.day, rollup.c.day).label("day"),
+            func.coalesce(raw.c.category_id, rollup.c.category_id).label("category_id"),
+            func.coalesce(raw.c.type, rollup.c.type).label("type"),
+            raw_total.label("raw_total"),
+            rollup_total.label("rollup_total"),
+            raw_count.label("raw_count"),
+            rollup_count.label("rollup_count"),
+        ).select_from(
+            raw.join(rollup, key_match, full=True)
+        ).where(
+            (raw_total != rollup_total) | (raw_count != rollup_count)
+        )
+    )
+
+    return [
+        {
+            "user_id": row.user_id,
+            "day": row.day,
+            "category_id": row.category_id,
+            "type": row.type,
+            "raw_total": Decimal(row.raw_total),
+            "rollup_total": Decimal(row.rollup_total),
+            "raw_count": row.raw_count,
+            "rollup_count": row.rollup_count,
+        }
+        for row in result.all()
+    ]
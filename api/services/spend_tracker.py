@@ -0,0 +1,226 @@
+"""
+In-process running-spend counters for limit threshold checks.
+
+Keyed by (user, category, month). An entry caches the month's limit (or
+its absence), the category name and the expense total, so a threshold
+check on a hot key costs no queries. Entries are seeded lazily by the SQL
+path in check_limit_thresholds(), moved by deltas after each committed
+write, expire after a TTL and are evicted LRU beyond a size bound.
+
+Writers wrap their commit and delta in writing(user_id). A seed (or a
+reconcile query) that overlaps a write of the same user is not cached:
+the snapshot may or may not include that write, and its delta may land
+after the seed, so caching could count it twice.
+
+Counters are per worker: writes handled by another process are only seen
+after the TTL or the next reconcile_spend_counters() run.
+"""
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from .rollup import spent_query
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SpendKey = Tuple[UUID, UUID, date]
+
+
+def month_key(user_id: UUID, category_id: UUID, day: date) -> SpendKey:
+    return (user_id, category_id, date(day.year, day.month, 1))
+
+
+def month_end(month_start: date) -> date:
+    return (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+@dataclass
+class SpendEntry:
+    """Cached limit state for one (user, category, month)."""
+    limit_amount: Optional[Decimal]  # None: no limit set for this month
+    category_name: Optional[str]
+    spent: Decimal
+    expires_at: float
+    period_end: Optional[date] = None  # Last day of the limit's period (month end when unset)
+    generation: int = 0  # Bumped by every delta; reconcile skips keys that moved meanwhile
+
+
+@dataclass
+class SeedTicket:
+    """An in-flight SQL read for one user; dirty once a write of that user overlaps it."""
+    user_id: UUID
+    dirty: bool = False
+
+
+class SpendTracker:
+    """TTL + LRU bounded map of running-spend counters."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[SpendKey, SpendEntry]" = OrderedDict()
+        self._writers: Dict[UUID, int] = {}
+        self._seeds: Dict[UUID, List[SeedTicket]] = {}
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "corrections": 0, "seed_conflicts": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: SpendKey) -> Optional[SpendEntry]:
+        """Return a fresh entry (and mark it recently used), or None when cold."""
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry
+
+    @contextmanager
+    def writing(self, user_id: UUID) -> Iterator[None]:
+        """
+        Mark a write of `user_id` in flight: wrap the commit and the
+        apply_delta()/track() that follows it. Reads overlapping it are
+        marked dirty.
+        """
+        self._writers[user_id] = self._writers.get(user_id, 0) + 1
+        for ticket in self._seeds.get(user_id, ()):
+            ticket.dirty = True
+        try:
+            yield
+        finally:
+            remaining = self._writers[user_id] - 1
+            if remaining:
+                self._writers[user_id] = remaining
+            else:
+                del self._writers[user_id]
+            for ticket in self._seeds.get(user_id, ()):
+                ticket.dirty = True
+
+    @contextmanager
+    def seeding(self, user_id: UUID) -> Iterator[SeedTicket]:
+        """Wrap the SQL read behind seed(); the ticket turns dirty if a write of the user overlaps it."""
+        ticket = SeedTicket(user_id, dirty=user_id in self._writers)
+        self._seeds.setdefault(user_id, []).append(ticket)
+        try:
+            yield ticket
+        finally:
+            tickets = self._seeds[user_id]
+            tickets.remove(ticket)
+            if not tickets:
+                del self._seeds[user_id]
+
+    def seed(
+        self,
+        key: SpendKey,
+        limit_amount: Optional[Decimal],
+        category_name: Optional[str],
+        spent: Decimal,
+        period_end: Optional[date] = None,
+        ticket: Optional[SeedTicket] = None,
+    ) -> SpendEntry:
+        """
+        Store (and return) state freshly read from the database.
+
+        With a dirty `ticket` the entry is returned for this check only and
+        the key stays cold, so the next check reads the database again.
+        """
+        entry = SpendEntry(
+            limit_amount=limit_amount,
+            category_name=category_name,
+            spent=spent,
+            expires_at=time.monotonic() + self.ttl_seconds,
+            period_end=period_end,
+        )
+        if ticket is not None and ticket.dirty:
+            self.stats["seed_conflicts"] += 1
+            return entry
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        return entry
+
+    def apply_delta(self, user_id: UUID, category_id: Optional[UUID], day: date, delta: Decimal) -> None:
+        """
+        Move a hot counter by a committed expense change.
+
+        Cold keys are left alone; they are seeded from the database (which
+        already includes the change) on the next check.
+        """
+        if not category_id or not delta:
+            return
+        entry = self._entries.get(month_key(user_id, category_id, day))
+        if entry is not None:
+            entry.spent += delta
+            entry.generation += 1
+
+    def track(self, transaction, sign: int = 1) -> None:
+        """apply_delta() for a stored transaction (no-op for income)."""
+        if transaction.type == "expense":
+            self.apply_delta(
+                transaction.user_id,
+                transaction.category_id,
+                transaction.transaction_date.date(),
+                transaction.amount * sign,
+            )
+
+    def invalidate(self, user_id: UUID, category_id: Optional[UUID] = None) -> None:
+        """Drop a user's entries (optionally one category), e.g. after a limit change."""
+        for key in [k for k in self._entries if k[0] == user_id and (category_id is None or k[1] == category_id)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def reconcile(self, db: AsyncSession) -> int:
+        """
+        Recompute every hot counter that has a limit from the rollup.
+
+        Each counter is summed over its own limit period (spent_query, the
+        same query that seeded it). A counter that received a delta, was
+        re-seeded, or whose user wrote while its query ran is left for the
+        next run rather than overwritten with a snapshot that may not match
+        the deltas applied to it. Drifted
+        counters are corrected in place. Returns the number of corrections.
+        """
+        hot = [(key, entry) for key, entry in self._entries.items() if entry.limit_amount is not None]
+
+        corrections = 0
+        for key, entry in hot:
+            generation = entry.generation
+            user_id, category_id, period_start = key
+            with self.seeding(user_id) as ticket:
+                result = await db.execute(
+                    spent_query(user_id, category_id, period_start, entry.period_end or month_end(period_start))
+                )
+            expected = Decimal(str(result.scalar() or 0))
+            if ticket.dirty or self._entries.get(key) is not entry or entry.generation != generation:
+                continue
+            if entry.spent != expected:
+                logger.warning(f"Spend counter drift for {key}: {entry.spent} -> {expected}")
+                entry.spent = expected
+                corrections += 1
+
+        self.stats["corrections"] += corrections
+        return corrections
+
+
+spend_tracker = SpendTracker(
+    ttl_seconds=settings.spend_counter_ttl_seconds,
+    max_entries=settings.spend_counter_max_entries,
+)
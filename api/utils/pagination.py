@@ -0,0 +1,26 @@
+"""
+Opaque keyset cursors for (transaction_date, id) ordered listings.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+from uuid import UUID
+
+
+def encode_cursor(transaction_date: datetime, transaction_id: UUID) -> str:
+    """Encode the sort key of the last returned row."""
+    payload = json.dumps([transaction_date.isoformat(), str(transaction_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Decode a cursor produced by encode_cursor(). Raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date_str, id_str = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(date_str, str) or not isinstance(id_str, str):
+            raise ValueError("cursor fields must be strings")
+        return datetime.fromisoformat(date_str), UUID(id_str)
+    except (TypeError, ValueError, AttributeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
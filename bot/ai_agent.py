@@ -1,192 +1,183 @@
 """AI Agent with OpenAI integration and tool support."""
+import asyncio
 import json
 import logging
 import datetime
-from typing import Dict, Any, List
+import weakref
+from typing import Dict, Any, List, Optional, Callable
 from openai import AsyncOpenAI
-from openai.types.chat import ChatCompletionMessageToolCall as ToolCall
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageToolCall as ToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function
+
+from shared.llm_scheduler import llm_scheduler
 
 from .config import config
 from .api_client import BarakaAPIClient
 from .dialog_context import dialog_context
+from .request_context import UpdateContext
 from .categories_data import DEFAULT_CATEGORIES  # <--- Imported category data
 
 logger = logging.getLogger(__name__)
 
+# One OpenAI client (and connection pool) for every agent; agents are built per message
+_openai_client: Optional[AsyncOpenAI] = None
+_openai_client_loop: Optional[asyncio.AbstractEventLoop] = None
 
-class AIAgent:
-    """AI Agent using OpenAI Function Calling for transaction management."""
-    
-    def __init__(self, api_client: BarakaAPIClient):
-        self.api_client = api_client
-        self.client = AsyncOpenAI(
+
+def get_openai_client() -> AsyncOpenAI:
+    """The shared client, recreated when the running event loop changes."""
+    global _openai_client, _openai_client_loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if _openai_client is None or (loop is not None and _openai_client_loop is not loop):
+        _openai_client = AsyncOpenAI(
             api_key=config.OPENAI_API_KEY,
             timeout=120.0  # Increased timeout to 120s
         )
-        self.model = "gpt-5.1"  
-        
-        self.tools = [
-            # ... tools (unchanged) ...
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_transaction",
-                    "description": "Create a new transaction (expense or income)",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "amount": {"type": "number", "description": "Transaction amount"},
-                            "currency": {"type": "string", "enum": ["uzs", "usd", "eur", "rub", "gbp", "cny", "kzt", "aed", "try"], "description": "Currency code (uzs, usd, eur, rub, etc.)"},
-                            "category_slug": {"type": "string", "description": "Category slug (must be from available list)"},
-                            "description": {"type": "string", "description": "Description of the transaction"},
-                            "date": {"type": "string", "description": "Date in YYYY-MM-DD format (optional)"},
-                            "type": {"type": "string", "enum": ["income", "expense"], "description": "Transaction type"}
-                        },
-                        "required": ["amount", "currency", "category_slug", "type"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_balance",
-                    "description": "Get current balance and limits status",
-                    "parameters": {"type": "object", "properties": {}}
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_statistics",
-                    "description": "Get expense statistics for a period",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "period": {
-                                "type": "string",
-                                "enum": ["today", "week", "month", "year"],
-                                "description": "Time period for statistics"
-                            }
-                        },
-                        "required": ["period"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_category",
-                    "description": "Create a new category",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string", "description": "Category name (in user's language)"},
-                            "slug": {"type": "string", "description": "English unique slug (e.g. 'server_costs' for 'Серверы')"},
-                            "type": {"type": "string", "enum": ["income", "expense"], "description": "Category type"},
-                            "icon": {"type": "string", "description": "Emoji icon for the category"},
-                            "color": {"type": "string", "description": "Color in HEX format (e.g. #FF0000)"}
-                        },
-                        "required": ["name", "type", "icon"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_debt",
-                    "description": "Record a new debt (someone owes me or I owe someone)",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "person_name": {"type": "string", "description": "Name of the person"},
-                            "amount": {"type": "number", "description": "Debt amount"},
-                            "currency": {"type": "string", "enum": ["uzs", "usd"], "description": "Currency code"},
-                            "type": {"type": "string", "enum": ["i_owe", "owe_me"], "description": "Debt type: 'i_owe' if I borrowed, 'owe_me' if I lent"},
-                            "description": {"type": "string", "description": "Description (optional)"},
-                            "due_date": {"type": "string", "description": "Due date in YYYY-MM-DD format (optional)"}
-                        },
-                        "required": ["person_name", "amount", "currency", "type"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "settle_debt",
-                    "description": "Mark a debt as paid/settled",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "person_name": {"type": "string", "description": "Name of the person to settle debt with"},
-                            "amount": {"type": "number", "description": "Amount to pay (optional, if not specified tries to settle full debt)"}
-                        },
-                        "required": ["person_name"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "set_limit",
-                    "description": "Set a monthly budget limit for a category",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "category_slug": {"type": "string", "description": "Category slug"},
-                            "amount": {"type": "number", "description": "Limit amount"},
-                            "period": {"type": "string", "enum": ["month"], "description": "Period (default: month)"}
-                        },
-                        "required": ["category_slug", "amount"]
+        _openai_client_loop = loop
+    return _openai_client
+
+
+async def close_openai_client():
+    """Close the shared client (bot shutdown)."""
+    global _openai_client
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+
+# Tools whose results are rendered from i18n templates instead of a second completion
+LOCAL_RENDER_TOOLS = {"create_transaction", "create_debt", "settle_debt", "set_limit"}
+agent_stats = {"followup_calls": 0, "followup_calls_avoided": 0}
+
+# Tool calls of one user run concurrently up to this bound; the API is shared by everyone
+TOOL_CONCURRENCY_PER_USER = 4
+_tool_slots: "weakref.WeakValueDictionary[int, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+# Run before the other calls of the turn, which may use what they create
+ORDERED_FIRST_TOOLS = {"create_category"}
+
+AGENT_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "create_transaction",
+            "description": "Create a new transaction (expense or income)",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "amount": {"type": "number", "description": "Transaction amount"},
+                    "currency": {"type": "string", "enum": ["uzs", "usd", "eur", "rub", "gbp", "cny", "kzt", "aed", "try"], "description": "Currency code (uzs, usd, eur, rub, etc.)"},
+                    "category_slug": {"type": "string", "description": "Category slug (must be from available list)"},
+                    "description": {"type": "string", "description": "Description of the transaction"},
+                    "date": {"type": "string", "description": "Date in YYYY-MM-DD format (optional)"},
+                    "type": {"type": "string", "enum": ["income", "expense"], "description": "Transaction type"}
+                },
+                "required": ["amount", "currency", "category_slug", "type"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_balance",
+            "description": "Get current balance and limits status",
+            "parameters": {"type": "object", "properties": {}}
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_statistics",
+            "description": "Get expense statistics for a period",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "period": {
+                        "type": "string",
+                        "enum": ["today", "week", "month", "year"],
+                        "description": "Time period for statistics"
                     }
-                }
+                },
+                "required": ["period"]
             }
-        ]
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_category",
+            "description": "Create a new category",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string", "description": "Category name (in user's language)"},
+                    "slug": {"type": "string", "description": "English unique slug (e.g. 'server_costs' for 'Серверы')"},
+                    "type": {"type": "string", "enum": ["income", "expense"], "description": "Category type"},
+                    "icon": {"type": "string", "description": "Emoji icon for the category"},
+                    "color": {"type": "string", "description": "Color in HEX format (e.g. #FF0000)"}
+                },
+                "required": ["name", "type", "icon"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_debt",
+            "description": "Record a new debt (someone owes me or I owe someone)",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "person_name": {"type": "string", "description": "Name of the person"},
+                    "amount": {"type": "number", "description": "Debt amount"},
+                    "currency": {"type": "string", "enum": ["uzs", "usd"], "description": "Currency code"},
+                    "type": {"type": "string", "enum": ["i_owe", "owe_me"], "description": "Debt type: 'i_owe' if I borrowed, 'owe_me' if I lent"},
+                    "description": {"type": "string", "description": "Description (optional)"},
+                    "due_date": {"type": "string", "description": "Due date in YYYY-MM-DD format (optional)"}
+                },
+                "required": ["person_name", "amount", "currency", "type"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "settle_debt",
+            "description": "Mark a debt as paid/settled",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "person_name": {"type": "string", "description": "Name of the person to settle debt with"},
+                    "amount": {"type": "number", "description": "Amount to pay (optional, if not specified tries to settle full debt)"}
+                },
+                "required": ["person_name"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "set_limit",
+            "description": "Set a monthly budget limit for a category",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "category_slug": {"type": "string", "description": "Category slug"},
+                    "amount": {"type": "number", "description": "Limit amount"},
+                    "period": {"type": "string", "enum": ["month"], "description": "Period (default: month)"}
+                },
+                "required": ["category_slug", "amount"]
+            }
+        }
+    }
+]
 
+# Static instructions; built once and sent first so the provider can reuse
+# the cached prompt prefix (tools + this text) across users and days.
+# Per-user and per-day context goes in a separate, later system message.
+AGENT_SYSTEM_PROMPT = """You are Midas - an intelligent, friendly, and CONCISE financial assistant.
 
-    
-    async def process_message(self, user_id: int, message: str) -> dict:
-        """Process user message with AI agent.
-        
-        Returns dict with:
-        - response: str - AI response text
-        - parsed_transactions: List[Dict] - transactions awaiting confirmation
-        """
-        from .user_storage import storage
-        from .i18n import t
-        lang = storage.get_user_language(user_id) or 'uz'
-        
-        try:
-            # Track parsed transactions
-            parsed_transactions = []
-            
-            # Add user message to context
-            dialog_context.add_message(user_id, "user", message)
-            
-            # Initialize created_transactions list
-            created_transactions = []
-            
-            # Get fresh categories from API to update system prompt
-            try:
-                categories = await self.api_client.get_categories()
-                expense_slugs = [c['slug'] for c in categories if c.get('type') == 'expense']
-                income_slugs = [c['slug'] for c in categories if c.get('type') == 'income']
-            except Exception as e:
-                logger.error(f"Failed to fetch categories for prompt: {e}")
-                # Fallback to defaults
-                from .categories_data import DEFAULT_CATEGORIES
-                expense_slugs = [c['slug'] for c in DEFAULT_CATEGORIES if c['type'] == 'expense']
-                income_slugs = [c['slug'] for c in DEFAULT_CATEGORIES if c['type'] == 'income']
-
-            # Helper to format slugs
-            def format_slugs(slugs):
-                lines = []
-                for i in range(0, len(slugs), 10):
-                    lines.append(", ".join(slugs[i:i+10]))
-                return "\n".join(lines)
-
-            # Dynamic system prompt with FRESH categories
-            dynamic_prompt = f"""You are Midas - an intelligent, friendly, and CONCISE financial assistant.
-            
 CAPABILITIES:
 1. Register transactions
 2. Show balance/limits
@@ -195,15 +186,6 @@ CAPABILITIES:
 5. Manage debts
 6. Set budgets/limits (e.g. "Limit food 200k")
 
-CURRENT DATE: {datetime.datetime.now().strftime('%Y-%m-%d')}
-
-AVAILABLE CATEGORIES (use slug):
-EXPENSES: 
-{format_slugs(expense_slugs)}
-
-INCOME: 
-{format_slugs(income_slugs)}
-
 CATEGORY MAPPING RULES:
 - "food" / "ovqat" / "еда" -> groceries (if cooking ingredients) OR cafes
 - "taxi" -> taxi
@@ -268,23 +250,180 @@ Action: create_debt(type="owe_me", person_name="Daler", amount=500000)
 User: "Correction balance 745653"
 Action: get_balance() -> calculate diff -> create_transaction(category="other_expense"/"other_income")
 """
+
+
+def format_slugs(slugs: List[str]) -> str:
+    return "\n".join(", ".join(slugs[i:i + 10]) for i in range(0, len(slugs), 10))
+
+
+def category_prompt_section(categories: List[Dict[str, Any]]) -> str:
+    expense_slugs = [c['slug'] for c in categories if c.get('type') == 'expense']
+    income_slugs = [c['slug'] for c in categories if c.get('type') == 'income']
+    return (
+        "AVAILABLE CATEGORIES (use slug):\n"
+        f"EXPENSES: \n{format_slugs(expense_slugs)}\n\n"
+        f"INCOME: \n{format_slugs(income_slugs)}\n"
+    )
+
+
+def format_amount(value: Any) -> str:
+    return f"{float(value or 0):,.0f}".replace(",", " ")
+
+
+def render_tool_results(results: List[tuple], lang: str) -> str:
+    """Reply text for self-describing tool results: [(tool name, result), ...]."""
+    from .i18n import t, translate_category
+
+    lines = []
+    for name, result in results:
+        if result.get("premium_required"):
+            lines.append(t("currency.multi_currency_upsell", lang,
+                           amount=result.get("original_amount"), currency=result.get("original_currency")))
+        elif name == "create_transaction":
+            emoji = t(f"transactions.type_emoji.{result.get('type', 'expense')}", lang)
+            line = (f"{t('transactions.created', lang)}\n{emoji} {format_amount(result.get('amount'))} "
+                    f"{str(result.get('currency', 'uzs')).upper()} — {translate_category(result.get('category'), lang)}")
+            if result.get("description"):
+                line += f" ({result['description']})"
+            if result.get("warning"):
+                line += f"\n⚠️ {result['warning']}"
+            lines.append(line)
+        elif name == "create_debt":
+            side = t("debts.i_owe" if result.get("type") == "i_owe" else "debts.owe_me", lang)
+            lines.append(f"{t('debts.new_debt_created', lang)}\n{side}: {result.get('person')} — "
+                         f"{format_amount(result.get('amount'))}")
+        elif name == "settle_debt":
+            lines.append(f"{t('debts.debt_settled', lang)}\n{result.get('person')} — "
+                         f"{format_amount(result.get('amount'))} {str(result.get('currency', 'uzs')).upper()}")
+        elif name == "set_limit":
+            lines.append(t("transactions.limit_set", lang,
+                           category=translate_category(result.get("category"), lang),
+                           amount=format_amount(result.get("amount"))))
+    return "\n\n".join(lines)
+
+
+class AIAgent:
+    """AI Agent using OpenAI Function Calling for transaction management."""
+    
+    def __init__(self, api_client: BarakaAPIClient, ctx: Optional[UpdateContext] = None):
+        self.api_client = api_client
+        self.ctx = ctx
+        self.client = get_openai_client()
+        self.model = "gpt-5.1"  
+        
+        self.tools = AGENT_TOOLS
+
+
+    
+    def _context(self, user_id: int) -> UpdateContext:
+        """Lookups of the current update (a fresh context when the handler did not pass one)."""
+        if self.ctx is None or self.ctx.user_id != user_id:
+            self.ctx = UpdateContext(user_id, self.api_client)
+        return self.ctx
+
+    async def _user_tier(self, user_id: int) -> str:
+        """Subscription tier for LLM scheduling priority."""
+        try:
+            return await self._context(user_id).tier()
+        except Exception as e:
+            logger.warning(f"Could not fetch subscription tier: {e}")
+            return "free"
+
+    async def _categories(self, user_id: int, refresh: bool = False) -> tuple:
+        """User's categories and their prompt section."""
+        ctx = self._context(user_id)
+        try:
+            categories = await (ctx.refresh_categories() if refresh else ctx.categories())
+        except Exception as e:
+            logger.error(f"Failed to fetch categories for prompt: {e}")
+            # Fallback to defaults, not cached
+            return DEFAULT_CATEGORIES, category_prompt_section(DEFAULT_CATEGORIES)
+        # Cached next to the categories; rebuilt only when the list changes
+        return categories, ctx.derived("category_section", categories, category_prompt_section)
+
+    async def _complete(
+        self, tier: str, on_text: Optional[Callable[[str], None]], **kwargs
+    ) -> ChatCompletionMessage:
+        """Message of a completion; streamed when `on_text` is given (called with the text so far)."""
+        if on_text is None:
+            response = await llm_scheduler.chat(self.client, tier=tier, model=self.model, **kwargs)
+            return response.choices[0].message
+
+        content: List[str] = []
+        calls: Dict[int, Dict[str, str]] = {}  # index -> id, name, arguments
+
+        def on_chunk(chunk):
+            if not chunk.choices:
+                return  # Trailing usage chunk
+            delta = chunk.choices[0].delta
+            if delta.content:
+                content.append(delta.content)
+                on_text("".join(content))
+            # Tool calls arrive in pieces keyed by index; id and name come first
+            for part in delta.tool_calls or []:
+                call = calls.setdefault(part.index, {"id": "", "name": "", "arguments": ""})
+                if part.id:
+                    call["id"] = part.id
+                if part.function:
+                    call["name"] += part.function.name or ""
+                    call["arguments"] += part.function.arguments or ""
+
+        await llm_scheduler.chat_stream(self.client, on_chunk, tier=tier, model=self.model, **kwargs)
+        tool_calls = [
+            ToolCall(id=call["id"], type="function", function=Function(name=call["name"], arguments=call["arguments"]))
+            for _, call in sorted(calls.items())
+        ]
+        return ChatCompletionMessage(role="assistant", content="".join(content) or None, tool_calls=tool_calls or None)
+
+    async def process_message(
+        self, user_id: int, message: str, on_text: Optional[Callable[[str], None]] = None
+    ) -> dict:
+        """Process user message with AI agent.
+        
+        With `on_text`, model text is streamed to it as it is generated
+        (the reply so far, not deltas); the result is the same.
+        
+        Returns dict with:
+        - response: str - AI response text
+        - parsed_transactions: List[Dict] - transactions awaiting confirmation
+        """
+        from .user_storage import storage
+        from .i18n import t
+        lang = storage.get_user_language(user_id) or 'uz'
+        
+        try:
+            tier = await self._user_tier(user_id)
+
+            # Track parsed transactions
+            parsed_transactions = []
+            
+            # Add user message to context
+            await dialog_context.add_message(user_id, "user", message)
+            
+            # Initialize created_transactions list
+            created_transactions = []
+            
+            _, category_section = await self._categories(user_id)
+            context_prompt = f"CURRENT DATE: {datetime.datetime.now().strftime('%Y-%m-%d')}\n\n{category_section}"
             
             # Get conversation history
-            history = dialog_context.get_openai_messages(user_id)
+            history = await dialog_context.get_openai_messages(user_id)
             
-            # Add system prompt
-            messages = [{"role": "system", "content": dynamic_prompt}] + history
+            # Stable prefix first, volatile context last (prompt caching)
+            messages = [
+                {"role": "system", "content": AGENT_SYSTEM_PROMPT},
+                {"role": "system", "content": context_prompt},
+            ] + history
             
             # Call OpenAI with function calling
-            response = await self.client.chat.completions.create(
-                model=self.model,
+            assistant_message = await self._complete(
+                tier,
+                on_text,
                 messages=messages,
                 tools=self.tools,
                 tool_choice="auto"
             )
             
-            assistant_message = response.choices[0].message
-            
             # Check for empty response
             if not assistant_message.content and not assistant_message.tool_calls:
                 logger.error("AI returned empty response")
@@ -308,12 +447,34 @@ Action: get_balance() -> calculate diff -> create_transaction(category="other_ex
                 created_debts = [] # Initialize list to collect created debts
                 settled_debts = [] # Initialize list to collect settled debts
                 premium_upsells = [] # Track premium feature upsells
+                executed = []  # (tool name, result) in call order
+                
+                slots = _tool_slots.get(user_id)
+                if slots is None:
+                    slots = _tool_slots[user_id] = asyncio.Semaphore(TOOL_CONCURRENCY_PER_USER)
+                
+                async def run_tool(tool_call: ToolCall) -> Dict[str, Any]:
+                    async with slots:
+                        try:
+                            logger.info(f"AI calling tool: {tool_call.function.name} with args: {tool_call.function.arguments}")
+                            return await self._execute_tool(user_id, tool_call)
+                        except Exception as e:
+                            logger.exception(f"Error executing tool {tool_call.function.name}: {e}")
+                            return {"error": str(e)}
+                
+                outcomes: List[Dict[str, Any]] = [{}] * len(tool_calls)
+                
+                async def run_at(index: int) -> None:
+                    outcomes[index] = await run_tool(tool_calls[index])
                 
-                for tool_call in tool_calls:
+                first = [i for i, tc in enumerate(tool_calls) if tc.function.name in ORDERED_FIRST_TOOLS]
+                rest = [i for i, tc in enumerate(tool_calls) if tc.function.name not in ORDERED_FIRST_TOOLS]
+                await asyncio.gather(*map(run_at, first))
+                await asyncio.gather(*map(run_at, rest))
+                
+                for tool_call, tool_result in zip(tool_calls, outcomes):
+                    executed.append((tool_call.function.name, tool_result))
                     try:
-                        logger.info(f"AI calling tool: {tool_call.function.name} with args: {tool_call.function.arguments}")
-                        tool_result = await self._execute_tool(user_id, tool_call)
-                        
                         # Format output for context
                         output_str = json.dumps(tool_result, ensure_ascii=False)
                         
@@ -357,13 +518,20 @@ Action: get_balance() -> calculate diff -> create_transaction(category="other_ex
                         "content": tool_result["output"]
                     })
                 
-                # Get final response from AI
-                final_response = await self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages
-                )
-                
-                final_text = final_response.choices[0].message.content
+                # Writes that succeeded describe themselves; only reads and errors need the model
+                if all(
+                    name in LOCAL_RENDER_TOOLS and (result.get("success") or result.get("premium_required"))
+                    for name, result in executed
+                ):
+                    agent_stats["followup_calls_avoided"] += 1
+                    logger.info(f"Rendered tool results locally, follow-up calls avoided: {agent_stats['followup_calls_avoided']}")
+                    final_text = render_tool_results(executed, lang)
+                else:
+                    # Get final response from AI
+                    agent_stats["followup_calls"] += 1
+                    final_message = await self._complete(tier, on_text, messages=messages)
+                    
+                    final_text = final_message.content
             else:
                 # No tools called, just conversation
                 final_text = assistant_message.content
@@ -371,7 +539,7 @@ Action: get_balance() -> calculate diff -> create_transaction(category="other_ex
                 settled_debts = []
             
             # Save assistant response to context
-            dialog_context.add_message(user_id, "assistant", final_text or "")
+            await dialog_context.add_message(user_id, "assistant", final_text or "")
             
             fallback_done = {
                 'uz': "Tayyor!",
@@ -396,7 +564,7 @@ Action: get_balance() -> calculate diff -> create_transaction(category="other_ex
             }
     
     async def _execute_tool(self, user_id: int, tool_call: ToolCall) -> Dict[str, Any]:
-        """Execute AI function call."""
+        """Execute AI function call. Lookups go through the update context, shared by concurrent calls."""
         try:
             function_name = tool_call.function.name
             args = json.loads(tool_call.function.arguments)
@@ -419,35 +587,20 @@ Action: get_balance() -> calculate diff -> create_transaction(category="other_ex
                     # Check subscription tier
                     from .user_storage import storage
                     try:
-                        sub_status = await self.api_client.get_subscription_status(user_id)
+                        sub_status = await self._context(user_id).subscription()
                         sub_tier = sub_status.get("subscription_type", "free")
                         
                         # free_trial counts as premium, plus/pro/premium can convert
                         if sub_tier in ("plus", "pro", "premium", "free_trial"):
-                            # Import conversion function
-                            import httpx
                             try:
-                                CBU_API_URL = "https://cbu.uz/ru/arkhiv-kursov-valyut/json/"
-                                async with httpx.AsyncClient(timeout=10.0) as client:
-                                    response = await client.get(CBU_API_URL)
-                                    response.raise_for_status()
-                                    rates_data = response.json()
-                                    
-                                    # Find the rate
-                                    rate_info = None
-                                    for r in rates_data:
-                                        if r.get("Ccy", "").upper() == currency.upper():
-                                            rate_info = r
-                                            break
-                                    
-                                    if rate_info:
-                                        rate = float(rate_info.get("Rate", 0))
-                                        nominal = int(rate_info.get("Nominal", 1))
-                                        # Convert: amount * (rate / nominal)
-                                        amount = amount * (rate / nominal)
-                                        currency = "uzs"
-                                        converted = True
-                                        logger.info(f"Converted {original_amount} {original_currency.upper()} → {amount:.0f} UZS")
+                                # Rate of the transaction's own day (API keeps the CBU history)
+                                conversion = await self.api_client.convert_currency(
+                                    amount, currency, args.get("date")
+                                )
+                                amount = float(conversion["amount_uzs"])
+                                currency = "uzs"
+                                converted = True
+                                logger.info(f"Converted {original_amount} {original_currency.upper()} → {amount:.0f} UZS")
                             except Exception as e:
                                 logger.error(f"Currency conversion failed: {e}")
                         else:
@@ -471,16 +624,22 @@ Action: get_balance() -> calculate diff -> create_transaction(category="other_ex
                     "description": description,
                     "currency": currency,
                 }
+                if args.get("date"):
+                    # Midday, so the day survives timezone conversion
+                    tx_data["transaction_date"] = f"{args['date']}T12:00:00"
                 
                 # Resolve category_id from slug
                 resolved_category_slug = None
                 if category_slug:
                     try:
-                        categories = await self.api_client.get_categories()
-                        category_id = None
-                        
                         # Normalize slug
                         target_slug = category_slug.lower().strip()
+
+                        categories, _ = await self._categories(user_id)
+                        if not any(cat.get("slug") == target_slug for cat in categories):
+                            # Possibly created elsewhere since we cached
+                            categories, _ = await self._categories(user_id, refresh=True)
+                        category_id = None
                         
                         # 1. Try exact slug match
                         for cat in categories:
@@ -573,6 +732,7 @@ Action: get_balance() -> calculate diff -> create_transaction(category="other_ex
                 try:
                     # Pass the explicit slug if available
                     result = await self.api_client.create_category(name, type_, icon, slug=slug)
+                    self._context(user_id).invalidate("categories")
                     return {"success": True, "category_id": result["id"], "name": name, "created": True}
                 except Exception as e:
                     # If 400 Bad Request, likely category already exists.
@@ -584,7 +744,11 @@ Action: get_balance() -> calculate diff -> create_transaction(category="other_ex
             
             elif function_name == "get_balance":
                 period = args.get("period", "month")
-                result = await self.api_client.get_balance(period)
+                result, limits = await asyncio.gather(
+                    self.api_client.get_balance(period),
+                    self.api_client.get_current_limits(),
+                )
+                result["limits"] = limits
                 return result
                 
             elif function_name == "create_debt":
@@ -720,7 +884,8 @@ Output: {{ "amount": 50000, "description": "На еду", "category_slug": "groc
 
 Return JSON:"""
 
-            response = await self.client.chat.completions.create(
+            response = await llm_scheduler.chat(
+                self.client,
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
                 response_format={"type": "json_object"}
@@ -815,7 +980,8 @@ Output: {{ "type": "i_owe" }}
 
 Return JSON:"""
 
-            response = await self.client.chat.completions.create(
+            response = await llm_scheduler.chat(
+                self.client,
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
                 response_format={"type": "json_object"}
@@ -4,6 +4,7 @@ from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, Mess
 import logging
 import httpx
 
+from . import request_context
 from .config import config
 from .api_client import BarakaAPIClient
 from .user_storage import storage
@@ -117,6 +118,7 @@ async def register_phone(update: Update, context: ContextTypes.DEFAULT_TYPE):
         result = await api.register(telegram_id, phone, name, language=lang)
         token = result['access_token']
         storage.save_user_token(telegram_id, token)
+        request_context.invalidate(telegram_id)  # Lookups cached under the previous token
         
         # Fetch user info to get language from database  
         api.set_token(token)
@@ -239,6 +241,7 @@ async def login_phone(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         # If we passed checks, save token and proceed
         storage.save_user_token(telegram_id, token)
+        request_context.invalidate(telegram_id)  # Lookups cached under the previous token
         
         db_lang = user_info.get('language', lang)
         
@@ -13,9 +13,16 @@ class Config:
     
     # API
     API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8001")
+    # Shared connection pool to the API (API_HTTP2 needs the h2 package)
+    API_MAX_CONNECTIONS = int(os.getenv("API_MAX_CONNECTIONS", "100"))
+    API_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("API_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    API_KEEPALIVE_EXPIRY = float(os.getenv("API_KEEPALIVE_EXPIRY", "30"))
+    API_HTTP2 = os.getenv("API_HTTP2", "false").lower() == "true"
     
     # OpenAI
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    # Show agent replies token by token (edits one message as the model writes)
+    STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() == "true"
     
     # UzbekVoice AI (for STT)
     UZAI_API_KEY = os.getenv("UZAI_API_KEY")
@@ -21,7 +21,7 @@ async def show_transaction_confirmation(
 ) -> str:
     """Show transaction confirmation with buttons."""
     # Store pending transaction
-    tx_id = pending_storage.add(user_id, tx_data)
+    tx_id = await pending_storage.add(user_id, tx_data)
     
     # Get user language
     lang = storage.get_user_language(user_id) or 'uz'
@@ -89,7 +89,7 @@ async def handle_transaction_callback(update: Update, context: ContextTypes.DEFA
     lang = storage.get_user_language(user_id) or 'uz'
     
     # Get pending transaction
-    pending = pending_storage.get(tx_id)
+    pending = await pending_storage.get(tx_id)
     if not pending:
         # await query.edit_message_text("⏰ Время подтверждения истекло")
         await query.edit_message_text(t('transactions.confirmation.expired', lang))
@@ -135,7 +135,7 @@ async def handle_transaction_callback(update: Update, context: ContextTypes.DEFA
             )
             
             # Clean up
-            pending_storage.remove(tx_id)
+            await pending_storage.remove(tx_id)
             
         except Exception as e:
             logger.error(f"Failed to create transaction: {e}")
@@ -145,7 +145,7 @@ async def handle_transaction_callback(update: Update, context: ContextTypes.DEFA
     elif action == "cancel":
         # await query.edit_message_text("❌ Отменено")
         await query.edit_message_text(t('transactions.confirmation.cancelled', lang))
-        pending_storage.remove(tx_id)
+        await pending_storage.remove(tx_id)
     
     elif action == "edit":
         # Start edit dialog
@@ -168,7 +168,7 @@ async def handle_edit_message(update: Update, context: ContextTypes.DEFAULT_TYPE
     lang = storage.get_user_language(user_id) or 'uz'
     
     # Get pending transaction
-    pending = pending_storage.get(tx_id)
+    pending = await pending_storage.get(tx_id)
     if not pending:
         # await update.message.reply_text("⏰ Время редактирования истекло")
         await update.message.reply_text(t('transactions.confirmation.expired', lang))
@@ -228,7 +228,7 @@ async def handle_edit_message(update: Update, context: ContextTypes.DEFAULT_TYPE
             
             # Update pending storage
             pending['tx_data'] = tx_data
-            pending_storage.update(tx_id, pending)
+            await pending_storage.update(tx_id, pending)
             
             # Show updated confirmation
             await show_transaction_confirmation(update, user_id, tx_data)
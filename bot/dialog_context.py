@@ -1,87 +1,249 @@
-"""Dialog context manager using Redis."""
+"""
+Dialog context manager (in memory or Redis).
+
+DIALOG_CONTEXT_BACKEND selects where recent messages live:
+  memory (default) - per process; users idle longer than the TTL are
+                     evicted on every access, and at most
+                     DIALOG_CONTEXT_MAX_USERS users are kept (least
+                     recently active first out)
+  redis            - DIALOG_CONTEXT_REDIS_URL; one capped list per user with
+                     a key TTL, shared by every bot worker
+"""
 import json
 import logging
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 
+class DialogBackend(ABC):
+    """Per-user message history capped at `max_history`, expiring after `ttl_seconds`."""
+
+    def __init__(self, max_history: int, ttl_seconds: float):
+        self.max_history = max_history
+        self.ttl_seconds = ttl_seconds
+
+    @abstractmethod
+    async def append(self, user_id: int, message: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    async def recent(self, user_id: int, last_n: int) -> List[Dict[str, Any]]:
+        """Last `last_n` unexpired messages, oldest first."""
+
+    @abstractmethod
+    async def clear(self, user_id: int) -> None:
+        ...
+
+    def metrics(self) -> Dict[str, Any]:
+        return {}
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryDialogBackend(DialogBackend):
+    """
+    Histories in one OrderedDict ordered by last message.
+
+    A user's newest message is the last to expire, so users whose newest
+    message is older than the TTL sit at the front and are swept off in
+    O(expired) on every call. Timestamps are time.monotonic() floats.
+    """
+
+    def __init__(self, max_history: int, ttl_seconds: float, max_users: int):
+        super().__init__(max_history, ttl_seconds)
+        self.max_users = max_users
+        self._users: "OrderedDict[int, Deque[Tuple[float, Dict[str, Any]]]]" = OrderedDict()
+        self.stats = {"evicted_idle": 0, "evicted_capacity": 0}
+
+    def _evict_idle(self, now: float) -> None:
+        cutoff = now - self.ttl_seconds
+        while self._users:
+            history = next(iter(self._users.values()))
+            if history and history[-1][0] > cutoff:
+                return
+            self._users.popitem(last=False)
+            self.stats["evicted_idle"] += 1
+
+    async def append(self, user_id: int, message: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        self._evict_idle(now)
+        history = self._users.get(user_id)
+        if history is None:
+            history = self._users[user_id] = deque(maxlen=self.max_history)
+        else:
+            self._users.move_to_end(user_id)
+        history.append((now, message))
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+            self.stats["evicted_capacity"] += 1
+
+    async def recent(self, user_id: int, last_n: int) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        self._evict_idle(now)
+        history = self._users.get(user_id)
+        if not history:
+            return []
+        cutoff = now - self.ttl_seconds
+        messages = [message for added, message in history if added > cutoff]
+        return messages[-last_n:] if last_n > 0 else []
+
+    async def clear(self, user_id: int) -> None:
+        self._users.pop(user_id, None)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "users": len(self._users)}
+
+
+class RedisDialogBackend(DialogBackend):
+    """
+    One Redis list per user: RPUSH + LTRIM keep the last `max_history`
+    messages and EXPIRE drops the key once the user is idle for the TTL.
+    Messages carry a wall-clock "ts" so older entries in a live list still
+    expire individually.
+
+    Uses the asyncio client with short timeouts, so an outage never blocks
+    the event loop; on Redis errors the dialog continues without history
+    instead of failing the message.
+    """
+
+    def __init__(self, url: str, max_history: int, ttl_seconds: float, prefix: str = "dialog:"):
+        import redis.asyncio as redis  # Optional dependency
+
+        super().__init__(max_history, ttl_seconds)
+        self.prefix = prefix
+        self._errors = (redis.RedisError,)
+        self._redis = redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.stats = {"errors": 0}
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}{user_id}"
+
+    async def append(self, user_id: int, message: Dict[str, Any]) -> None:
+        key = self._key(user_id)
+        entry = json.dumps({**message, "ts": time.time()}, ensure_ascii=False)
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.rpush(key, entry)
+            pipe.ltrim(key, -self.max_history, -1)
+            pipe.expire(key, max(1, int(self.ttl_seconds)))
+            await pipe.execute()
+        except self._errors as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Dialog context write failed for user {user_id}: {e}")
+
+    async def recent(self, user_id: int, last_n: int) -> List[Dict[str, Any]]:
+        if last_n <= 0:
+            return []
+        try:
+            raw = await self._redis.lrange(self._key(user_id), -last_n, -1)
+        except self._errors as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Dialog context read failed for user {user_id}: {e}")
+            return []
+        cutoff = time.time() - self.ttl_seconds
+        messages = []
+        for item in raw:
+            message = json.loads(item)
+            if message.pop("ts", 0) > cutoff:
+                messages.append(message)
+        return messages
+
+    async def clear(self, user_id: int) -> None:
+        try:
+            await self._redis.delete(self._key(user_id))
+        except self._errors as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Dialog context clear failed for user {user_id}: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def build_backend(kind: str, max_history: int, ttl_seconds: float) -> DialogBackend:
+    """DIALOG_CONTEXT_BACKEND: 'memory' (default) or 'redis'."""
+    if kind == "redis":
+        try:
+            return RedisDialogBackend(
+                os.getenv("DIALOG_CONTEXT_REDIS_URL", "redis://localhost:6379/0"), max_history, ttl_seconds
+            )
+        except ImportError:
+            logger.error("DIALOG_CONTEXT_BACKEND=redis but the redis package is not installed; using memory")
+    elif kind != "memory":
+        logger.error(f"Unknown DIALOG_CONTEXT_BACKEND '{kind}', using memory")
+    return MemoryDialogBackend(
+        max_history, ttl_seconds, max_users=int(os.getenv("DIALOG_CONTEXT_MAX_USERS", "50000"))
+    )
+
+
 class DialogContext:
     """Manages dialog context for each user."""
-    
-    def __init__(self):
-        """Initialize in-memory storage (can be replaced with Redis)."""
-        self._contexts: Dict[int, List[Dict[str, Any]]] = {}
-        self.max_history = 10  # Keep last 10 messages
-        self.ttl_minutes = 30  # Clear after 30 minutes of inactivity
-    
-    def add_message(self, user_id: int, role: str, content: str, metadata: Optional[Dict] = None):
+
+    def __init__(
+        self,
+        backend: Optional[DialogBackend] = None,
+        max_history: int = 10,  # Keep last 10 messages
+        ttl_minutes: float = 30,  # Clear after 30 minutes of inactivity
+    ):
+        self.max_history = max_history
+        self.ttl_minutes = ttl_minutes
+        self.backend = backend or build_backend(
+            os.getenv("DIALOG_CONTEXT_BACKEND", "memory"), max_history, ttl_minutes * 60
+        )
+
+    async def add_message(self, user_id: int, role: str, content: str, metadata: Optional[Dict] = None):
         """Add message to user's context."""
-        if user_id not in self._contexts:
-            self._contexts[user_id] = []
-        
         message = {
             "role": role,  # user, assistant, system
             "content": content,
             "timestamp": datetime.now().isoformat(),
             "metadata": metadata or {}
         }
-        
-        self._contexts[user_id].append(message)
-        
-        # Keep only last N messages
-        if len(self._contexts[user_id]) > self.max_history:
-            self._contexts[user_id] = self._contexts[user_id][-self.max_history:]
-        
+        await self.backend.append(user_id, message)
         logger.info(f"Added message to context for user {user_id}: {role}")
-    
-    def get_context(self, user_id: int, last_n: int = 5) -> List[Dict[str, Any]]:
-        """Get recent context for user."""
-        if user_id not in self._contexts:
-            return []
-        
-        # Clean old messages
-        self._clean_old_messages(user_id)
-        
-        return self._contexts[user_id][-last_n:]
-    
-    def get_last_transaction(self, user_id: int) -> Optional[Dict[str, Any]]:
+
+    async def get_context(self, user_id: int, last_n: int = 5) -> List[Dict[str, Any]]:
+        """Get recent (unexpired) context for user."""
+        return await self.backend.recent(user_id, last_n)
+
+    async def get_last_transaction(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get last pending or saved transaction from context."""
-        context = self.get_context(user_id)
-        
+        context = await self.get_context(user_id)
+
         for msg in reversed(context):
             msg_type = msg.get("metadata", {}).get("type")
             if msg_type in ["pending_transaction", "saved_transaction"]:
                 return msg.get("metadata", {}).get("transaction")
-        
+
         return None
-    
-    def clear_context(self, user_id: int):
+
+    async def clear_context(self, user_id: int):
         """Clear user's context."""
-        if user_id in self._contexts:
-            del self._contexts[user_id]
-            logger.info(f"Cleared context for user {user_id}")
-    
-    def _clean_old_messages(self, user_id: int):
-        """Remove messages older than TTL."""
-        if user_id not in self._contexts:
-            return
-        
-        cutoff = datetime.now() - timedelta(minutes=self.ttl_minutes)
-        
-        self._contexts[user_id] = [
-            msg for msg in self._contexts[user_id]
-            if datetime.fromisoformat(msg["timestamp"]) > cutoff
-        ]
-    
-    def format_for_ai(self, user_id: int) -> str:
+        await self.backend.clear(user_id)
+        logger.info(f"Cleared context for user {user_id}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return self.backend.metrics()
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    async def format_for_ai(self, user_id: int) -> str:
         """Format context as string for AI prompt."""
-        context = self.get_context(user_id)
-        
+        context = await self.get_context(user_id)
+
         if not context:
             return ""
-        
+
         lines = ["История диалога:"]
         for msg in context:
             role_label = {
@@ -89,15 +251,15 @@ class DialogContext:
                 "assistant": "Ассистент",
                 "system": "Система"
             }.get(msg["role"], msg["role"])
-            
+
             lines.append(f"{role_label}: {msg['content']}")
-        
+
         return "\n".join(lines)
-    
-    def get_openai_messages(self, user_id: int, last_n: int = 10) -> list:
+
+    async def get_openai_messages(self, user_id: int, last_n: int = 10) -> list:
         """Get conversation history formatted for OpenAI API."""
-        context = self.get_context(user_id, last_n=last_n)
-        
+        context = await self.get_context(user_id, last_n=last_n)
+
         messages = []
         for msg in context:
             # Only include user and assistant messages
@@ -106,7 +268,7 @@ class DialogContext:
                     "role": msg["role"],
                     "content": msg["content"]
                 })
-        
+
         return messages
 
 
@@ -1,45 +1,165 @@
 """Common utilities for handlers."""
-from telegram import Update, KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram import Update, KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove, Message
 from telegram.constants import ChatAction
+from telegram.error import BadRequest, RetryAfter
 from telegram.ext import ContextTypes
+import asyncio
+import contextvars
 import logging
+import time
 from functools import wraps
+from typing import Optional
 
 from ..user_storage import storage
 from ..api_client import BarakaAPIClient, UnauthorizedError
+from .. import request_context
+from ..request_context import UpdateContext
 from ..i18n import t
 
 logger = logging.getLogger(__name__)
 
 
-def send_typing_action(func):
-    """Sends typing action while processing command."""
-    @wraps(func)
-    async def command_func(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+# Telegram shows "typing..." for ~5 s per action
+TYPING_REFRESH_SECONDS = 4.5
+# Telegram allows about one message edit per second per chat
+STREAM_EDIT_INTERVAL = 1.0
+MAX_MESSAGE_LENGTH = 4096
+
+# Typing keep-alive of the handler running in this task; a streamed reply stops it
+_typing_task: contextvars.ContextVar[Optional[asyncio.Task]] = contextvars.ContextVar("typing_task", default=None)
+
+
+async def _keep_typing(message: Message):
+    while True:
         try:
-            if update and update.effective_user:
-                 user = update.effective_user
-                 user_name = user.full_name or user.first_name or "Unknown"
-                 # Log action with user info
-                 logger.info(f"👤 User Activity [{user.id} | {user_name}]: Handler '{func.__name__}' triggered")
-
-            if update and update.effective_message:
-                await update.effective_message.reply_chat_action(ChatAction.TYPING)
+            await message.reply_chat_action(ChatAction.TYPING)
         except Exception as e:
             # Ignore errors if sending action fails (e.g. invalid chat)
             logger.debug(f"Failed to send typing action: {e}")
-            pass
-            
-        return await func(update, context, *args, **kwargs)
+            return
+        await asyncio.sleep(TYPING_REFRESH_SECONDS)
+
+
+def stop_typing():
+    """Stop the typing indicator of the current handler (if any)."""
+    task = _typing_task.get()
+    if task is not None:
+        task.cancel()
+
+
+def send_typing_action(func):
+    """Shows typing action for as long as the handler runs (or until it streams a reply)."""
+    @wraps(func)
+    async def command_func(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+        if update and update.effective_user:
+             user = update.effective_user
+             user_name = user.full_name or user.first_name or "Unknown"
+             # Log action with user info
+             logger.info(f"👤 User Activity [{user.id} | {user_name}]: Handler '{func.__name__}' triggered")
+
+        if _typing_task.get() is not None or not (update and update.effective_message):
+            return await func(update, context, *args, **kwargs)  # Already typing (nested decorator)
+
+        typing = asyncio.create_task(_keep_typing(update.effective_message))
+        token = _typing_task.set(typing)
+        try:
+            return await func(update, context, *args, **kwargs)
+        finally:
+            typing.cancel()
+            _typing_task.reset(token)
     return command_func
 
 
+class StreamingReply:
+    """
+    Reply that grows as LLM tokens arrive.
+
+    The first text is sent as a new message right away (replacing the typing
+    indicator); later text is applied with edits at most once per
+    STREAM_EDIT_INTERVAL. `update()` never blocks the caller.
+    """
+
+    def __init__(self, message: Message, interval: float = STREAM_EDIT_INTERVAL):
+        self.message = message
+        self.interval = interval
+        self.sent: Optional[Message] = None
+        self.text = ""
+        self._shown = ""
+        self._next_at = 0.0
+        self._flusher: Optional[asyncio.Task] = None
+
+    def update(self, text: str):
+        """Show `text` (the whole reply so far) as soon as the rate limit allows."""
+        self.text = text[:MAX_MESSAGE_LENGTH]
+        if self.text.strip() and (self._flusher is None or self._flusher.done()):
+            self._flusher = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        while self._shown != self.text:
+            await self._show_when_allowed(self.text)
+
+    async def _show_when_allowed(self, text: str, parse_mode: Optional[str] = None):
+        while self._shown != text:
+            delay = self._next_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._show(text, parse_mode)
+
+    async def _show(self, text: str, parse_mode: Optional[str] = None):
+        try:
+            if self.sent is None:
+                stop_typing()
+                self.sent = await self.message.reply_text(text, parse_mode=parse_mode)
+            else:
+                await self.sent.edit_text(text, parse_mode=parse_mode)
+        except RetryAfter as e:
+            self._next_at = time.monotonic() + e.retry_after
+            return
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
+        self._shown = text
+        self._next_at = time.monotonic() + self.interval
+
+    async def _stop_flushing(self):
+        if self._flusher is not None and not self._flusher.done():
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    async def finish(self, text: str, parse_mode: Optional[str] = 'Markdown') -> bool:
+        """Replace the streamed text with the final one. False if nothing was streamed."""
+        await self._stop_flushing()
+        if self.sent is None:
+            return False
+        text = text[:MAX_MESSAGE_LENGTH]
+        self._shown = None  # Always apply the final formatting
+        try:
+            await self._show_when_allowed(text, parse_mode)
+        except BadRequest:
+            await self._show_when_allowed(text)  # Markdown the model produced does not parse
+        return True
+
+    async def discard(self):
+        """Delete the streamed message (the handler shows something else instead)."""
+        await self._stop_flushing()
+        if self.sent is not None:
+            try:
+                await self.sent.delete()
+            except Exception as e:
+                logger.debug(f"Failed to delete streamed message: {e}")
+            self.sent = None
+
+
 async def with_auth_check(update: Update, user_id: int, api_call):
     """Execute API call with automatic 401 error handling."""
     try:
         return await api_call()
     except UnauthorizedError:
         storage.clear_user_token(user_id)
+        request_context.invalidate(user_id)
         lang = storage.get_user_language(user_id) or 'uz'
         
         # Show login button
@@ -89,10 +209,10 @@ def get_main_keyboard(lang: str = 'uz', subscription_type: str = 'free'):
 
 
 
-async def get_keyboard_for_user(user_id: int, lang: str = 'uz'):
+async def get_keyboard_for_user(user_id: int, lang: str = 'uz', ctx: UpdateContext = None):
     """Get main keyboard with subscription-aware features.
     
-    Fetches user's subscription status and returns appropriate keyboard.
+    Uses the update's subscription lookup when `ctx` is given.
     """
     from ..config import config
     
@@ -101,9 +221,11 @@ async def get_keyboard_for_user(user_id: int, lang: str = 'uz'):
     
     if token:
         try:
-            api = BarakaAPIClient(config.API_BASE_URL)
-            api.set_token(token)
-            sub_status = await api.get_subscription_status(user_id)
+            if ctx is None:
+                api = BarakaAPIClient(config.API_BASE_URL)
+                api.set_token(token)
+                ctx = UpdateContext(user_id, api)
+            sub_status = await ctx.subscription()
             subscription_type = sub_status.get("subscription_type", "free")
         except Exception as e:
             logger.debug(f"Could not fetch subscription for keyboard: {e}")
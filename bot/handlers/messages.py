@@ -7,8 +7,10 @@ from ..ai_agent import AIAgent
 from ..api_client import BarakaAPIClient
 from ..config import config
 from ..user_storage import storage
+from .. import request_context
+from ..request_context import UpdateContext
 from ..transaction_actions import show_transaction_with_actions, handle_edit_transaction_message
-from .common import with_auth_check, get_main_keyboard, send_typing_action, get_keyboard_for_user
+from .common import with_auth_check, get_main_keyboard, send_typing_action, get_keyboard_for_user, StreamingReply
 from ..i18n import t, translate_category
 
 
@@ -85,8 +87,12 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await process_text_message(update, context, text, user_id)
 
 
-async def process_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, user_id: int):
-    """Process any text message (typed or transcribed) through the main pipeline."""
+async def process_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, user_id: int,
+                               ctx: UpdateContext = None):
+    """Process any text message (typed or transcribed) through the main pipeline.
+
+    `ctx` carries the update's lookups when the caller (voice) already made some.
+    """
     lang = storage.get_user_language(user_id) or 'uz'
     
     # Handle menu buttons (compare with localized button text)
@@ -137,16 +143,33 @@ async def process_text_message(update: Update, context: ContextTypes.DEFAULT_TYP
     token = storage.get_user_token(user_id)
     api = BarakaAPIClient(config.API_BASE_URL)
     api.set_token(token)
+    owns_ctx = ctx is None
+    if owns_ctx:
+        ctx = UpdateContext(user_id, api)
+    try:
+        await _reply_with_agent(update, ctx, text, user_id, lang)
+    finally:
+        if owns_ctx:
+            ctx.finish()
+
+
+async def _reply_with_agent(update: Update, ctx: UpdateContext, text: str, user_id: int, lang: str):
+    """Run the AI agent on the text and show what it did."""
+    api = ctx.api
     
     # Increment text usage
     try:
         await api.increment_usage("text")
     except Exception as e:
         logger.error(f"Failed to increment usage: {e}")
+    ctx.invalidate("me")  # Usage counters changed
     
     # Process with AI
-    agent = AIAgent(api)
-    result = await agent.process_message(user_id, text)
+    agent = AIAgent(api, ctx)
+    reply = StreamingReply(update.message)
+    result = await agent.process_message(
+        user_id, text, on_text=reply.update if config.STREAM_RESPONSES else None
+    )
     
     response_text = result.get("response", "")
     created_transactions = result.get("created_transactions", [])
@@ -156,6 +179,7 @@ async def process_text_message(update: Update, context: ContextTypes.DEFAULT_TYP
     
     # Handle premium feature upsells first
     if premium_upsells:
+        await reply.discard()
         from telegram import InlineKeyboardButton, InlineKeyboardMarkup
         
         for upsell in premium_upsells:
@@ -178,7 +202,9 @@ async def process_text_message(update: Update, context: ContextTypes.DEFAULT_TYP
     
     # Show AI response (only if no transactions/debts created or settled)
     if not created_transactions and not created_debts and not settled_debts and response_text:
-        keyboard = await get_keyboard_for_user(user_id, lang)
+        if await reply.finish(response_text):
+            return  # Streamed; edits cannot attach a reply keyboard, the chat keeps the last one
+        keyboard = await get_keyboard_for_user(user_id, lang, ctx)
         try:
             await update.message.reply_text(
                 response_text,
@@ -191,6 +217,9 @@ async def process_text_message(update: Update, context: ContextTypes.DEFAULT_TYP
                 reply_markup=keyboard
             )
             
+    # The cards below replace whatever text the model streamed
+    await reply.discard()
+    
     # Show each created transaction with Edit/Delete buttons
     if created_transactions:
         for tx_data in created_transactions:
@@ -268,6 +297,7 @@ async def show_statistics(update: Update, api: BarakaAPIClient, lang: str):
         # Token expired or invalid - clear it and prompt re-auth
         user_id = update.effective_user.id
         storage.clear_user_token(user_id)
+        request_context.invalidate(user_id)
         await update.message.reply_text(
             t('auth.errors.auth_required', lang),
             reply_markup=ReplyKeyboardRemove()
@@ -338,6 +368,7 @@ async def show_balance(update: Update, api: BarakaAPIClient, lang: str):
         # Token expired or invalid - clear it and prompt re-auth
         user_id = update.effective_user.id
         storage.clear_user_token(user_id)
+        request_context.invalidate(user_id)
         await update.message.reply_text(
             t('auth.errors.auth_required', lang),
             reply_markup=ReplyKeyboardRemove()
@@ -4,7 +4,10 @@ from telegram.ext import ContextTypes
 import logging
 import base64
 
+from shared.llm_scheduler import llm_scheduler
+
 from ..user_storage import storage
+from ..request_context import UpdateContext
 from ..api_client import BarakaAPIClient
 from ..config import config
 from .common import with_auth_check, get_main_keyboard, send_typing_action
@@ -31,10 +34,11 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     token = storage.get_user_token(user_id)
     api = BarakaAPIClient(config.API_BASE_URL)
     api.set_token(token)
+    ctx = UpdateContext(user_id, api)
     
     try:
         # 1. Check Limits (Freemium)
-        me = await api.get_me()
+        me = await ctx.me()
         
         is_premium = me.get('is_premium', False)
         
@@ -61,12 +65,14 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
         photo_bytes = await photo_file.download_as_bytearray()
         
         # Extract text using GPT-4o Vision
-        from openai import AsyncOpenAI
-        vision_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
+        from ..ai_agent import get_openai_client
+        vision_client = get_openai_client()
         
         b64_image = base64.b64encode(bytes(photo_bytes)).decode('utf-8')
         
-        vision_response = await vision_client.chat.completions.create(
+        vision_response = await llm_scheduler.chat(
+            vision_client,
+            tier=(me.get('subscription_type') or 'free') if is_premium else 'free',
             model="gpt-4o",
             messages=[
                 {
@@ -93,7 +99,7 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Process with AI agent
         async def _process_receipt():
             from ..ai_agent import AIAgent
-            agent = AIAgent(api)
+            agent = AIAgent(api, ctx)
             return await agent.process_message(user_id, f"Вот чек: {extracted_text}")
         
         result = await with_auth_check(update, user_id, _process_receipt)
@@ -128,6 +134,7 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await api.increment_usage('photo')
              except Exception as ex:
                 logger.error(f"Failed to increment usage: {ex}")
+             ctx.invalidate("me")
                 
     except Exception as e:
         logger.exception(f"Photo error: {e}")
@@ -136,3 +143,5 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
             t('common.common.error', lang),
             reply_markup=get_main_keyboard(lang)
         )
+    finally:
+        ctx.finish()
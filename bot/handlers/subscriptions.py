@@ -3,6 +3,7 @@ from telegram.ext import ContextTypes, CallbackQueryHandler
 from bot.api_client import BarakaAPIClient
 from bot.config import config
 from bot.i18n import t
+from bot import request_context
 from bot.user_storage import storage
 
 async def activate_trial_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -19,6 +20,7 @@ async def activate_trial_callback(update: Update, context: ContextTypes.DEFAULT_
     
     try:
         data = await api.activate_trial()
+        request_context.invalidate(user_id, "subscription", "me")
         
         expires_iso = data.get("expires_at")
         if expires_iso:
@@ -131,6 +133,7 @@ async def handle_payment_generation(update: Update, context: ContextTypes.DEFAUL
     
     try:
         data = await api.generate_payment_link(plan_id=plan_id, provider=provider)
+        request_context.invalidate(user_id, "subscription", "me")  # Likely to change within minutes
         url = data.get("url")
         
         provider_name = "Click" if provider == "click" else "Payme"
@@ -8,6 +8,7 @@ import httpx
 from ..api_client import BarakaAPIClient
 from ..config import config
 from ..user_storage import storage
+from ..request_context import UpdateContext
 from ..ai_agent import AIAgent
 from ..transaction_actions import show_transaction_with_actions
 from ..i18n import t
@@ -36,6 +37,7 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     token = storage.get_user_token(user_id)
     api = BarakaAPIClient(config.API_BASE_URL)
     api.set_token(token)
+    ctx = UpdateContext(user_id, api)
     
     try:
         # 1. Get user info (with is_premium and counters)
@@ -47,7 +49,7 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # We need to remove the decorator and handle logic inside.
 
         # 1. Check Limits (Freemium)
-        me = await api.get_me()
+        me = await ctx.me()
         user_info = me
         
         # Determine strict 'is_active' status
@@ -110,7 +112,7 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
         from .messages import process_text_message
         
         # Process as if it was a text message
-        await process_text_message(update, context, transcribed_text, user_id)
+        await process_text_message(update, context, transcribed_text, user_id, ctx)
         
         # Increment usage counter if success (and not active)
         if not is_active:
@@ -121,6 +123,7 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await api.increment_usage('voice')
             except Exception as ex:
                 logger.error(f"Failed to increment usage: {ex}")
+            ctx.invalidate("me")
 
     except Exception as e:
         logger.error(f"Voice error: {e}")
@@ -128,3 +131,5 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
             t('transactions.voice.error', lang),
             reply_markup=get_main_keyboard(lang)
         )
+    finally:
+        ctx.finish()
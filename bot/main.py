@@ -42,6 +42,19 @@ async def post_init(application):
     await broadcast_announcement(application.bot, storage)
 
 
+async def post_shutdown(application):
+    """Release the API, OpenAI, dialog-context and pending-storage connections and the user store."""
+    from bot.api_client import close_http_client
+    from bot.ai_agent import close_openai_client
+    from bot.dialog_context import dialog_context
+    from bot.pending_storage import pending_storage
+    await close_http_client()
+    await close_openai_client()
+    await dialog_context.close()
+    await pending_storage.close()
+    storage.close()
+
+
 def main():
     """Start the bot."""
     # Increase timeouts for better stability in slow networks
@@ -51,7 +64,7 @@ def main():
         write_timeout=30.0,
         pool_timeout=30.0
     )
-    application = Application.builder().token(config.TELEGRAM_BOT_TOKEN).request(request).post_init(post_init).build()
+    application = Application.builder().token(config.TELEGRAM_BOT_TOKEN).request(request).post_init(post_init).post_shutdown(post_shutdown).build()
     
     # Auth conversation handlers (priority)
     application.add_handler(register_conv)
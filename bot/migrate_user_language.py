@@ -1,33 +1,44 @@
-"""Migration script to add language field to existing users."""
-import json
+"""
+Migration script to add language field to existing users.
+
+Goes through UserStorage, so it updates whichever backend
+USER_STORAGE_BACKEND selects (the SQLite store by default).
+
+Usage:
+    python bot/migrate_user_language.py
+"""
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.user_storage import storage
+
+
 def migrate_users():
     """Add default language field to users who don't have it."""
-    users_file = Path("bot/data/users.json")
-    
-    if not users_file.exists():
-        print("No users.json file found")
+    users = storage.get_all_users()
+    if not users:
+        print("No users found")
         return
-    
-    with open(users_file, 'r') as f:
-        users = json.load(f)
-    
-    modified = False
+
+    migrated = 0
     for user_id, user_data in users.items():
-        if 'language' not in user_data:
+        if not user_data.get('language'):
             # Set default language to Russian for existing users 
             # (since the bot seems to be used in Russian-speaking context)
-            user_data['language'] = 'ru'
-            modified = True
+            storage.set_user_language(int(user_id), 'ru')
+            migrated += 1
             print(f"Added language 'ru' for user {user_id}")
-    
-    if modified:
-        with open(users_file, 'w') as f:
-            json.dump(users, f, indent=2, default=str)
-        print(f"\n✅ Migration complete! Updated {len([u for u in users.values() if 'language' in u])} users")
+
+    if migrated:
+        print(f"\n✅ Migration complete! Updated {migrated} users")
     else:
         print("No migration needed - all users already have language field")
 
+
 if __name__ == "__main__":
-    migrate_users()
+    try:
+        migrate_users()
+    finally:
+        storage.close()
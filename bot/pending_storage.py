@@ -1,49 +1,296 @@
-"""Pending transactions storage for confirmation flow."""
-from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+"""
+Pending transactions storage for confirmation flow.
+
+Confirmations expire after PENDING_TTL_SECONDS (default 24 h) and each
+user keeps at most PENDING_MAX_PER_USER of them (oldest dropped first).
+PENDING_STORAGE_BACKEND selects where they live:
+  memory (default) - per process, lost on restart
+  redis            - PENDING_STORAGE_REDIS_URL; survives restarts and is
+                     shared by every bot worker
+"""
+import heapq
+import json
+import logging
+import os
+import time
 import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PendingBackend(ABC):
+    """
+    Records keyed by tx_id: {user_id, tx_data, created_at}, expiring
+    `ttl_seconds` after they are added, at most `max_per_user` per user.
+    """
+
+    def __init__(self, ttl_seconds: float, max_per_user: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_per_user = max_per_user
+
+    @abstractmethod
+    async def add(self, tx_id: str, record: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, tx_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def update(self, tx_id: str, record: Dict[str, Any]) -> None:
+        """Replace a live record, keeping its expiry."""
+
+    @abstractmethod
+    async def remove(self, tx_id: str) -> None:
+        ...
+
+    def expire(self) -> int:
+        """Drop expired records now; returns how many were dropped."""
+        return 0
+
+    def metrics(self) -> Dict[str, Any]:
+        return {}
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryPendingBackend(PendingBackend):
+    """
+    Dict of records plus a min-heap of (deadline, tx_id), so expiry pops
+    only what is due instead of scanning every record. It runs on each
+    add/get. Removed records leave their heap entry behind; it is skipped
+    when it comes due.
+    """
+
+    def __init__(self, ttl_seconds: float, max_per_user: int):
+        super().__init__(ttl_seconds, max_per_user)
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._deadlines: list[Tuple[float, str]] = []
+        self._by_user: Dict[int, "OrderedDict[str, None]"] = {}
+        self.stats = {"added": 0, "expired": 0, "evicted": 0}
+
+    def _drop(self, tx_id: str) -> bool:
+        record = self._records.pop(tx_id, None)
+        if record is None:
+            return False
+        user_ids = self._by_user.get(record["user_id"])
+        if user_ids is not None:
+            user_ids.pop(tx_id, None)
+            if not user_ids:
+                del self._by_user[record["user_id"]]
+        return True
+
+    def expire(self) -> int:
+        now = time.monotonic()
+        dropped = 0
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, tx_id = heapq.heappop(self._deadlines)
+            dropped += self._drop(tx_id)
+        self.stats["expired"] += dropped
+        return dropped
+
+    async def add(self, tx_id: str, record: Dict[str, Any]) -> None:
+        self.expire()
+        self._records[tx_id] = record
+        heapq.heappush(self._deadlines, (time.monotonic() + self.ttl_seconds, tx_id))
+        user_ids = self._by_user.setdefault(record["user_id"], OrderedDict())
+        user_ids[tx_id] = None
+        while len(user_ids) > self.max_per_user:
+            self._drop(next(iter(user_ids)))
+            self.stats["evicted"] += 1
+        self.stats["added"] += 1
+
+    async def get(self, tx_id: str) -> Optional[Dict[str, Any]]:
+        self.expire()
+        return self._records.get(tx_id)
+
+    async def update(self, tx_id: str, record: Dict[str, Any]) -> None:
+        if tx_id in self._records:
+            self._records[tx_id] = record
+
+    async def remove(self, tx_id: str) -> None:
+        self._drop(tx_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "pending": len(self._records), "heap": len(self._deadlines)}
+
+
+class RedisPendingBackend(PendingBackend):
+    """
+    Each record is a JSON string with a key TTL; a per-user sorted set
+    (scored by creation time) enforces the per-user cap. Redis expires the
+    records itself, so nothing here scans for them.
+
+    During a Redis outage confirmations are kept in a per-process memory
+    fallback, so the buttons still work on this worker; Redis errors are
+    logged and counted, never raised into the handlers. The asyncio client
+    keeps an outage from blocking the event loop.
+    """
+
+    def __init__(self, url: str, ttl_seconds: float, max_per_user: int, prefix: str = "pending:"):
+        import redis.asyncio as redis  # Optional dependency
+
+        super().__init__(ttl_seconds, max_per_user)
+        self.prefix = prefix
+        self._errors = (redis.RedisError,)
+        self._redis = redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._fallback = MemoryPendingBackend(ttl_seconds, max_per_user)
+        self.stats = {"added": 0, "evicted": 0, "errors": 0, "fallback_added": 0}
+
+    def _tx_key(self, tx_id: str) -> str:
+        return f"{self.prefix}tx:{tx_id}"
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self.prefix}user:{user_id}"
+
+    def _failed(self, action: str, tx_id: str, error: Exception) -> None:
+        self.stats["errors"] += 1
+        logger.warning(f"Pending transaction {tx_id} {action} failed: {error}")
+
+    @staticmethod
+    def _dump(record: Dict[str, Any]) -> str:
+        return json.dumps(
+            {**record, "created_at": record["created_at"].isoformat()}, ensure_ascii=False, default=str
+        )
+
+    async def add(self, tx_id: str, record: Dict[str, Any]) -> None:
+        ttl = max(1, int(self.ttl_seconds))
+        now = time.time()
+        user_key = self._user_key(record["user_id"])
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.set(self._tx_key(tx_id), self._dump(record), ex=ttl)
+            pipe.zadd(user_key, {tx_id: now})
+            pipe.zremrangebyscore(user_key, "-inf", now - ttl)  # Members whose records Redis expired
+            pipe.zrange(user_key, 0, -self.max_per_user - 1)  # Over the cap, oldest first
+            pipe.expire(user_key, ttl)
+            overflow = (await pipe.execute())[3]
+        except self._errors as e:
+            self._failed("write", tx_id, e)
+            await self._fallback.add(tx_id, record)
+            self.stats["fallback_added"] += 1
+            return
+        self.stats["added"] += 1
+        if overflow:
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                pipe.delete(*(self._tx_key(old.decode()) for old in overflow))
+                pipe.zrem(user_key, *overflow)
+                await pipe.execute()
+            except self._errors as e:
+                self._failed("eviction", tx_id, e)
+                return
+            self.stats["evicted"] += len(overflow)
+
+    async def get(self, tx_id: str) -> Optional[Dict[str, Any]]:
+        record = await self._fallback.get(tx_id)
+        if record is not None:
+            return record
+        try:
+            raw = await self._redis.get(self._tx_key(tx_id))
+        except self._errors as e:
+            self._failed("read", tx_id, e)
+            return None
+        if raw is None:
+            return None
+        record = json.loads(raw)
+        record["created_at"] = datetime.fromisoformat(record["created_at"])
+        return record
+
+    async def update(self, tx_id: str, record: Dict[str, Any]) -> None:
+        if await self._fallback.get(tx_id) is not None:
+            await self._fallback.update(tx_id, record)
+            return
+        try:
+            await self._redis.set(self._tx_key(tx_id), self._dump(record), xx=True, keepttl=True)
+        except self._errors as e:
+            self._failed("update", tx_id, e)
+
+    async def remove(self, tx_id: str) -> None:
+        if await self._fallback.get(tx_id) is not None:
+            await self._fallback.remove(tx_id)
+            return
+        record = await self.get(tx_id)
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.delete(self._tx_key(tx_id))
+            if record is not None:
+                pipe.zrem(self._user_key(record["user_id"]), tx_id)
+            await pipe.execute()
+        except self._errors as e:
+            self._failed("remove", tx_id, e)
+
+    def expire(self) -> int:
+        return self._fallback.expire()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "fallback_pending": self._fallback.metrics()["pending"]}
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def build_backend(kind: str, ttl_seconds: float, max_per_user: int) -> PendingBackend:
+    """PENDING_STORAGE_BACKEND: 'memory' (default) or 'redis'."""
+    if kind == "redis":
+        try:
+            return RedisPendingBackend(
+                os.getenv("PENDING_STORAGE_REDIS_URL", "redis://localhost:6379/0"), ttl_seconds, max_per_user
+            )
+        except ImportError:
+            logger.error("PENDING_STORAGE_BACKEND=redis but the redis package is not installed; using memory")
+    elif kind != "memory":
+        logger.error(f"Unknown PENDING_STORAGE_BACKEND '{kind}', using memory")
+    return MemoryPendingBackend(ttl_seconds, max_per_user)
 
 
 class PendingTransactionStorage:
     """Store pending transactions awaiting user confirmation."""
-    
-    def __init__(self):
-        self._storage: Dict[str, Dict[str, Any]] = {}
-        # Format: {tx_id: {user_id, tx_data, created_at}}
-    
-    def add(self, user_id: int, tx_data: Dict[str, Any]) -> str:
+
+    def __init__(self, backend: Optional[PendingBackend] = None):
+        self.backend = backend or build_backend(
+            os.getenv("PENDING_STORAGE_BACKEND", "memory"),
+            ttl_seconds=float(os.getenv("PENDING_TTL_SECONDS", str(24 * 3600))),
+            max_per_user=int(os.getenv("PENDING_MAX_PER_USER", "20")),
+        )
+
+    async def add(self, user_id: int, tx_data: Dict[str, Any]) -> str:
         """Add pending transaction and return tx_id."""
-        tx_id = str(uuid.uuid4())[:8]  # Short ID
-        self._storage[tx_id] = {
+        # Full uuid4: 32 hex chars, well within the 64-byte callback_data limit
+        tx_id = uuid.uuid4().hex
+        await self.backend.add(tx_id, {
             'user_id': user_id,
             'tx_data': tx_data,
             'created_at': datetime.now()
-        }
+        })
         return tx_id
-    
-    def get(self, tx_id: str) -> Optional[Dict]:
-        """Get pending transaction."""
-        return self._storage.get(tx_id)
-    
-    def update(self, tx_id: str, data: Dict):
+
+    async def get(self, tx_id: str) -> Optional[Dict]:
+        """Get pending transaction (None once expired)."""
+        return await self.backend.get(tx_id)
+
+    async def update(self, tx_id: str, data: Dict):
         """Update pending transaction."""
-        if tx_id in self._storage:
-            self._storage[tx_id] = data
-    
-    def remove(self, tx_id: str):
+        await self.backend.update(tx_id, data)
+
+    async def remove(self, tx_id: str):
         """Remove pending transaction."""
-        if tx_id in self._storage:
-            del self._storage[tx_id]
-    
-    def cleanup_old(self, hours: int = 24):
-        """Remove transactions older than N hours."""
-        now = datetime.now()
-        expired = [
-            tx_id for tx_id, data in self._storage.items()
-            if now - data['created_at'] > timedelta(hours=hours)
-        ]
-        for tx_id in expired:
-            del self._storage[tx_id]
+        await self.backend.remove(tx_id)
+
+    def cleanup_old(self) -> int:
+        """Drop expired transactions now (also happens on every add/get)."""
+        return self.backend.expire()
+
+    def metrics(self) -> Dict[str, Any]:
+        return self.backend.metrics()
+
+    async def close(self) -> None:
+        await self.backend.close()
 
 
 # Global instance
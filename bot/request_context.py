@@ -0,0 +1,139 @@
+"""Per-update lookups (profile, subscription, categories) shared by the handlers and the AI agent."""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+from .api_client import BarakaAPIClient
+
+logger = logging.getLogger(__name__)
+
+# Seconds a lookup is reused across updates. Usage counters in the profile
+# change with every message, so `me` is kept short and dropped after increments.
+# Subscriptions are dropped after trial activation and payment links; the
+# short TTL bounds the gap until a payment made outside the bot shows up.
+CACHE_SECONDS = {
+    "me": 30,
+    "subscription": 60,
+    "categories": 600,
+    "category_section": 600,
+}
+CACHE_MAX_USERS = 10_000
+
+# telegram id -> {key: (value, expires_at)}, least recently written first
+_cache: "OrderedDict[int, Dict[str, tuple]]" = OrderedDict()
+
+context_stats = {"updates": 0, "lookups": 0, "api_calls": 0}
+
+
+def invalidate(user_id: int, *keys: str) -> None:
+    """Drop cached lookups for a user (all of them when no keys are given)."""
+    if not keys:
+        _cache.pop(user_id, None)
+        return
+    entries = _cache.get(user_id, {})
+    for key in keys:
+        entries.pop(key, None)
+
+
+def _store(user_id: int, key: str, value: Any) -> None:
+    """Cache a lookup, dropping expired entries and users past CACHE_MAX_USERS."""
+    now = time.monotonic()
+    entries = _cache.pop(user_id, {})
+    entries = {k: entry for k, entry in entries.items() if entry[1] > now}
+    entries[key] = (value, now + CACHE_SECONDS.get(key, 60))
+    _cache[user_id] = entries
+    # Users at the front were written longest ago; stop at the first one still live
+    while _cache:
+        oldest_id, oldest = next(iter(_cache.items()))
+        if len(_cache) <= CACHE_MAX_USERS and any(entry[1] > now for entry in oldest.values()):
+            break
+        del _cache[oldest_id]
+
+
+class UpdateContext:
+    """
+    Lookups for one Telegram update.
+
+    Each lookup hits the API at most once per update (concurrent callers
+    share the in-flight request) and is reused across updates for
+    CACHE_SECONDS. `lookups` counts what the handlers asked for, `api_calls`
+    what actually went to the API.
+    """
+
+    def __init__(self, user_id: int, api: BarakaAPIClient):
+        self.user_id = user_id
+        self.api = api
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self.lookups = 0
+        self.api_calls = 0
+
+    async def _get(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        self.lookups += 1
+        task = self._tasks.get(key)
+        if task is None:
+            cached = _cache.get(self.user_id, {}).get(key)
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+            task = self._tasks[key] = asyncio.ensure_future(self._fetch(key, fetch))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        self.api_calls += 1
+        try:
+            value = await fetch()
+        except BaseException:
+            self._tasks.pop(key, None)  # Let the next caller retry
+            raise
+        _store(self.user_id, key, value)
+        return value
+
+    def derived(self, key: str, source: Any, build: Callable[[Any], Any]) -> Any:
+        """
+        build(source), cached like a lookup for as long as `source` (a cached
+        lookup result) stays the same object.
+        """
+        cached = _cache.get(self.user_id, {}).get(key)
+        if cached and cached[1] > time.monotonic() and cached[0][0] is source:
+            return cached[0][1]
+        value = build(source)
+        _store(self.user_id, key, (source, value))
+        return value
+
+    def invalidate(self, *keys: str) -> None:
+        for key in keys:
+            self._tasks.pop(key, None)
+        invalidate(self.user_id, *keys)
+
+    async def me(self) -> Dict[str, Any]:
+        """/auth/me: profile, is_premium, usage counters."""
+        return await self._get("me", self.api.get_me)
+
+    async def subscription(self) -> Dict[str, Any]:
+        return await self._get("subscription", lambda: self.api.get_subscription_status(self.user_id))
+
+    async def tier(self) -> str:
+        """Subscription tier, 'free' when the subscription is not active."""
+        status = await self.subscription()
+        return (status.get("subscription_type") or "free") if status.get("is_premium") else "free"
+
+    async def categories(self) -> list:
+        return await self._get("categories", self.api.get_categories)
+
+    async def refresh_categories(self) -> list:
+        """Categories fetched past the cache, at most once per update."""
+        if "categories_refreshed" not in self._tasks:
+            self.invalidate("categories")
+            self._tasks["categories_refreshed"] = asyncio.ensure_future(self.categories())
+        return await asyncio.shield(self._tasks["categories_refreshed"])
+
+    def finish(self) -> None:
+        """Record the update in context_stats."""
+        context_stats["updates"] += 1
+        context_stats["lookups"] += self.lookups
+        context_stats["api_calls"] += self.api_calls
+        logger.info(
+            f"Update lookups for {self.user_id}: {self.lookups} requested, {self.api_calls} API calls "
+            f"(total {context_stats['lookups']} / {context_stats['api_calls']} over {context_stats['updates']} updates)"
+        )
@@ -1,122 +1,391 @@
 """User data storage."""
+import atexit
 import json
 import os
 import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional, Dict, Any
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+USER_FIELDS = ("token", "username", "language")
+
+
+class StorageBackend(ABC):
+    """Keyed store for user records and pending transactions (keys are telegram ids as strings)."""
+
+    @abstractmethod
+    def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def update_user(self, user_id: str, **fields) -> None:
+        """Set fields of a user record, creating it when missing."""
+
+    @abstractmethod
+    def all_users(self) -> Dict[str, Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def get_pending(self, user_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def set_pending(self, user_id: str, data: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def delete_pending(self, user_id: str) -> None:
+        ...
+
+    def flush(self) -> None:
+        """Persist buffered changes (no-op for stores that write through)."""
+
+    def metrics(self) -> Dict[str, Any]:
+        return {}
+
+    def close(self) -> None:
+        pass
+
+
+class JSONFileBackend(StorageBackend):
+    """
+    users.json / pending.json held in memory, written behind.
+
+    Mutations only mark the file dirty; a single writer thread flushes
+    each dirty file at most once per `flush_interval` seconds (0 writes
+    synchronously). Every flush writes a temp file and os.replace()s it, so
+    a crash leaves the previous or the new file, never a torn one. With
+    `fsync` the data and the rename are forced to disk before the flush
+    counts as done. Records are replaced, never mutated in place, so the
+    writer can snapshot the dict with a plain copy.
+    """
+
+    def __init__(self, storage_dir: Path, flush_interval: float = 1.0, fsync: bool = True):
+        self.users_file = storage_dir / "users.json"
+        self.pending_file = storage_dir / "pending.json"
+        self.users = _read_json(self.users_file)
+        self.pending = _read_json(self.pending_file)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._lock = threading.Lock()  # Dirty sets and scheduling
+        self._flush_lock = threading.Lock()  # One writer at a time
+        self._dirty: Dict[str, set] = {"users": set(), "pending": set()}
+        self._scheduled = False
+        self._closed = False
+        self._closing = threading.Event()  # Cuts the writer's wait short
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="user-storage-flush")
+        self.stats = {
+            "writes": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "flush_ms_total": 0.0,
+        }
+        atexit.register(self.close)
+
+    def _files(self) -> Dict[str, tuple]:
+        return {"users": (self.users_file, self.users), "pending": (self.pending_file, self.pending)}
+
+    def _mark_dirty(self, name: str, user_id: str):
+        with self._lock:
+            self.stats["writes"] += 1
+            self._dirty[name].add(user_id)
+            if self._scheduled:
+                return
+            background = self.flush_interval > 0 and not self._closed
+            self._scheduled = background
+        if background:
+            self._submit()
+        else:
+            self.flush()
+
+    def _submit(self):
+        try:
+            self._executor.submit(self._flush_later)
+        except RuntimeError:  # Closed meanwhile
+            self.flush()
+
+    def _flush_later(self):
+        self._closing.wait(self.flush_interval)
+        self.flush()
+
+    def _write_atomic(self, path: Path, data: Dict[str, Any]):
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=2, default=str) # default=str for datetime objects
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+        if self.fsync:
+            directory = os.open(path.parent, os.O_RDONLY)
+            try:
+                os.fsync(directory)  # Persist the rename
+            finally:
+                os.close(directory)
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                self._scheduled = False
+                dirty = {name: keys for name, keys in self._dirty.items() if keys}
+                snapshots = {name: self._files()[name][1].copy() for name in dirty}
+                for name in dirty:
+                    self._dirty[name] = set()
+            if not dirty:
+                return
+            started = time.perf_counter()
+            try:
+                for name, snapshot in snapshots.items():
+                    self._write_atomic(self._files()[name][0], snapshot)
+            except Exception as e:
+                logger.error(f"User storage flush failed, will retry: {e}")
+                self.stats["flush_errors"] += 1
+                with self._lock:
+                    for name, keys in dirty.items():
+                        self._dirty[name] |= keys
+                    retry = self.flush_interval > 0 and not self._closed and not self._scheduled
+                    self._scheduled = self._scheduled or retry
+                if retry:
+                    try:
+                        self._executor.submit(self._flush_later)
+                    except RuntimeError:
+                        pass  # Closing; close() flushes once more
+                return
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stats["flushes"] += 1
+            self.stats["last_flush_ms"] = elapsed
+            self.stats["max_flush_ms"] = max(self.stats["max_flush_ms"], elapsed)
+            self.stats["flush_ms_total"] += elapsed
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            dirty = sum(len(keys) for keys in self._dirty.values())
+        return {**self.stats, "dirty_entries": dirty}
+
+    def close(self) -> None:
+        """Flush what is buffered and stop the writer (also runs at interpreter exit)."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._closing.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self.flush()
+
+    def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self.users.get(user_id)
+
+    def update_user(self, user_id: str, **fields) -> None:
+        self.users[user_id] = {**self.users.get(user_id, {}), **fields}
+        self._mark_dirty("users", user_id)
+
+    def all_users(self) -> Dict[str, Dict[str, Any]]:
+        return self.users.copy()
+
+    def get_pending(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self.pending.get(user_id)
+
+    def set_pending(self, user_id: str, data: Dict[str, Any]) -> None:
+        self.pending[user_id] = dict(data)
+        self._mark_dirty("pending", user_id)
+
+    def delete_pending(self, user_id: str) -> None:
+        if self.pending.pop(user_id, None) is not None:
+            self._mark_dirty("pending", user_id)
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    One row per user in SQLite (WAL): keyed reads and single-row atomic writes.
+
+    On first start with an empty database the existing users.json and
+    pending.json are imported; the JSON files are left in place.
+    """
+
+    def __init__(self, path: Path, import_dir: Optional[Path] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints; never corrupts in WAL
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            "telegram_id TEXT PRIMARY KEY, token TEXT, username TEXT, language TEXT)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS pending (telegram_id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        if import_dir is not None:
+            self._import_json(import_dir)
+
+    def _import_json(self, storage_dir: Path):
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM users LIMIT 1").fetchone():
+                return
+            users = _read_json(storage_dir / "users.json")
+            pending = _read_json(storage_dir / "pending.json")
+            if not users and not pending:
+                return
+            with self._db:  # One transaction
+                self._db.execute("BEGIN")
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?)",
+                    [(uid, data.get("token"), data.get("username"), data.get("language"))
+                     for uid, data in users.items()],
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO pending VALUES (?, ?)",
+                    [(uid, json.dumps(data, default=str)) for uid, data in pending.items()],
+                )
+        logger.info(f"Imported {len(users)} users and {len(pending)} pending transactions from JSON into {self.path}")
+
+    @staticmethod
+    def _user_row(row) -> Dict[str, Any]:
+        return dict(zip(USER_FIELDS, row))
+
+    def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT token, username, language FROM users WHERE telegram_id = ?", (user_id,)
+            ).fetchone()
+        return self._user_row(row) if row else None
+
+    def update_user(self, user_id: str, **fields) -> None:
+        unknown = set(fields) - set(USER_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown user fields: {sorted(unknown)}")
+        columns = list(fields)
+        assignments = ", ".join(f"{column} = excluded.{column}" for column in columns)
+        with self._lock:
+            self._db.execute(
+                f"INSERT INTO users (telegram_id, {', '.join(columns)}) VALUES (?{', ?' * len(columns)}) "
+                f"ON CONFLICT(telegram_id) DO UPDATE SET {assignments}",
+                (user_id, *fields.values()),
+            )
+
+    def all_users(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute("SELECT telegram_id, token, username, language FROM users").fetchall()
+        return {row[0]: self._user_row(row[1:]) for row in rows}
+
+    def get_pending(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM pending WHERE telegram_id = ?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_pending(self, user_id: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pending VALUES (?, ?)", (user_id, json.dumps(data, default=str))
+            )
+
+    def delete_pending(self, user_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM pending WHERE telegram_id = ?", (user_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _read_json(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def build_backend(kind: str, storage_dir: Path) -> StorageBackend:
+    """USER_STORAGE_BACKEND: 'sqlite' (default) or 'json' (the previous file format)."""
+    if kind == "json":
+        return JSONFileBackend(
+            storage_dir,
+            flush_interval=float(os.getenv("USER_STORAGE_FLUSH_INTERVAL", "1.0")),
+            fsync=os.getenv("USER_STORAGE_FSYNC", "true").lower() == "true",
+        )
+    if kind != "sqlite":
+        logger.error(f"Unknown USER_STORAGE_BACKEND '{kind}', using sqlite")
+    return SQLiteBackend(storage_dir / "users.db", import_dir=storage_dir)
+
 
 class UserStorage:
     """Store user auth tokens and pending transactions."""
-    
-    def __init__(self, storage_dir: str = "bot/data"):
+
+    def __init__(self, storage_dir: str = "bot/data", backend: Optional[str] = None):
         self.storage_dir = Path(storage_dir)
         self.storage_dir.mkdir(parents=True, exist_ok=True)
-        self.users_file = self.storage_dir / "users.json"
-        self.pending_file = self.storage_dir / "pending.json"
-        self._load()
-    
-    def _load(self):
-        """Load data from files."""
-        if self.users_file.exists():
-            with open(self.users_file, 'r') as f:
-                self.users = json.load(f)
-        else:
-            self.users = {}
-        
-        if self.pending_file.exists():
-            with open(self.pending_file, 'r') as f:
-                self.pending = json.load(f)
-        else:
-            self.pending = {}
-    
-    def _save_users(self):
-        """Save users to file."""
-        with open(self.users_file, 'w') as f:
-            # json.dump(self.users, f, indent=2)
-            json.dump(self.users, f, indent=2, default=str) # Added default=str for datetime objects
-    
-    def _save_pending(self):
-        """Save pending to file."""
-        with open(self.pending_file, 'w') as f:
-            json.dump(self.pending, f, indent=2)
-    
+        self.backend = build_backend(backend or os.getenv("USER_STORAGE_BACKEND", "sqlite"), self.storage_dir)
+
     def save_user_token(self, user_id: int, token: str, username: str = ""):
-        """Save user token and username."""
-        # Ensure user_id is stored as a string key
+        """Save user token and username (keeps the language)."""
         user_id_str = str(user_id)
-        current_data = self.users.get(user_id_str, {})
-        current_lang = current_data.get('language', 'uz')
-        
-        self.users[user_id_str] = {
-            'token': token,
-            'username': username,
-            'language': current_lang
-        }
-        self._save_users()
+        current_data = self.backend.get_user(user_id_str) or {}
+        self.backend.update_user(
+            user_id_str, token=token, username=username, language=current_data.get('language', 'uz')
+        )
         logger.info(f"Saved token for user {user_id}")
-    
+
     def get_user_language(self, user_id: int) -> str:
         """Get user's preferred language from local storage (default: uz)."""
-        return self.users.get(str(user_id), {}).get('language', 'uz')
-    
+        return (self.backend.get_user(str(user_id)) or {}).get('language', 'uz')
+
     def set_user_language(self, user_id: int, language: str):
-        """Set user's preferred language in local storage."""
-        user_id_str = str(user_id)
-        if user_id_str in self.users:
-            self.users[user_id_str]['language'] = language
-        else:
-            # If user doesn't exist, create a minimal entry with just language
-            self.users[user_id_str] = {'language': language}
-        self._save_users()
-    
+        """Set user's preferred language in local storage (creates a minimal entry for new users)."""
+        self.backend.update_user(str(user_id), language=language)
+
     def clear_user_token(self, telegram_id: int):
         """Clear user token when it expires or becomes invalid."""
         user_id_str = str(telegram_id)
-        if user_id_str in self.users:
-            # Preserve language, just remove token (set to None or empty)
-            # Or if strict about structure, we can just pop 'token' key if we handled it safely elsewhere.
-            # But get_user_token expects 'token' key.
-            # Let's set token to None
-            self.users[user_id_str]['token'] = None
-            self._save_users()
-    
+        if self.backend.get_user(user_id_str) is not None:
+            # Preserve language, get_user_token expects the 'token' key
+            self.backend.update_user(user_id_str, token=None)
+
     def get_user_token(self, telegram_id: int) -> Optional[str]:
         """Get user auth token."""
-        user_data = self.users.get(str(telegram_id))
+        user_data = self.backend.get_user(str(telegram_id))
         return user_data.get("token") if user_data else None
-    
+
     def is_user_authorized(self, telegram_id: int) -> bool:
         """Check if user is authorized."""
-        user = self.users.get(str(telegram_id))
-        return user is not None and user.get('token') is not None
-    
+        return self.get_user_token(telegram_id) is not None
+
     def save_pending_transaction(self, telegram_id: int, transaction_data: Dict[str, Any]):
         """Save pending transaction for confirmation."""
-        self.pending[str(telegram_id)] = transaction_data
-        self._save_pending()
-    
+        self.backend.set_pending(str(telegram_id), transaction_data)
+
     def get_pending_transaction(self, telegram_id: int) -> Optional[Dict[str, Any]]:
         """Get pending transaction."""
-        return self.pending.get(str(telegram_id))
-    
+        return self.backend.get_pending(str(telegram_id))
+
     def clear_pending_transaction(self, telegram_id: int):
         """Clear pending transaction."""
-        if str(telegram_id) in self.pending:
-            del self.pending[str(telegram_id)]
-            self._save_pending()
-    
+        self.backend.delete_pending(str(telegram_id))
+
     def logout_user(self, telegram_id: int):
         """Logout user."""
         self.clear_user_token(telegram_id)
         self.clear_pending_transaction(telegram_id)
-    
+
     def get_all_users(self) -> Dict[str, Any]:
         """Get all registered users for broadcast."""
-        return self.users.copy()
+        return self.backend.all_users()
+
+    def flush(self):
+        self.backend.flush()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Write-behind counters: dirty entries, flushes and their latency."""
+        return self.backend.metrics()
+
+    def close(self):
+        self.backend.close()
 
 
 
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark the AIAgent prompt layout: per-message f-string prompt with the
+date and categories near the top (before) vs the precompiled static prompt
+with volatile context in a trailing system message (after).
+
+Offline it reports prompt build time and size. With --live it sends the
+same messages with both layouts (first completion only, tools attached)
+and reports prompt/cached/completion tokens and latency; cached tokens are
+billed at the provider's discounted rate.
+
+Usage:
+    python scripts/benchmark_agent_prompt.py
+    OPENAI_API_KEY=... python scripts/benchmark_agent_prompt.py --live --live-runs 20
+"""
+import argparse
+import asyncio
+import datetime
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.ai_agent import AGENT_SYSTEM_PROMPT, AGENT_TOOLS, category_prompt_section, format_slugs
+from bot.categories_data import DEFAULT_CATEGORIES
+
+MESSAGES = ["Taxi 50k", "Lunch 45k", "Qahvaga 20k", "Salary 500$", "Dalerga 500k qarz berdim"]
+INTRO_END = "\n\nCATEGORY MAPPING RULES:"
+
+
+def legacy_messages(text: str) -> list:
+    """Previous layout: whole prompt re-formatted per message, volatile parts second."""
+    expense_slugs = [c['slug'] for c in DEFAULT_CATEGORIES if c.get('type') == 'expense']
+    income_slugs = [c['slug'] for c in DEFAULT_CATEGORIES if c.get('type') == 'income']
+    intro, rest = AGENT_SYSTEM_PROMPT.split(INTRO_END, 1)
+    prompt = f"""{intro}
+
+CURRENT DATE: {datetime.datetime.now().strftime('%Y-%m-%d')}
+
+AVAILABLE CATEGORIES (use slug):
+EXPENSES:
+{format_slugs(expense_slugs)}
+
+INCOME:
+{format_slugs(income_slugs)}{INTRO_END}{rest}"""
+    return [{"role": "system", "content": prompt}, {"role": "user", "content": text}]
+
+
+CATEGORY_SECTION = category_prompt_section(DEFAULT_CATEGORIES)  # Cached per user in the agent
+
+
+def current_messages(text: str) -> list:
+    context = f"CURRENT DATE: {datetime.datetime.now().strftime('%Y-%m-%d')}\n\n{CATEGORY_SECTION}"
+    return [
+        {"role": "system", "content": AGENT_SYSTEM_PROMPT},
+        {"role": "system", "content": context},
+        {"role": "user", "content": text},
+    ]
+
+
+def build_time_us(build, runs: int) -> float:
+    started = time.perf_counter()
+    for i in range(runs):
+        build(MESSAGES[i % len(MESSAGES)])
+    return (time.perf_counter() - started) / runs * 1_000_000
+
+
+async def live(build, runs: int, model: str) -> dict:
+    from openai import AsyncOpenAI
+
+    client = AsyncOpenAI()
+    prompt, cached, completion, latency = [], [], [], []
+    for i in range(runs):
+        started = time.perf_counter()
+        response = await client.chat.completions.create(
+            model=model,
+            messages=build(MESSAGES[i % len(MESSAGES)]),
+            tools=AGENT_TOOLS,
+            tool_choice="auto",
+        )
+        latency.append((time.perf_counter() - started) * 1000)
+        usage = response.usage
+        details = (usage.model_extra or {}).get("prompt_tokens_details") or {}
+        prompt.append(usage.prompt_tokens)
+        cached.append(details.get("cached_tokens", 0))
+        completion.append(usage.completion_tokens)
+    await client.close()
+    return {
+        "prompt": sum(prompt),
+        "cached": sum(cached),
+        "completion": sum(completion),
+        "p50_ms": statistics.median(latency),
+    }
+
+
+async def main(runs: int, live_runs: int, model: str, use_live: bool):
+    for name, build in (("before", legacy_messages), ("after", current_messages)):
+        text = "".join(m["content"] for m in build(MESSAGES[0]))
+        size, prefix = len(text), text.index("CURRENT DATE")
+        print(
+            f"{name:>6}: build {build_time_us(build, runs):6.1f} µs/message, "
+            f"{size} chars per request, {prefix} chars stable across users and days"
+        )
+
+    if not use_live:
+        print("(pass --live to measure billed tokens and latency against the API)")
+        return
+
+    print(f"\nlive, {live_runs} requests each on {model}:")
+    for name, build in (("before", legacy_messages), ("after", current_messages)):
+        result = await live(build, live_runs, model)
+        print(
+            f"{name:>6}: prompt {result['prompt']} tokens ({result['cached']} cached), "
+            f"completion {result['completion']}, p50 {result['p50_ms']:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10000, help="prompt builds for timing")
+    parser.add_argument("--live", action="store_true", help="call the OpenAI API")
+    parser.add_argument("--live-runs", type=int, default=10)
+    parser.add_argument("--model", default="gpt-5.1")
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.live_runs, args.model, args.live))
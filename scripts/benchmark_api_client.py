@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark BarakaAPIClient HTTP connections: a fresh httpx.AsyncClient per
+call (before) vs the shared keep-alive pool (after).
+
+Starts a local keep-alive HTTP server standing in for the API (or use --url
+with --token against a running API) and reports per-request latency, TCP
+connections the server accepted, and open file descriptors during a burst
+of concurrent calls (Linux /proc).
+
+Usage:
+    python scripts/benchmark_api_client.py
+    python scripts/benchmark_api_client.py --url http://localhost:8001 --token <jwt>
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.api_client import BarakaAPIClient, close_http_client
+
+BODY = b'{"id": 1, "name": "bench", "is_premium": false}'
+
+
+class StubServer:
+    """Minimal HTTP/1.1 server that keeps connections alive and counts them."""
+
+    def __init__(self):
+        self.connections = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                if length:
+                    await reader.readexactly(length)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n%s" % (len(BODY), BODY)
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+class FreshClientAPI(BarakaAPIClient):
+    """Previous behaviour: a new AsyncClient (new connection) for every call."""
+
+    async def get_me(self):
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{self.base_url}/auth/me", headers=self.headers)
+            response.raise_for_status()
+            return response.json()
+
+
+def open_fds() -> int:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except FileNotFoundError:
+        return -1
+
+
+async def measure(api: BarakaAPIClient, sequential: int, burst: int) -> dict:
+    latencies = []
+    for _ in range(sequential):
+        started = time.perf_counter()
+        await api.get_me()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    peak_fds = 0
+
+    async def call():
+        nonlocal peak_fds
+        await api.get_me()
+        peak_fds = max(peak_fds, open_fds())
+
+    for _ in range(3):  # Messages fan out into several concurrent lookups
+        await asyncio.gather(*(call() for _ in range(burst)))
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": statistics.quantiles(latencies, n=20)[18],
+        "peak_fds": peak_fds,
+        "fds_after": open_fds(),
+    }
+
+
+async def main(url: str, token: str, sequential: int, burst: int):
+    server = None
+    stub = StubServer()
+    if url is None:
+        server = await asyncio.start_server(stub.handle, "127.0.0.1", 0)
+        url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+    print(f"{sequential} sequential calls, then 3 bursts of {burst} concurrent calls against {url}")
+    for name, cls in (("before", FreshClientAPI), ("after", BarakaAPIClient)):
+        api = cls(url)
+        api.set_token(token)
+        accepted = stub.connections
+        result = await measure(api, sequential, burst)
+        connections = f", {stub.connections - accepted} TCP connections" if server else ""
+        print(
+            f"{name:>6}: p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms{connections}, "
+            f"peak {result['peak_fds']} open fds, {result['fds_after']} after"
+        )
+
+    await close_http_client()
+    if server:
+        server.close()
+        await server.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="API base URL (default: local stub server)")
+    parser.add_argument("--token", default="bench", help="bearer token for --url")
+    parser.add_argument("--sequential", type=int, default=500)
+    parser.add_argument("--burst", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.token, args.sequential, args.burst))
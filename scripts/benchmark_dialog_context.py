@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark DialogContext memory growth with many idle users: the previous
+unbounded dict (idle users kept until they speak again) vs the memory
+backend with TTL/LRU eviction.
+
+Every user sends one exchange (user + assistant message) and goes idle;
+after the TTL passes a single active user keeps talking. Reports traced
+Python heap after the burst and after the idle period, and get_context
+latency.
+
+Usage:
+    python scripts/benchmark_dialog_context.py --users 100000
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.dialog_context import DialogContext, MemoryDialogBackend
+
+
+class UnboundedDialogContext:
+    """Previous behaviour: dict of lists, ISO timestamps parsed on every read."""
+
+    def __init__(self, ttl_seconds: float):
+        self._contexts = {}
+        self.max_history = 10
+        self.ttl_seconds = ttl_seconds
+
+    async def add_message(self, user_id, role, content, metadata=None):
+        history = self._contexts.setdefault(user_id, [])
+        history.append({"role": role, "content": content, "timestamp": datetime.now().isoformat(),
+                        "metadata": metadata or {}})
+        if len(history) > self.max_history:
+            self._contexts[user_id] = history[-self.max_history:]
+
+    async def get_context(self, user_id, last_n=5):
+        if user_id not in self._contexts:
+            return []
+        cutoff = datetime.now() - timedelta(seconds=self.ttl_seconds)
+        self._contexts[user_id] = [
+            m for m in self._contexts[user_id] if datetime.fromisoformat(m["timestamp"]) > cutoff
+        ]
+        return self._contexts[user_id][-last_n:]
+
+
+async def run(name: str, context, users: int, ttl_seconds: float, reads: int):
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for user_id in range(users):
+        await context.add_message(user_id, "user", f"Kofe 15000 so'm #{user_id}")
+        await context.add_message(user_id, "assistant", "Saqlandi: Kofe — 15 000 UZS")
+    burst = tracemalloc.get_traced_memory()[0] - baseline
+
+    await asyncio.sleep(ttl_seconds + 0.1)  # Everyone goes idle
+
+    active = users  # One new user keeps talking
+    latencies = []
+    for i in range(reads):
+        await context.add_message(active, "user", f"message {i}")
+        started = time.perf_counter()
+        await context.get_context(active)
+        latencies.append((time.perf_counter() - started) * 1e6)
+    idle = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    print(
+        f"{name:>9}: after burst {burst / 1e6:.1f} MB, after idle {idle / 1e6:.1f} MB | "
+        f"get_context p50 {statistics.median(latencies):.1f} us"
+    )
+
+
+async def main(users: int, ttl_seconds: float, max_users: int, reads: int):
+    print(f"{users} users, TTL {ttl_seconds} s, cap {max_users} users")
+    await run("unbounded", UnboundedDialogContext(ttl_seconds), users, ttl_seconds, reads)
+    backend = MemoryDialogBackend(max_history=10, ttl_seconds=ttl_seconds, max_users=max_users)
+    await run("memory", DialogContext(backend=backend), users, ttl_seconds, reads)
+    print(f"   memory: {backend.metrics()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--ttl", type=float, default=2.0, help="seconds (30 minutes in production)")
+    parser.add_argument("--max-users", type=int, default=50_000)
+    parser.add_argument("--reads", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.ttl, args.max_users, args.reads))
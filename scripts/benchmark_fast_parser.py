@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local fast-path parser against the labeled message corpus.
+
+Reports how many messages are resolved without the LLM (hit rate), how many
+of those local answers match the labels (accuracy), the local parse latency,
+and the LLM latency saved. The LLM round trip is not called; pass its
+observed p50 with --llm-latency-ms.
+
+Usage:
+    python scripts/benchmark_fast_parser.py
+    python scripts/benchmark_fast_parser.py --runs 1000 --llm-latency-ms 2400 -v
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.services.ai_parser import AITransactionParser
+
+DEFAULT_CORPUS = Path(__file__).parent.parent / "tests" / "fixtures" / "parse_corpus.jsonl"
+
+
+def load_corpus(path: Path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def matches_label(result: dict, case: dict) -> bool:
+    return (
+        result["type"] == case["type"]
+        and result["amount"] == Decimal(case["amount"])
+        and result["currency"] == case["currency"]
+        and result["category_slug"] == case["category_slug"]
+    )
+
+
+def main(corpus_path: Path, runs: int, llm_latency_ms: float, verbose: bool):
+    corpus = load_corpus(corpus_path)
+    parser = AITransactionParser(api_key="benchmark")  # client is never called
+
+    hits = correct = 0
+    timings_us = []
+    for case in corpus:
+        started = time.perf_counter()
+        for _ in range(runs):
+            result = parser._fast_parse(case["text"])
+        timings_us.append((time.perf_counter() - started) / runs * 1_000_000)
+
+        if result is None:
+            outcome = "llm"
+        else:
+            hits += 1
+            ok = matches_label(result, case)
+            correct += ok
+            outcome = "ok" if ok else "WRONG"
+        if verbose:
+            print(f"  {outcome:5} {case['text']}")
+
+    total = len(corpus)
+    ordered = sorted(timings_us)
+    p99 = ordered[min(total - 1, int(round(0.99 * (total - 1))))]
+    print(f"corpus:        {total} messages ({corpus_path.name})")
+    print(f"hit rate:      {hits}/{total} = {hits / total:.1%}")
+    print(f"accuracy:      {correct}/{hits} = {correct / hits:.1%} of local answers" if hits else "accuracy:      n/a")
+    print(f"local parse:   p50 {statistics.median(timings_us):.1f} µs, p99 {p99:.1f} µs")
+    print(
+        f"latency saved: {hits * llm_latency_ms / 1000:.1f} s over the corpus "
+        f"({hits / total * llm_latency_ms:.0f} ms per message at {llm_latency_ms:.0f} ms per LLM call)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--runs", type=int, default=200, help="parses per message for timing")
+    parser.add_argument("--llm-latency-ms", type=float, default=1800.0, help="observed LLM parse latency")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print the outcome per message")
+    args = parser.parse_args()
+    main(args.corpus, args.runs, args.llm_latency_ms, args.verbose)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark category keyword matching: linear `keyword in text` scan vs the
+compiled Aho–Corasick automaton.
+
+Keyword tables are CATEGORY_KEYWORDS padded with synthetic Cyrillic/Latin
+stems up to each size; texts are the messages of the parse corpus.
+Reports build time and per-message p50/p99 latency.
+
+Usage:
+    python scripts/benchmark_keyword_matcher.py
+    python scripts/benchmark_keyword_matcher.py --sizes 100 1000 10000 50000 --runs 50
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.services.ai_parser import CATEGORY_KEYWORDS, CATEGORY_SLUGS
+from api.services.keyword_matcher import KeywordMatcher
+
+CORPUS = Path(__file__).parent.parent / "tests" / "fixtures" / "parse_corpus.jsonl"
+ALPHABET = "абвгдеёжзийклмнопрстуфхцчшщъыьэюяabcdefghijklmnopqrstuvwxyz"
+
+
+def keyword_table(size: int, rng: random.Random) -> dict[str, str]:
+    table = dict(CATEGORY_KEYWORDS)
+    while len(table) < size:
+        stem = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(4, 10)))
+        table.setdefault(stem, rng.choice(CATEGORY_SLUGS))
+    return table
+
+
+def linear_scan(table: dict[str, str], text: str) -> list[tuple[str, str]]:
+    text_lower = text.lower()
+    return [(keyword, slug) for keyword, slug in table.items() if keyword in text_lower]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def measure(fn, texts: list[str], runs: int) -> list[float]:
+    timings = []
+    for text in texts:
+        started = time.perf_counter()
+        for _ in range(runs):
+            fn(text)
+        timings.append((time.perf_counter() - started) / runs * 1_000_000)
+    return timings
+
+
+def main(sizes: list[int], runs: int, seed: int):
+    rng = random.Random(seed)
+    with open(CORPUS, encoding="utf-8") as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+
+    print(f"{len(texts)} messages, {runs} runs each; latencies in µs per message")
+    print(f"{'keywords':>9} {'build ms':>9} {'scan p50':>9} {'scan p99':>9} {'ac p50':>8} {'ac p99':>8} {'speedup':>8}")
+    for size in sizes:
+        table = keyword_table(size, rng)
+
+        started = time.perf_counter()
+        matcher = KeywordMatcher(table)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        for text in texts:  # Same answers before timing anything
+            assert sorted(matcher.find_all(text)) == sorted(linear_scan(table, text)), text
+
+        scan = measure(lambda text: linear_scan(table, text), texts, runs)
+        automaton = measure(matcher.find_all, texts, runs)
+        print(
+            f"{len(table):>9} {build_ms:>9.1f} "
+            f"{statistics.median(scan):>9.1f} {percentile(scan, 99):>9.1f} "
+            f"{statistics.median(automaton):>8.1f} {percentile(automaton, 99):>8.1f} "
+            f"{statistics.median(scan) / statistics.median(automaton):>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    main(args.sizes, args.runs, args.seed)
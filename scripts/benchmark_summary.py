@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark /analytics/summary: sequential endpoint calls vs the fused statement.
+
+The sequential path is the previous get_summary composition
+(get_balance -> get_category_breakdown -> get_trends on one session).
+Reports p50/p99 latency per dataset size.
+
+Usage:
+    python scripts/benchmark_summary.py
+    python scripts/benchmark_summary.py --sizes 1000 10000 --runs 200
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import select
+
+from api.database import AsyncSessionLocal, init_db
+from api.models.user import User
+from api.routers.analytics import get_balance, get_category_breakdown, get_trends
+from api.services.analytics import fetch_dashboard_summary
+from scripts.benchmark_trends import seed_user, drop_user
+
+
+async def sequential_summary(db, user):
+    await get_balance("month", None, None, user, db)
+    await get_category_breakdown("month", "expense", user, db)
+    await get_trends("month", "day", user, db)
+
+
+async def fused_summary(db, user):
+    end_date = datetime.now()
+    await fetch_dashboard_summary(db, user, end_date - timedelta(days=30), end_date, "day")
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def measure(fn, user_id, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        async with AsyncSessionLocal() as db:
+            user = (await db.execute(select(User).where(User.id == user_id))).scalar_one()
+            started = time.perf_counter()
+            await fn(db, user)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def main(sizes: list[int], runs: int):
+    await init_db()
+
+    print(f"{'rows':>8} {'path':>11} {'p50':>9} {'p99':>9}")
+    for size in sizes:
+        user_id = await seed_user(size)
+        try:
+            for name, fn in (("sequential", sequential_summary), ("fused", fused_summary)):
+                timings = await measure(fn, user_id, runs)
+                print(
+                    f"{size:>8} {name:>11} {statistics.median(timings):>7.1f}ms "
+                    f"{percentile(timings, 99):>7.1f}ms"
+                )
+        finally:
+            await drop_user(user_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark analytics summary")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--runs", type=int, default=100)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.sizes, args.runs))
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark /analytics/trends: Python bucketing vs SQL bucketing.
+
+Seeds a throwaway user with N transactions spread over the last year,
+times both implementations and removes the user afterwards.
+
+Usage:
+    python scripts/benchmark_trends.py                    # 1k, 10k, 100k
+    python scripts/benchmark_trends.py --sizes 1000 5000  # custom sizes
+    python scripts/benchmark_trends.py --runs 20
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import select, and_, delete, insert
+
+from api.database import AsyncSessionLocal, init_db
+from api.models.user import User
+from api.models.transaction import Transaction
+from api.services.analytics import fetch_trend_series
+from api.services.rollup import rebuild_daily_totals
+
+
+async def legacy_trends(db, user_id, start_date, end_date, granularity):
+    """Previous implementation: load ORM rows and bucket them in Python."""
+    result = await db.execute(
+        select(Transaction).where(
+            and_(
+                Transaction.user_id == user_id,
+                Transaction.transaction_date >= start_date,
+                Transaction.transaction_date <= end_date
+            )
+        ).order_by(Transaction.transaction_date)
+    )
+    transactions = result.scalars().all()
+
+    data_points = {}
+    current = start_date
+    while current <= end_date:
+        if granularity == "day":
+            key = current.strftime("%Y-%m-%d")
+            next_period = current + timedelta(days=1)
+        elif granularity == "week":
+            key = current.strftime("%Y-W%W")
+            next_period = current + timedelta(days=7)
+        else:
+            key = current.strftime("%Y-%m")
+            next_period = (current.replace(day=1) + timedelta(days=32)).replace(day=1)
+        data_points[key] = {"income": Decimal("0"), "expense": Decimal("0")}
+        current = next_period
+
+    for tx in transactions:
+        if granularity == "day":
+            key = tx.transaction_date.strftime("%Y-%m-%d")
+        elif granularity == "week":
+            key = tx.transaction_date.strftime("%Y-W%W")
+        else:
+            key = tx.transaction_date.strftime("%Y-%m")
+        if key in data_points:
+            data_points[key][tx.type] += tx.amount
+
+    running_balance = Decimal("0")
+    series = []
+    for key in sorted(data_points):
+        running_balance += data_points[key]["income"] - data_points[key]["expense"]
+        series.append((key, running_balance))
+    return series
+
+
+async def seed_user(count: int):
+    """Create a benchmark user with `count` random transactions."""
+    user_id = uuid4()
+    now = datetime.now()
+
+    async with AsyncSessionLocal() as db:
+        db.add(User(
+            id=user_id,
+            telegram_id=-random.randint(1, 2**62),
+            phone_number=f"bench-{user_id.hex[:12]}",
+            name=f"bench-{count}",
+        ))
+        await db.commit()
+
+        batch = []
+        for i in range(count):
+            batch.append({
+                "id": uuid4(),
+                "user_id": user_id,
+                "type": "income" if random.random() < 0.2 else "expense",
+                "amount": Decimal(random.randint(1_000, 500_000)),
+                "currency": "uzs",
+                "transaction_date": now - timedelta(seconds=random.randint(0, 365 * 24 * 3600)),
+            })
+            if len(batch) == 5000:
+                await db.execute(insert(Transaction), batch)
+                batch = []
+        if batch:
+            await db.execute(insert(Transaction), batch)
+        # Bulk inserts bypass the API, so populate the rollup explicitly
+        await rebuild_daily_totals(db, user_id)
+        await db.commit()
+
+    return user_id
+
+
+async def drop_user(user_id):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
+
+
+async def time_it(fn, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            await fn(db)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def main(sizes: list[int], runs: int):
+    await init_db()
+
+    print(f"{'rows':>8} {'granularity':>12} {'python p50':>12} {'sql p50':>10} {'speedup':>8}")
+    for size in sizes:
+        user_id = await seed_user(size)
+        try:
+            end_date = datetime.now()
+            for period, granularity in (("month", "day"), ("year", "week"), ("year", "month")):
+                start_date = end_date - timedelta(days=30 if period == "month" else 365)
+
+                legacy = await time_it(
+                    lambda db: legacy_trends(db, user_id, start_date, end_date, granularity), runs
+                )
+                sql = await time_it(
+                    lambda db: fetch_trend_series(db, user_id, start_date, end_date, granularity), runs
+                )
+
+                legacy_p50 = statistics.median(legacy)
+                sql_p50 = statistics.median(sql)
+                print(
+                    f"{size:>8} {granularity:>12} {legacy_p50:>10.1f}ms {sql_p50:>8.1f}ms "
+                    f"{legacy_p50 / sql_p50:>7.1f}x"
+                )
+        finally:
+            await drop_user(user_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark trends bucketing")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.sizes, args.runs))
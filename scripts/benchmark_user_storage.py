@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark bot UserStorage write and read latency with many users: the JSON
+file backend flushed on every change (synchronous) or written behind at
+most once per second, vs SQLite (WAL).
+
+Usage:
+    python scripts/benchmark_user_storage.py --users 100000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.user_storage import UserStorage
+
+
+def seed(directory: Path, users: int):
+    data = {
+        str(100_000_000 + i): {"token": f"eyJ.token.{i}", "username": f"user{i}", "language": "uz"}
+        for i in range(users)
+    }
+    (directory / "users.json").write_text(json.dumps(data, indent=2))
+
+
+def timed(call, runs: int) -> list:
+    latencies = []
+    for i in range(runs):
+        started = time.perf_counter()
+        call(i)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: list) -> str:
+    p95 = statistics.quantiles(latencies, n=20)[18] if len(latencies) > 1 else latencies[0]
+    return f"{name} p50 {statistics.median(latencies):.3f} ms, p95 {p95:.3f} ms"
+
+
+MODES = (
+    # name, backend, flush interval
+    ("json sync", "json", "0"),
+    ("json write-behind", "json", "1"),
+    ("sqlite", "sqlite", None),
+)
+
+
+def main(users: int, json_writes: int, writes: int):
+    print(f"{users} users")
+    for name, backend, interval in MODES:
+        if interval is not None:
+            os.environ["USER_STORAGE_FLUSH_INTERVAL"] = interval
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp)
+            seed(directory, users)
+
+            started = time.perf_counter()
+            storage = UserStorage(tmp, backend=backend)  # sqlite imports users.json here
+            load_s = time.perf_counter() - started
+
+            runs = json_writes if name == "json sync" else writes
+            langs = ("ru", "uz", "en")
+            write = timed(lambda i: storage.set_user_language(100_000_000 + i * 7 % users, langs[i % 3]), runs)
+            token = timed(lambda i: storage.save_user_token(100_000_000 + i * 13 % users, f"t{i}", "u"), runs)
+            read = timed(lambda i: storage.get_user_token(100_000_000 + i * 11 % users), 5000)
+            storage.close()
+            line = (
+                f"{name:>17}: start {load_s:.2f} s | {report('language write', write)} | "
+                f"{report('token save', token)} | {report('read', read)}"
+            )
+            metrics = storage.metrics()
+            if metrics:
+                line += (
+                    f" | {metrics['writes']} writes in {metrics['flushes']} flushes, "
+                    f"flush max {metrics['max_flush_ms']:.0f} ms off the caller"
+                    if interval != "0" else f" | flush max {metrics['max_flush_ms']:.0f} ms in the caller"
+                )
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--json-writes", type=int, default=20, help="synchronous mode rewrites the file per write")
+    parser.add_argument("--writes", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.users, args.json_writes, args.writes)
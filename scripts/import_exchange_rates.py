@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Backfill the exchange_rates table from the CBU archive (or offline fixtures).
+
+Usage:
+    python scripts/import_exchange_rates.py --from 2024-01-01 --to 2024-12-31
+    python scripts/import_exchange_rates.py --fixtures tests/fixtures/cbu
+"""
+import argparse
+import asyncio
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+
+from api.database import AsyncSessionLocal
+from api.services.exchange_rates import fetch_archive_day, load_fixture_rows, rows_from_cbu, upsert_rates
+
+
+async def download_rows(start: date, end: date, concurrency: int) -> list[dict]:
+    """Fetch every day in [start, end] over one client, `concurrency` requests at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+    async with httpx.AsyncClient(timeout=15.0) as client:
+        async def fetch(day: date) -> list[dict]:
+            async with semaphore:
+                try:
+                    return rows_from_cbu(await fetch_archive_day(client, day))
+                except Exception as e:
+                    print(f"⚠️  {day}: {e}")
+                    return []
+
+        results = await asyncio.gather(*(fetch(day) for day in days))
+
+    return [row for rows in results for row in rows]
+
+
+async def main(args):
+    if args.fixtures:
+        rows = load_fixture_rows(args.fixtures)
+    else:
+        rows = await download_rows(args.start, args.end, args.concurrency)
+
+    async with AsyncSessionLocal() as db:
+        count = await upsert_rates(db, rows)
+        await db.commit()
+
+    print(f"✅ Imported {count} rates")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill historical exchange rates")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat)
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--fixtures", help="Directory of CBU JSON files to import instead of downloading")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    if not args.fixtures and not args.start:
+        parser.error("either --from or --fixtures is required")
+
+    asyncio.run(main(args))
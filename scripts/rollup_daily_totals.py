@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Maintain the user_daily_totals rollup.
+
+    rebuild  recompute rollup rows from raw transactions (backfill / repair)
+    check    diff the rollup against raw transactions, exit 1 on drift
+
+Usage:
+    python scripts/rollup_daily_totals.py rebuild
+    python scripts/rollup_daily_totals.py rebuild --user <uuid>
+    python scripts/rollup_daily_totals.py check [--user <uuid>]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from uuid import UUID
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.database import AsyncSessionLocal
+from api.services.rollup import find_rollup_drift, rebuild_daily_totals
+
+
+async def rebuild(user_id):
+    async with AsyncSessionLocal() as db:
+        rows = await rebuild_daily_totals(db, user_id)
+        await db.commit()
+    print(f"✅ Rebuilt {rows} rollup rows")
+    return 0
+
+
+async def check(user_id):
+    async with AsyncSessionLocal() as db:
+        drift = await find_rollup_drift(db, user_id)
+
+    if not drift:
+        print("✅ Rollup matches transactions")
+        return 0
+
+    print(f"❌ {len(drift)} drifted rollup keys:")
+    for row in drift[:50]:
+        print(
+            f"   user={row['user_id']} day={row['day']} category={row['category_id']} "
+            f"type={row['type']} raw={row['raw_total']}/{row['raw_count']} "
+            f"rollup={row['rollup_total']}/{row['rollup_count']}"
+        )
+    if len(drift) > 50:
+        print(f"   ... and {len(drift) - 50} more")
+    return 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the daily totals rollup")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user", type=UUID, default=None, help="Limit to one user id")
+    args = parser.parse_args()
+
+    command = rebuild if args.command == "rebuild" else check
+    sys.exit(asyncio.run(command(args.user)))
@@ -0,0 +1 @@
+"""Modules used by both the API and the bot (copied into both images)."""
@@ -0,0 +1,333 @@
+"""
+Shared scheduler for OpenAI calls (bot agent, receipt vision, API parser).
+
+Every call waits for its model's token buckets (requests and tokens per
+minute) and a concurrency slot. Waiters are served by subscription tier,
+then FIFO, so a burst of free-tier traffic cannot starve paying users.
+Identical prompts already in flight are coalesced into one call.
+
+Stdlib only: both the API and the bot image copy the shared/ package.
+Limits are per process; set LLM_RATE_LIMITS to the share of the
+organisation's limits each process may use, e.g.
+    LLM_RATE_LIMITS='{"gpt-5.1": [250, 250000], "whisper-1": [25, 0]}'
+([requests per minute, tokens per minute]; 0 disables that bucket).
+"""
+import asyncio
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TIER_PRIORITY = {"premium": 0, "pro": 1, "plus": 2, "trial": 2, "free_trial": 2, "free": 3}
+DEFAULT_PRIORITY = 3
+
+# [requests per minute, tokens per minute]
+DEFAULT_RATE_LIMITS = {
+    "gpt-5.1": (500, 500_000),
+    "gpt-5-mini": (500, 500_000),
+    "gpt-5-nano": (500, 500_000),
+    "gpt-4o": (500, 300_000),
+    "whisper-1": (50, 0),
+}
+FALLBACK_RATE_LIMIT = (500, 200_000)
+COMPLETION_TOKENS_ESTIMATE = 500
+IMAGE_TOKENS_ESTIMATE = 1000
+
+
+def estimate_tokens(kwargs: Dict[str, Any]) -> int:
+    """Rough prompt + completion token count (~4 characters per token)."""
+    chars = len(json.dumps(kwargs["tools"], ensure_ascii=False)) if kwargs.get("tools") else 0
+    images = 0
+    for message in kwargs.get("messages", []):
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", None)
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "image_url":
+                    images += 1  # Base64 size says nothing about image tokens
+                else:
+                    chars += len(part.get("text", ""))
+    return chars // 4 + images * IMAGE_TOKENS_ESTIMATE + COMPLETION_TOKENS_ESTIMATE
+
+
+def prompt_key(kwargs: Dict[str, Any]) -> str:
+    payload = json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, holding at most one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (0 when available now)."""
+        self._refill()
+        # Requests larger than the bucket go through once it is full
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        """Take `amount` (negative refunds an over-estimate; never past capacity)."""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+@dataclass
+class _SharedCall:
+    task: asyncio.Future
+    waiters: int = 0
+
+
+class _ModelQueue:
+    def __init__(self, model: str, requests_per_minute: int, tokens_per_minute: int, max_concurrency: int):
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrency = max_concurrency
+        self.waiters: list[_Waiter] = []
+        self.in_flight = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "coalesced": 0,
+            "throttled": 0,
+            "max_queue_depth": 0,
+            "wait_ms_total": 0.0,
+        }
+
+    def wait_time(self, tokens: int) -> float:
+        return max(
+            self.requests.wait_time(1) if self.requests else 0.0,
+            self.tokens.wait_time(tokens) if self.tokens else 0.0,
+        )
+
+    def take(self, tokens: int) -> None:
+        if self.requests:
+            self.requests.take(1)
+        if self.tokens:
+            self.tokens.take(tokens)
+
+
+class LLMScheduler:
+    """Per-model rate limits, tier priority and in-flight coalescing for LLM calls."""
+
+    def __init__(
+        self,
+        rate_limits: Optional[Dict[str, tuple]] = None,
+        max_concurrency: int = 20,
+    ):
+        self.rate_limits = {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}
+        self.max_concurrency = max_concurrency
+        self._queues: Dict[str, _ModelQueue] = {}
+        self._inflight: Dict[str, _SharedCall] = {}
+        self._seq = itertools.count()
+
+    def _queue(self, model: str) -> _ModelQueue:
+        queue = self._queues.get(model)
+        if queue is None:
+            rpm, tpm = self.rate_limits.get(model, FALLBACK_RATE_LIMIT)
+            queue = self._queues[model] = _ModelQueue(model, rpm, tpm, self.max_concurrency)
+        return queue
+
+    def _dispatch(self, queue: _ModelQueue) -> None:
+        """Admit waiters in priority order while slots and bucket capacity allow."""
+        queue.timer = None
+        while queue.waiters and queue.in_flight < queue.max_concurrency:
+            head = queue.waiters[0]
+            if head.future.done():  # Cancelled while waiting
+                heapq.heappop(queue.waiters)
+                continue
+            delay = queue.wait_time(head.tokens)
+            if delay > 0:
+                queue.stats["throttled"] += 1
+                queue.timer = asyncio.get_running_loop().call_later(delay, self._dispatch, queue)
+                return
+            heapq.heappop(queue.waiters)
+            queue.take(head.tokens)
+            queue.in_flight += 1
+            head.future.set_result(None)
+
+    def _release(self, queue: _ModelQueue) -> None:
+        queue.in_flight -= 1
+        if queue.timer is None:
+            self._dispatch(queue)
+
+    async def _acquire(self, queue: _ModelQueue, priority: int, tokens: int) -> None:
+        waiter = _Waiter(priority, next(self._seq), tokens, asyncio.get_running_loop().create_future())
+        heapq.heappush(queue.waiters, waiter)
+        queue.stats["max_queue_depth"] = max(queue.stats["max_queue_depth"], len(queue.waiters))
+        if queue.timer is None:
+            self._dispatch(queue)
+
+        started = time.monotonic()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release(queue)  # Admitted just as we were cancelled
+            raise
+        queue.stats["wait_ms_total"] += (time.monotonic() - started) * 1000
+
+    async def _call(self, queue: _ModelQueue, call: Callable[[], Awaitable[T]], priority: int, tokens: int) -> T:
+        try:
+            await self._acquire(queue, priority, tokens)
+            try:
+                result = await call()
+            finally:
+                self._release(queue)
+        except BaseException:
+            queue.stats["failed"] += 1
+            raise
+        queue.stats["completed"] += 1
+        return result
+
+    async def run(
+        self,
+        model: str,
+        call: Callable[[], Awaitable[T]],
+        *,
+        tier: Optional[str] = None,
+        tokens: int = 0,
+        dedup_key: Optional[str] = None,
+    ) -> T:
+        """
+        Run `call` once `model` has capacity.
+
+        Calls sharing a dedup_key while one is in flight get that call's
+        result instead of issuing their own. The shared call runs as a task
+        owned by the scheduler: cancelling one caller only cancels its own
+        wait, and the call is cancelled once every caller has gone.
+        """
+        queue = self._queue(model)
+        queue.stats["submitted"] += 1
+        priority = TIER_PRIORITY.get(tier or "", DEFAULT_PRIORITY)
+        if dedup_key is None:
+            return await self._call(queue, call, priority, tokens)
+
+        shared = self._inflight.get(dedup_key)
+        if shared is not None:
+            queue.stats["coalesced"] += 1
+        else:
+            shared = self._inflight[dedup_key] = _SharedCall(
+                asyncio.ensure_future(self._call(queue, call, priority, tokens))
+            )
+            shared.task.add_done_callback(lambda _: self._forget(dedup_key, shared))
+        shared.waiters += 1
+        try:
+            return await asyncio.shield(shared.task)
+        except asyncio.CancelledError:
+            shared.waiters -= 1
+            if not shared.task.done() and shared.waiters == 0:
+                shared.task.cancel()  # Nobody is left waiting for the answer
+            raise
+
+    def _forget(self, dedup_key: str, shared: "_SharedCall") -> None:
+        if self._inflight.get(dedup_key) is shared:
+            del self._inflight[dedup_key]
+        if not shared.task.cancelled():
+            shared.task.exception()  # Mark retrieved when every caller was cancelled
+
+    async def chat(self, client, *, tier: Optional[str] = None, **kwargs):
+        """client.chat.completions.create(**kwargs) through the scheduler."""
+        model = kwargs["model"]
+        estimate = estimate_tokens(kwargs)
+
+        async def call():
+            response = await client.chat.completions.create(**kwargs)
+            usage = getattr(response, "usage", None)
+            bucket = self._queues[model].tokens
+            if usage is not None and bucket is not None:
+                bucket.take(usage.total_tokens - estimate)  # Settle the estimate
+            return response
+
+        return await self.run(model, call, tier=tier, tokens=estimate, dedup_key=prompt_key(kwargs))
+
+    async def chat_stream(
+        self,
+        client,
+        on_chunk: Callable[[Any], None],
+        *,
+        tier: Optional[str] = None,
+        **kwargs,
+    ) -> None:
+        """
+        Streaming client.chat.completions.create(**kwargs) through the scheduler.
+
+        `on_chunk` is called with every chunk while the call holds its slot,
+        so it must not block. Streams are never coalesced.
+        """
+        model = kwargs["model"]
+        estimate = estimate_tokens(kwargs)
+        extra_body = {**kwargs.pop("extra_body", {}), "stream_options": {"include_usage": True}}
+
+        async def call():
+            stream = await client.chat.completions.create(stream=True, extra_body=extra_body, **kwargs)
+            total_tokens = None
+            async for chunk in stream:
+                usage = getattr(chunk, "usage", None)
+                if usage is not None:
+                    total_tokens = usage.total_tokens
+                on_chunk(chunk)
+            bucket = self._queues[model].tokens
+            if total_tokens is not None and bucket is not None:
+                bucket.take(total_tokens - estimate)  # Settle the estimate
+
+        await self.run(model, call, tier=tier, tokens=estimate)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model queue depth, in-flight calls and counters."""
+        return {
+            model: {
+                **queue.stats,
+                "queue_depth": sum(1 for waiter in queue.waiters if not waiter.future.done()),
+                "in_flight": queue.in_flight,
+            }
+            for model, queue in self._queues.items()
+        }
+
+
+def _rate_limits_from_env() -> Dict[str, tuple]:
+    raw = os.getenv("LLM_RATE_LIMITS")
+    if not raw:
+        return {}
+    try:
+        return {model: tuple(limits) for model, limits in json.loads(raw).items()}
+    except (ValueError, TypeError, AttributeError):
+        logger.error("Invalid LLM_RATE_LIMITS, using defaults")
+        return {}
+
+
+llm_scheduler = LLMScheduler(
+    rate_limits=_rate_limits_from_env(),
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "20")),
+)
@@ -12,7 +12,7 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sess
 from sqlalchemy.pool import NullPool
 
 from api.main import app
-from api.database import Base, get_db
+from api.database import Base, get_db, get_sessionmaker
 from api.models.user import User
 from api.models.category import Category
 from api.auth.jwt import get_password_hash
@@ -62,6 +62,7 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
         yield db_session
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_sessionmaker] = lambda: TestSessionLocal
     
     async with AsyncClient(app=app, base_url="http://test") as ac:
         yield ac
@@ -0,0 +1,101 @@
+import asyncio
+import json
+from types import SimpleNamespace as NS
+
+from bot.ai_agent import AIAgent
+from bot.handlers.common import StreamingReply
+from shared.llm_scheduler import llm_scheduler
+
+
+def chunk(content=None, tool_calls=None):
+    return NS(choices=[NS(delta=NS(content=content, tool_calls=tool_calls))], usage=None)
+
+
+def tool_part(index, id=None, name=None, arguments=None):
+    return NS(index=index, id=id, function=NS(name=name, arguments=arguments))
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.kwargs = None
+
+    async def create(self, **kwargs):
+        self.kwargs = kwargs
+
+        async def stream():
+            for c in self.chunks:
+                yield c
+            yield NS(choices=[], usage=NS(total_tokens=42))
+
+        return stream()
+
+
+def agent_with(chunks):
+    agent = AIAgent(api_client=None)
+    completions = FakeStream(chunks)
+    agent.client = NS(chat=NS(completions=completions))
+    return agent, completions
+
+
+async def test_text_deltas_reach_callback():
+    agent, completions = agent_with([chunk("Bal"), chunk("ance: "), chunk("100")])
+    seen = []
+
+    message = await agent._complete("free", seen.append, messages=[{"role": "user", "content": "hi"}])
+
+    assert message.content == "Balance: 100"
+    assert message.tool_calls is None
+    assert seen == ["Bal", "Balance: ", "Balance: 100"]
+    assert completions.kwargs["stream"] is True
+    assert completions.kwargs["extra_body"] == {"stream_options": {"include_usage": True}}
+
+
+async def test_tool_call_deltas_assembled_in_order():
+    args_a = json.dumps({"amount": 50000, "currency": "uzs"})
+    args_b = json.dumps({"amount": 20000, "currency": "uzs"})
+    agent, _ = agent_with([
+        chunk(tool_calls=[tool_part(0, id="call_a", name="create_transaction", arguments="")]),
+        chunk(tool_calls=[tool_part(1, id="call_b", name="create_transaction", arguments=args_b[:10])]),
+        chunk(tool_calls=[tool_part(0, arguments=args_a[:7])]),
+        chunk(tool_calls=[tool_part(0, arguments=args_a[7:]), tool_part(1, arguments=args_b[10:])]),
+    ])
+    seen = []
+
+    message = await agent._complete("free", seen.append, messages=[], tools=[], tool_choice="auto")
+
+    assert seen == []
+    assert message.content is None
+    assert [(c.id, c.function.name, json.loads(c.function.arguments)) for c in message.tool_calls] == [
+        ("call_a", "create_transaction", {"amount": 50000, "currency": "uzs"}),
+        ("call_b", "create_transaction", {"amount": 20000, "currency": "uzs"}),
+    ]
+    assert llm_scheduler.metrics()[agent.model]["completed"] >= 1
+
+
+class FakeMessage:
+    def __init__(self):
+        self.sent = []
+        self.edits = []
+
+    async def reply_text(self, text, parse_mode=None):
+        self.sent.append(text)
+        return NS(edit_text=self.edit_text)
+
+    async def edit_text(self, text, parse_mode=None):
+        self.edits.append((text, parse_mode))
+
+
+async def test_streaming_reply_throttles_edits():
+    message = FakeMessage()
+    reply = StreamingReply(message, interval=0.05)
+    text = ""
+    for word in ["Your", " balance", " is", " 100", " 000", " UZS"]:
+        text += word
+        reply.update(text)
+        await asyncio.sleep(0.01)
+
+    assert message.sent == ["Your"]  # First text goes out immediately
+    assert await reply.finish("*Your balance is 100 000 UZS*")
+    assert len(message.edits) <= 3
+    assert message.edits[-1] == ("*Your balance is 100 000 UZS*", "Markdown")
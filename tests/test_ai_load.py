@@ -0,0 +1,116 @@
+"""
+Load test for /ai/parse-transaction with a stubbed OpenAI client.
+
+Each fake completion takes LLM_DELAY seconds; parallel requests must
+overlap (wall time close to one call), the scheduler's concurrency
+limit must bound how many run at once, and a paying user queued behind
+free-tier traffic must be served first.
+"""
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+from uuid import uuid4
+
+from httpx import AsyncClient
+
+from api.auth.jwt import get_current_user
+from api.database import get_db
+from api.main import app
+from api.models.user import User
+from api.services.ai_parser import AITransactionParser, get_ai_parser
+from shared.llm_scheduler import LLMScheduler
+
+LLM_DELAY = 0.2
+REQUESTS = 10
+
+
+class SlowCompletions:
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.order = []
+
+    async def create(self, **kwargs):
+        self.order.append(kwargs["messages"][-1]["content"])
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(LLM_DELAY)
+        finally:
+            self.in_flight -= 1
+        content = json.dumps({
+            "type": "expense", "amount": 120000, "currency": "uzs",
+            "description": "Подарок", "category_slug": "shopping", "confidence": 0.9,
+        })
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(total_tokens=100),
+        )
+
+
+class NoCategorySession:
+    async def execute(self, *args, **kwargs):
+        return SimpleNamespace(scalar_one_or_none=lambda: None)
+
+
+async def run_parallel(max_concurrency: int) -> tuple[float, SlowCompletions]:
+    parser = AITransactionParser(api_key="test")
+    completions = SlowCompletions()
+    parser.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    async def override_get_db():
+        yield NoCategorySession()
+
+    app.dependency_overrides[get_current_user] = lambda: User(id=uuid4(), subscription_type="free")
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_ai_parser] = lambda: parser
+    scheduler = patch("api.services.ai_parser.llm_scheduler", LLMScheduler(max_concurrency=max_concurrency))
+    scheduler.start()
+    try:
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            started = time.perf_counter()
+            responses = await asyncio.gather(*[
+                # No amount in the text: skips the fast path and the parse cache
+                client.post("/ai/parse-transaction", data={"text": f"подарок для коллеги №{'и' * i}"})
+                for i in range(REQUESTS)
+            ])
+            elapsed = time.perf_counter() - started
+    finally:
+        scheduler.stop()
+        app.dependency_overrides.clear()
+
+    assert all(response.status_code == 200 for response in responses)
+    assert all(float(response.json()["amount"]) == 120000 for response in responses)
+    return elapsed, completions
+
+
+async def test_parallel_parse_calls_overlap():
+    elapsed, completions = await run_parallel(max_concurrency=REQUESTS)
+    assert completions.peak == REQUESTS
+    assert elapsed < LLM_DELAY * 3  # Serialized would be LLM_DELAY * REQUESTS
+
+
+async def test_concurrency_limit_bounds_in_flight_calls():
+    elapsed, completions = await run_parallel(max_concurrency=2)
+    assert completions.peak == 2
+    assert elapsed >= LLM_DELAY * REQUESTS / 2
+
+
+async def test_paying_user_not_queued_behind_free_tier():
+    """With every slot taken, a premium parse waiting behind free ones is admitted first."""
+    parser = AITransactionParser(api_key="test")
+    completions = SlowCompletions()
+    parser.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    with patch("api.services.ai_parser.llm_scheduler", LLMScheduler(max_concurrency=1)):
+        free = [
+            asyncio.create_task(parser.parse_text(f"подарок №{'и' * i}", tier="free"))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0)
+        premium = asyncio.create_task(parser.parse_text("подарок для жены", tier="premium"))
+        await asyncio.gather(*free, premium)
+
+    assert completions.order[1] == "Текст: подарок для жены"
@@ -116,3 +116,95 @@ async def test_analytics_summary(client: AsyncClient, auth_headers: dict, defaul
     assert "balance" in data
     assert "category_breakdown" in data
     assert "trends" in data
+
+
+@pytest.mark.asyncio
+async def test_trends_buckets_and_running_balance(client: AsyncClient, auth_headers: dict, default_categories):
+    """Test that trends return one row per bucket with a running balance."""
+    food_cat = next(cat for cat in default_categories if cat.slug == "food")
+    salary_cat = next(cat for cat in default_categories if cat.slug == "salary")
+    
+    await client.post(
+        "/transactions",
+        headers=auth_headers,
+        json={"type": "income", "amount": "500000", "currency": "uzs", "category_id": str(salary_cat.id)}
+    )
+    await client.post(
+        "/transactions",
+        headers=auth_headers,
+        json={"type": "expense", "amount": "120000", "currency": "uzs", "category_id": str(food_cat.id)}
+    )
+    
+    response = await client.get("/analytics/trends?period=year&granularity=month", headers=auth_headers)
+    
+    assert response.status_code == 200
+    data = response.json()["data"]
+    
+    # 12 or 13 calendar months depending on today's date, no duplicates
+    assert 12 <= len(data) <= 13
+    assert len({point["date"] for point in data}) == len(data)
+    
+    # Everything lands in the current month, which is the last bucket
+    last = data[-1]
+    assert Decimal(last["income"]) == Decimal("500000")
+    assert Decimal(last["expense"]) == Decimal("120000")
+    assert Decimal(last["balance"]) == Decimal("380000")
+    assert all(Decimal(point["balance"]) == 0 for point in data[:-1])
+
+
+@pytest.mark.asyncio
+async def test_analytics_summary_matches_endpoints(client: AsyncClient, auth_headers: dict, default_categories):
+    """Test that the fused summary returns the same numbers as the individual endpoints."""
+    food_cat = next(cat for cat in default_categories if cat.slug == "food")
+    transport_cat = next(cat for cat in default_categories if cat.slug == "transport")
+    salary_cat = next(cat for cat in default_categories if cat.slug == "salary")
+    
+    for type_, amount, cat in (
+        ("income", "900000", salary_cat),
+        ("expense", "150000", food_cat),
+        ("expense", "50000", transport_cat),
+    ):
+        await client.post(
+            "/transactions",
+            headers=auth_headers,
+            json={"type": type_, "amount": amount, "currency": "uzs", "category_id": str(cat.id)}
+        )
+    
+    summary = (await client.get("/analytics/summary", headers=auth_headers)).json()
+    balance = (await client.get("/analytics/balance?period=month", headers=auth_headers)).json()
+    breakdown = (await client.get("/analytics/categories?period=month&type=expense", headers=auth_headers)).json()
+    trends = (await client.get("/analytics/trends?period=month&granularity=day", headers=auth_headers)).json()
+    
+    assert Decimal(summary["balance"]["balance"]) == Decimal(balance["balance"]) == Decimal("700000")
+    assert Decimal(summary["category_breakdown"]["total"]) == Decimal(breakdown["total"])
+    assert [c["category_slug"] for c in summary["category_breakdown"]["categories"]] == ["food", "transport"]
+    assert [p["date"] for p in summary["trends"]["data"]] == [p["date"] for p in trends["data"]]
+    assert Decimal(summary["trends"]["data"][-1]["balance"]) == Decimal("700000")
+
+
+@pytest.mark.asyncio
+async def test_balance_custom_range_keeps_sub_day_bounds(client: AsyncClient, auth_headers: dict, default_categories):
+    """Test that partial edge days come from transactions and whole days from the rollup."""
+    food_cat = next(cat for cat in default_categories if cat.slug == "food")
+    for amount, when in [
+        ("100", "2026-01-15T10:00:00+00:00"),  # Before the window, same UTC day as its start
+        ("50", "2026-01-15T20:00:00+00:00"),  # Partial first day
+        ("30", "2026-01-16T12:00:00+00:00"),  # Whole day
+        ("7", "2026-01-17T08:00:00+00:00"),  # Partial last day
+        ("1000", "2026-01-17T18:00:00+00:00"),  # After the window
+    ]:
+        await client.post(
+            "/transactions",
+            headers=auth_headers,
+            json={"type": "expense", "amount": amount, "currency": "uzs",
+                  "category_id": str(food_cat.id), "transaction_date": when}
+        )
+
+    response = await client.get(
+        "/analytics/balance",
+        headers=auth_headers,
+        params={"start_date": "2026-01-15T12:00:00+00:00", "end_date": "2026-01-17T12:00:00+00:00"},
+    )
+
+    assert response.status_code == 200
+    assert Decimal(response.json()["total_expense"]) == Decimal("87")
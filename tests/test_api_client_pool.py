@@ -0,0 +1,36 @@
+import asyncio
+
+import httpx
+
+from bot import api_client
+from bot.api_client import BarakaAPIClient, close_http_client, get_http_client
+
+
+async def test_clients_share_pool_with_own_tokens():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers.get("Authorization"))
+        return httpx.Response(200, json={"id": 1})
+
+    api_client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    api_client._http_client_loop = asyncio.get_running_loop()
+    try:
+        alice, bob = BarakaAPIClient("http://api"), BarakaAPIClient("http://api")
+        alice.set_token("a")
+        bob.set_token("b")
+
+        await asyncio.gather(alice.get_me(), bob.get_me(), alice.get_categories())
+
+        assert alice._http is bob._http
+        assert sorted(seen) == ["Bearer a", "Bearer a", "Bearer b"]
+    finally:
+        await close_http_client()
+
+
+async def test_closed_pool_is_recreated():
+    first = get_http_client()
+    await close_http_client()
+    second = get_http_client()
+    assert second is not first and not second.is_closed
+    await close_http_client()
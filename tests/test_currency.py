@@ -0,0 +1,145 @@
+"""
+Test the CBU rate cache (against a local stub server) and the historical rate store (offline fixtures).
+"""
+import json
+import threading
+from datetime import date
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from api.services import currency as currency_service
+from api.services.currency import CBURateCache
+from api.services.exchange_rates import HistoricalRate, RateHistory, load_fixture_rows
+
+CBU_FIXTURE = [
+    {"Ccy": "USD", "Nominal": "1", "Rate": "12650.55", "Diff": "-12.3", "Date": "17.10.2026",
+     "CcyNm_RU": "Доллар США", "CcyNm_UZ": "AQSH dollari", "CcyNm_EN": "US Dollar"},
+    {"Ccy": "JPY", "Nominal": "10", "Rate": "845.10", "Diff": "1.2", "Date": "17.10.2026",
+     "CcyNm_RU": "Иена", "CcyNm_UZ": "Iena", "CcyNm_EN": "Japan Yen"},
+]
+
+
+class StubCBU(BaseHTTPRequestHandler):
+    """Serves CBU_FIXTURE, or 503 while `available` is off."""
+    available = True
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        if not type(self).available:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps(CBU_FIXTURE).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def cbu_url():
+    StubCBU.available = True
+    StubCBU.hits = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCBU)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/json/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_lookups_are_served_from_memory(cbu_url, tmp_path):
+    """One download serves every later lookup."""
+    cache = CBURateCache(url=cbu_url, snapshot_path=str(tmp_path / "rates.json"))
+    try:
+        usd = await cache.get_rate("usd")
+        jpy = await cache.get_rate("JPY")
+        rates = await cache.get_rates()
+    finally:
+        await cache.stop()
+
+    assert usd.rate == 12650.55
+    assert jpy.nominal == 10
+    assert [rate.code for rate in rates] == ["USD", "JPY"]
+    assert StubCBU.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_snapshot_survives_restart_during_outage(cbu_url, tmp_path):
+    """A new process loads the last good snapshot while CBU is down."""
+    snapshot = tmp_path / "rates.json"
+
+    first = CBURateCache(url=cbu_url, snapshot_path=str(snapshot))
+    assert await first.refresh()
+    await first.stop()
+
+    StubCBU.available = False
+    restarted = CBURateCache(url=cbu_url, snapshot_path=str(snapshot))
+    try:
+        await restarted.start()
+        assert not await restarted.refresh()
+        usd = await restarted.get_rate("USD")
+    finally:
+        await restarted.stop()
+
+    assert usd is not None and usd.rate == 12650.55
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_previous_rates(cbu_url):
+    cache = CBURateCache(url=cbu_url)
+    try:
+        assert await cache.refresh()
+        StubCBU.available = False
+        assert not await cache.refresh()
+        assert (await cache.get_rate("USD")).rate == 12650.55
+    finally:
+        await cache.stop()
+
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "cbu"
+
+
+@pytest.fixture
+def fixture_history(monkeypatch):
+    """Rate history primed from the offline CBU fixtures (no database, no network)."""
+    rows = load_fixture_rows(str(FIXTURES_DIR))
+    history = RateHistory()
+    for currency in {row["currency"] for row in rows}:
+        history.prime(currency, [
+            HistoricalRate(row["rate_date"], row["nominal"], row["rate"])
+            for row in rows if row["currency"] == currency
+        ])
+    monkeypatch.setattr(currency_service, "rate_history", history)
+    return history
+
+
+@pytest.mark.asyncio
+async def test_rate_history_uses_latest_rate_on_or_before_day(fixture_history):
+    """Weekends use Friday's rate; days before the history have none."""
+    friday = await fixture_history.rate_on("usd", date(2026, 1, 2))
+    sunday = await fixture_history.rate_on("USD", date(2026, 1, 4))
+    monday = await fixture_history.rate_on("USD", date(2026, 1, 5))
+
+    assert friday.rate == sunday.rate == Decimal("12950.10")
+    assert monday.rate == Decimal("12980.75")
+    assert await fixture_history.rate_on("USD", date(2025, 12, 31)) is None
+
+
+@pytest.mark.asyncio
+async def test_convert_uses_rate_of_transaction_date(fixture_history):
+    """Back-dated conversions use their own day's rate, honouring the nominal."""
+    usd = await currency_service.convert_to_uzs(100, "USD", date(2026, 1, 6))
+    jpy = await currency_service.convert_to_uzs(1000, "JPY", date(2026, 1, 3))
+
+    assert usd == pytest.approx(1_300_500.0)
+    assert jpy == pytest.approx(83_040.0)
@@ -0,0 +1,81 @@
+import pytest
+
+from bot.dialog_context import DialogContext, MemoryDialogBackend, RedisDialogBackend
+
+
+def memory_context(ttl_seconds=60, max_users=100):
+    return DialogContext(backend=MemoryDialogBackend(max_history=3, ttl_seconds=ttl_seconds, max_users=max_users))
+
+
+async def test_history_capped_and_filtered():
+    context = memory_context()
+    for i in range(5):
+        await context.add_message(1, "user", f"m{i}")
+    await context.add_message(1, "system", "note", metadata={"type": "pending_transaction", "transaction": {"id": 7}})
+
+    assert [m["content"] for m in await context.get_context(1, last_n=10)] == ["m3", "m4", "note"]
+    assert await context.get_openai_messages(1) == [
+        {"role": "user", "content": "m3"}, {"role": "user", "content": "m4"}
+    ]
+    assert await context.get_last_transaction(1) == {"id": 7}
+
+    await context.clear_context(1)
+    assert await context.get_context(1) == []
+
+
+async def test_idle_users_evicted_without_speaking_again():
+    context = memory_context(ttl_seconds=0)
+    for user_id in range(100):
+        await context.add_message(user_id, "user", "hi")
+
+    assert await context.get_context(5) == []
+    assert context.metrics()["users"] == 0
+    assert context.metrics()["evicted_idle"] == 100
+
+
+async def test_least_recently_active_evicted_at_capacity():
+    context = memory_context(max_users=2)
+    await context.add_message(1, "user", "a")
+    await context.add_message(2, "user", "b")
+    await context.add_message(1, "user", "c")  # User 2 is now the least recently active
+    await context.add_message(3, "user", "d")
+
+    assert await context.get_context(2) == []
+    assert [m["content"] for m in await context.get_context(1)] == ["a", "c"]
+    assert context.metrics() == {"evicted_idle": 0, "evicted_capacity": 1, "users": 2}
+
+
+async def test_redis_backend_shared_between_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+
+    def worker():
+        backend = RedisDialogBackend("redis://localhost", max_history=3, ttl_seconds=60)
+        backend._redis = fakeredis.FakeAsyncRedis(server=server)
+        return DialogContext(backend=backend)
+
+    first, second = worker(), worker()
+    for i in range(5):
+        await first.add_message(1, "user", f"m{i}")
+    await second.add_message(1, "assistant", "ok")
+
+    assert [m["content"] for m in await first.get_context(1, last_n=10)] == ["m3", "m4", "ok"]
+    assert "ts" not in (await first.get_context(1))[0]
+    assert 0 < await second.backend._redis.ttl("dialog:1") <= 60
+
+    await second.clear_context(1)
+    assert await first.get_context(1) == []
+
+
+async def test_redis_outage_keeps_dialog_going():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    backend = RedisDialogBackend("redis://localhost", max_history=3, ttl_seconds=60)
+    backend._redis = fakeredis.FakeAsyncRedis(server=server)
+    context = DialogContext(backend=backend)
+
+    server.connected = False
+    await context.add_message(1, "user", "hi")  # Logged, not raised
+    assert await context.get_context(1) == []
+    await context.clear_context(1)
+    assert context.metrics()["errors"] == 3
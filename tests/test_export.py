@@ -0,0 +1,150 @@
+"""
+Test transaction export endpoint and streaming encoders.
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+
+from api.routers.transactions import filtered_transactions_query
+from api.services.export import ENCODERS, EXPORT_COLUMNS, export_rows_query, stream_export_rows
+from tests.conftest import TestSessionLocal
+
+# Peak RSS growth allowed while exporting EXPORT_ROWS generated rows
+RSS_CEILING_MB = 64
+EXPORT_ROWS = 1_000_000
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process, from /proc (Linux)."""
+    with open("/proc/self/statm") as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+async def generated_batches(total: int, batch_size: int = 5000):
+    """Yield export-shaped rows without keeping them around."""
+    started = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for offset in range(0, total, batch_size):
+        yield [
+            (
+                uuid4(),
+                started - timedelta(seconds=offset + i),
+                "expense",
+                Decimal(offset + i) / 100,
+                "uzs",
+                "food",
+                f"Generated row {offset + i}",
+            )
+            for i in range(min(batch_size, total - offset))
+        ]
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("format", ["csv", "ndjson", "parquet"])
+async def test_export_encoders_memory_stays_flat(format: str):
+    """
+    Test that the encoders alone stay under a fixed RSS ceiling for 1M rows.
+
+    Rows come from an in-memory generator, so this covers encoding only;
+    test_export_stream_memory_stays_flat covers the database cursor.
+    """
+    if format == "parquet":
+        pytest.importorskip("pyarrow")
+    if not os.path.exists("/proc/self/statm"):
+        pytest.skip("RSS sampling needs /proc")
+    
+    baseline = current_rss_mb()
+    peak = baseline
+    exported_bytes = 0
+    
+    async for chunk in ENCODERS[format](generated_batches(EXPORT_ROWS)):
+        exported_bytes += len(chunk)
+        peak = max(peak, current_rss_mb())
+    
+    # Text output is larger than the ceiling itself, so it cannot have been buffered whole
+    if format != "parquet":
+        assert exported_bytes > RSS_CEILING_MB * 1024 * 1024
+    assert peak - baseline < RSS_CEILING_MB
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_export_stream_memory_stays_flat(db_session, test_user):
+    """Test that 1M stored rows streamed through the server-side cursor stay under the RSS ceiling."""
+    if not os.path.exists("/proc/self/statm"):
+        pytest.skip("RSS sampling needs /proc")
+    
+    await db_session.execute(
+        text(
+            "INSERT INTO transactions (id, user_id, type, amount, currency, description, transaction_date) "
+            "SELECT gen_random_uuid(), :user_id, 'expense', n / 100.0, 'uzs', 'Generated row ' || n, "
+            "timestamptz '2026-01-01' - n * interval '1 second' FROM generate_series(1, :rows) AS n"
+        ),
+        {"user_id": test_user.id, "rows": EXPORT_ROWS},
+    )
+    await db_session.commit()
+    query = export_rows_query(filtered_transactions_query(test_user.id))
+    
+    baseline = current_rss_mb()
+    peak = baseline
+    exported_bytes = 0
+    
+    async for chunk in ENCODERS["csv"](stream_export_rows(TestSessionLocal, query)):
+        exported_bytes += len(chunk)
+        peak = max(peak, current_rss_mb())
+    
+    assert exported_bytes > RSS_CEILING_MB * 1024 * 1024
+    assert peak - baseline < RSS_CEILING_MB
+
+
+@pytest.mark.asyncio
+async def test_export_transactions_csv(client: AsyncClient, auth_headers: dict, default_categories):
+    """Test CSV export honours the list filters."""
+    food_category = next(cat for cat in default_categories if cat.slug == "food")
+    
+    await client.post(
+        "/transactions",
+        headers=auth_headers,
+        json={"type": "expense", "amount": "50000", "currency": "uzs", "category_id": str(food_category.id)}
+    )
+    await client.post(
+        "/transactions",
+        headers=auth_headers,
+        json={"type": "income", "amount": "900000", "currency": "uzs"}
+    )
+    
+    response = await client.get("/transactions/export?format=csv&type=expense", headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == EXPORT_COLUMNS
+    assert len(rows) == 2
+    assert Decimal(rows[1][3]) == Decimal("50000")
+    assert rows[1][5] == "food"
+
+
+@pytest.mark.asyncio
+async def test_export_transactions_ndjson(client: AsyncClient, auth_headers: dict, default_categories):
+    """Test NDJSON export returns one object per transaction."""
+    for amount in ("1000", "2000", "3000"):
+        await client.post(
+            "/transactions",
+            headers=auth_headers,
+            json={"type": "expense", "amount": amount, "currency": "uzs"}
+        )
+    
+    response = await client.get("/transactions/export?format=ndjson", headers=auth_headers)
+    
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(Decimal(r["amount"]) for r in records) == [Decimal("1000"), Decimal("2000"), Decimal("3000")]
+    assert all(r["category"] == "" for r in records)
@@ -0,0 +1,85 @@
+import json
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from api.services.ai_parser import AITransactionParser, extract_amounts
+
+CORPUS = Path(__file__).parent / "fixtures" / "parse_corpus.jsonl"
+
+
+@pytest.fixture
+def parser():
+    return AITransactionParser(api_key="test")
+
+
+@pytest.mark.parametrize("text, amount", [
+    ("Taxi 50k", Decimal("50000")),
+    ("такси 25 тыщ", Decimal("25000")),
+    ("кофе 2,5к", Decimal("2500")),
+    ("обувь 1.2 млн", Decimal("1200000")),
+    ("премия 1кк", Decimal("1000000")),
+    ("аванс 2 лям", Decimal("2000000")),
+    ("интернет 150 000", Decimal("150000")),
+    ("продукты 1,000,000", Decimal("1000000")),
+    ("lunch 12$", Decimal("12")),
+])
+def test_amount_shorthand(text, amount):
+    assert [value for value, _ in extract_amounts(text)] == [amount]
+
+
+def test_simple_message_resolved_locally(parser):
+    result = parser._fast_parse("Потратил 50 долларов на обед")
+    assert result["type"] == "expense"
+    assert result["amount"] == Decimal("50")
+    assert result["currency"] == "usd"
+    assert result["category_slug"] == "food"
+    assert result["description"] == "Потратил на обед"
+
+
+@pytest.mark.parametrize("text", [
+    "50к",  # No category
+    "2 кофе по 15к",  # Two amounts
+    "поменял 100$ на 1 270 000 сум",  # Two currencies
+    "одежда в магазине 400к",  # Conflicting categories
+    "возврат за такси 20к",  # Income word on an expense category
+    "вернули за такси 20к",
+    "продал телефон 2 млн",
+    "долг за кофе 50к",  # Debt
+    "Dalerga 500k qarz berdim",
+    "не купил кофе 50к",  # Negation
+    "Кофе -50к",  # Signed amount
+    "сколько я потратил на такси?",
+])
+def test_ambiguous_message_escalates(parser, text):
+    assert parser._fast_parse(text) is None
+
+
+async def test_parse_text_skips_llm_on_hit(parser):
+    parser.client = None  # Any LLM call would raise
+    result = await parser.parse_text("Qahvaga 20k")
+    assert result["amount"] == Decimal("20000")
+    assert result["category_slug"] == "food"
+
+
+def test_corpus_hit_rate_and_accuracy(parser):
+    """Most of the corpus is resolved locally and local answers match the labels."""
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+
+    hits = correct = 0
+    for case in corpus:
+        result = parser._fast_parse(case["text"])
+        if result is None:
+            continue
+        hits += 1
+        correct += (
+            result["type"] == case["type"]
+            and result["amount"] == Decimal(case["amount"])
+            and result["currency"] == case["currency"]
+            and result["category_slug"] == case["category_slug"]
+        )
+
+    assert hits / len(corpus) >= 0.6
+    assert correct / hits >= 0.95
@@ -0,0 +1,35 @@
+import random
+
+from api.services.ai_parser import CATEGORY_KEYWORDS, CATEGORY_MATCHER
+from api.services.keyword_matcher import KeywordMatcher
+
+
+def test_overlapping_keywords():
+    matcher = KeywordMatcher({"he": 1, "she": 2, "his": 3, "hers": 4})
+    assert matcher.find_all("USHERS") == [("he", 1), ("she", 2), ("hers", 4)]
+    assert matcher.longest("ushers") == ("hers", 4)
+    assert matcher.find_all("xyz") == []
+    assert matcher.longest("xyz") is None
+
+
+def test_longest_prefers_earlier_keyword_on_tie():
+    matcher = KeywordMatcher({"кафе": "food", "такси": "transport", "метро": "transport"})
+    assert matcher.longest("метро и такси") == ("такси", "transport")
+
+
+def test_matches_linear_scan():
+    """Same result as `keyword in text` over every keyword."""
+    rng = random.Random(7)
+    alphabet = "абвгкорст"
+    table = {"".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))): i for i in range(300)}
+    matcher = KeywordMatcher(table)
+
+    for _ in range(200):
+        text = "".join(rng.choice(alphabet + " ") for _ in range(rng.randint(0, 40)))
+        expected = [(keyword, value) for keyword, value in table.items() if keyword in text]
+        assert matcher.find_all(text) == expected
+
+
+def test_category_matcher_covers_table():
+    assert len(CATEGORY_MATCHER) == len(CATEGORY_KEYWORDS)
+    assert CATEGORY_MATCHER.find_all("Такси до офиса") == [("такси", "transport")]
@@ -0,0 +1,84 @@
+"""
+Test limit endpoints.
+"""
+from contextlib import contextmanager
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from dateutil.relativedelta import relativedelta
+from httpx import AsyncClient
+from sqlalchemy import event
+
+from tests.conftest import test_engine
+
+
+@contextmanager
+def count_queries():
+    """Count SQL statements executed on the test engine."""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def create_monthly_limits(client: AsyncClient, auth_headers: dict, category_id, months: int):
+    start = date.today().replace(day=1)
+    for offset in range(months):
+        period_start = start - relativedelta(months=offset)
+        response = await client.post(
+            "/limits",
+            headers=auth_headers,
+            json={
+                "category_id": str(category_id),
+                "amount": "100000",
+                "period_start": period_start.isoformat(),
+                "period_end": (period_start + relativedelta(months=1, days=-1)).isoformat(),
+            }
+        )
+        assert response.status_code == 201
+
+
+@pytest.mark.asyncio
+async def test_current_limits_report_spent(client: AsyncClient, auth_headers: dict, default_categories):
+    """Test /limits/current joins category names and spent amounts."""
+    food_category = next(cat for cat in default_categories if cat.slug == "food")
+    await create_monthly_limits(client, auth_headers, food_category.id, 1)
+    
+    await client.post(
+        "/transactions",
+        headers=auth_headers,
+        json={"type": "expense", "amount": "120000", "currency": "uzs", "category_id": str(food_category.id)}
+    )
+    
+    summary = (await client.get("/limits/current", headers=auth_headers)).json()
+    
+    assert summary["total_limits"] == 1
+    assert summary["exceeded_count"] == 1
+    assert Decimal(summary["total_spent"]) == Decimal("120000")
+    assert summary["limits"][0]["category_name"] == food_category.name
+
+
+@pytest.mark.asyncio
+async def test_list_limits_constant_query_count(client: AsyncClient, auth_headers: dict, default_categories):
+    """Test listing limits costs the same number of queries for 1 or 12 limits."""
+    food_category = next(cat for cat in default_categories if cat.slug == "food")
+    transport_category = next(cat for cat in default_categories if cat.slug == "transport")
+    
+    await create_monthly_limits(client, auth_headers, food_category.id, 1)
+    with count_queries() as few:
+        response = await client.get("/limits", headers=auth_headers)
+    assert len(response.json()) == 1
+    
+    await create_monthly_limits(client, auth_headers, transport_category.id, 11)
+    with count_queries() as many:
+        response = await client.get("/limits", headers=auth_headers)
+    assert len(response.json()) == 12
+    
+    assert len(many) == len(few)
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from shared.llm_scheduler import LLMScheduler, TokenBucket
+
+
+class FakeCompletions:
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(content=kwargs["messages"][-1]["content"], usage=SimpleNamespace(total_tokens=10))
+
+
+def fake_client(delay: float = 0.05):
+    return SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(delay)))
+
+
+async def test_higher_tier_served_first():
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = []
+    release = asyncio.Event()
+
+    async def call(name, wait=None):
+        if wait:
+            await wait.wait()
+        order.append(name)
+
+    blocker = asyncio.create_task(scheduler.run("m", lambda: call("blocker", release)))
+    await asyncio.sleep(0)
+    queued = [
+        asyncio.create_task(scheduler.run("m", lambda: call("free"), tier="free")),
+        asyncio.create_task(scheduler.run("m", lambda: call("plus"), tier="plus")),
+        asyncio.create_task(scheduler.run("m", lambda: call("premium"), tier="premium")),
+    ]
+    await asyncio.sleep(0.01)
+    assert scheduler.metrics()["m"]["queue_depth"] == 3
+
+    release.set()
+    await asyncio.gather(blocker, *queued)
+    assert order == ["blocker", "premium", "plus", "free"]
+
+
+async def test_token_bucket_throttles():
+    scheduler = LLMScheduler(rate_limits={"m": (0, 6000)})  # 100 tokens per second
+
+    async def call():
+        return time.monotonic()
+
+    started = time.monotonic()
+    await scheduler.run("m", call, tokens=6000)  # Drains the bucket
+    finished = await scheduler.run("m", call, tokens=30)
+    assert finished - started >= 0.25
+    assert scheduler.metrics()["m"]["throttled"] >= 1
+
+
+async def test_settling_overestimate_does_not_overfill_bucket():
+    scheduler = LLMScheduler(rate_limits={"m": (0, 600_000)})  # Refills the estimate during the call
+    client = fake_client(delay=0.1)  # Reports 10 tokens, far below the estimate
+
+    await scheduler.chat(client, model="m", messages=[{"role": "user", "content": "hi"}])
+
+    bucket = scheduler._queues["m"].tokens
+    assert bucket.level <= bucket.capacity
+
+
+def test_token_bucket_refund_capped_at_capacity():
+    bucket = TokenBucket(600)
+    bucket.take(100)
+    bucket.take(-500)  # Estimate was 500 over
+    assert bucket.level == bucket.capacity
+
+
+async def test_identical_inflight_prompts_coalesced():
+    scheduler = LLMScheduler()
+    client = fake_client()
+    request = {"model": "gpt-5-nano", "messages": [{"role": "user", "content": "Taxi 50k"}]}
+
+    first, second, other = await asyncio.gather(
+        scheduler.chat(client, **request),
+        scheduler.chat(client, **request),
+        scheduler.chat(client, model="gpt-5-nano", messages=[{"role": "user", "content": "Coffee 20k"}]),
+    )
+
+    assert client.chat.completions.calls == 2
+    assert first is second
+    assert other.content == "Coffee 20k"
+    assert scheduler.metrics()["gpt-5-nano"]["coalesced"] == 1
+
+
+async def test_failures_and_cancellation_release_slots():
+    scheduler = LLMScheduler(max_concurrency=1)
+
+    async def boom():
+        raise RuntimeError("rate limited")
+
+    with pytest.raises(RuntimeError):
+        await scheduler.run("m", boom)
+
+    slow = asyncio.create_task(scheduler.run("m", lambda: asyncio.sleep(10)))
+    await asyncio.sleep(0.01)
+    waiting = asyncio.create_task(scheduler.run("m", lambda: asyncio.sleep(0)))
+    await asyncio.sleep(0.01)
+    slow.cancel()
+    await asyncio.wait_for(waiting, timeout=1)
+
+    metrics = scheduler.metrics()["m"]
+    assert metrics["in_flight"] == 0
+    assert metrics["failed"] == 2
+
+
+async def test_cancelled_leader_does_not_fail_coalesced_callers():
+    scheduler = LLMScheduler()
+    client = fake_client(delay=0.05)
+    request = {"model": "gpt-5-nano", "messages": [{"role": "user", "content": "Taxi 50k"}]}
+
+    leader = asyncio.create_task(scheduler.chat(client, **request))
+    await asyncio.sleep(0.01)
+    follower = asyncio.create_task(scheduler.chat(client, **request))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert (await follower).content == "Taxi 50k"
+    assert leader.cancelled()
+    assert client.chat.completions.calls == 1
+    assert scheduler.metrics()["gpt-5-nano"]["completed"] == 1
+
+
+async def test_shared_call_cancelled_when_every_caller_leaves():
+    scheduler = LLMScheduler()
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def call():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    callers = [asyncio.create_task(scheduler.run("m", call, dedup_key="k")) for _ in range(2)]
+    await started.wait()
+    for caller in callers:
+        caller.cancel()
+
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    await asyncio.sleep(0)
+    assert scheduler.metrics()["m"]["in_flight"] == 0
+    assert not scheduler._inflight
@@ -0,0 +1,101 @@
+import json
+from decimal import Decimal
+from types import SimpleNamespace
+
+from api.services.ai_parser import AITransactionParser
+from api.services.parse_cache import ParseCache, SQLiteBackend, normalize_message
+
+
+def llm_result(amount, category_slug="food"):
+    return {
+        "type": "expense",
+        "amount": Decimal(amount),
+        "currency": "uzs",
+        "description": "Кофе с собой",
+        "category_slug": category_slug,
+        "confidence": 0.9,
+    }
+
+
+def test_normalize_abstracts_amount_and_currency():
+    assert normalize_message("Кофе с собой 15к")[0] == normalize_message("кофе  с собой 15 000!")[0]
+    assert normalize_message("кофе с собой 15000 сум") == ("кофе с собой <amount> <uzs>", Decimal("15000"))
+    assert normalize_message("latte $4")[0] == normalize_message("latte 4 dollars")[0]
+    assert normalize_message("кофе с собой") is None
+    assert normalize_message("2 кофе по 15к") is None
+
+
+async def test_hit_reapplies_amount():
+    cache = ParseCache(ttl_seconds=60, max_entries=10)
+    assert await cache.lookup("Кофе с собой 15к", "gpt-5-nano") is None
+    assert await cache.store("Кофе с собой 15к", "gpt-5-nano", llm_result("15000"), latency_ms=900, tokens=120)
+
+    hit = await cache.lookup("кофе с собой 22 000", "gpt-5-nano")
+    assert hit == {**llm_result("22000")}
+    assert await cache.lookup("кофе с собой 22к", "gpt-5.1") is None  # Other model
+
+    metrics = cache.metrics()
+    assert metrics["hits"] == 1
+    assert metrics["misses"] == 2
+    assert metrics["saved_latency_ms"] == 900
+    assert metrics["saved_tokens"] == 120
+
+
+async def test_disagreeing_amount_not_stored():
+    cache = ParseCache(ttl_seconds=60, max_entries=10)
+    assert not await cache.store("кофе с собой 15к", "m", llm_result("15"), latency_ms=1, tokens=1)
+    assert len(cache) == 0
+
+
+async def test_ttl_and_lru_bounds():
+    expired = ParseCache(ttl_seconds=0, max_entries=10)
+    await expired.store("кофе с собой 15к", "m", llm_result("15000"), latency_ms=1, tokens=1)
+    assert await expired.lookup("кофе с собой 15к", "m") is None
+
+    cache = ParseCache(ttl_seconds=60, max_entries=2)
+    for word in ("чай", "кофе", "сок"):
+        await cache.store(f"{word} 10к", "m", llm_result("10000"), latency_ms=1, tokens=1)
+    assert len(cache) == 2
+    assert cache.stats["evictions"] == 1
+    assert await cache.lookup("чай 10к", "m") is None
+
+
+async def test_sqlite_backend_shared_between_caches(tmp_path):
+    path = str(tmp_path / "parse_cache.sqlite3")
+    writer = ParseCache(ttl_seconds=60, max_entries=10, backend=SQLiteBackend(path, max_entries=10))
+    await writer.store("кофе с собой 15к", "m", llm_result("15000"), latency_ms=1, tokens=1)
+
+    reader = ParseCache(ttl_seconds=60, max_entries=10, backend=SQLiteBackend(path, max_entries=10))
+    hit = await reader.lookup("кофе с собой 30к", "m")
+    assert hit["amount"] == Decimal("30000")
+    assert hit["category_slug"] == "food"
+
+
+async def test_parse_text_uses_cache(monkeypatch):
+    """A near-identical message after an LLM parse is answered without another call."""
+    from api.services import parse_cache as parse_cache_module
+
+    monkeypatch.setattr(parse_cache_module, "parse_cache", ParseCache(ttl_seconds=60, max_entries=10))
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        content = json.dumps({
+            "type": "expense", "amount": 15000, "currency": "uzs",
+            "description": "Подарок", "category_slug": "shopping", "confidence": 0.9,
+        })
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(total_tokens=150),
+        )
+
+    parser = AITransactionParser(api_key="test")
+    parser.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    first = await parser.parse_text("подарок коллеге 15к")
+    second = await parser.parse_text("Подарок коллеге 40 000")
+
+    assert len(calls) == 1
+    assert first["amount"] == Decimal("15000")
+    assert second["amount"] == Decimal("40000")
+    assert second["category_slug"] == "shopping"
@@ -0,0 +1,92 @@
+import pytest
+
+from bot.pending_storage import MemoryPendingBackend, PendingTransactionStorage, RedisPendingBackend
+
+TX = {"type": "expense", "amount": 15000, "currency": "uzs", "description": "Kofe"}
+
+
+async def test_add_get_update_remove():
+    storage = PendingTransactionStorage(MemoryPendingBackend(ttl_seconds=60, max_per_user=5))
+    tx_id = await storage.add(1, dict(TX))
+    assert len(tx_id) == 32
+    assert len(f"confirm_{tx_id}".encode()) <= 64  # Telegram callback_data limit
+
+    pending = await storage.get(tx_id)
+    assert pending["user_id"] == 1 and pending["tx_data"]["amount"] == 15000
+    pending["tx_data"]["amount"] = 20000
+    await storage.update(tx_id, pending)
+    assert (await storage.get(tx_id))["tx_data"]["amount"] == 20000
+
+    await storage.remove(tx_id)
+    assert await storage.get(tx_id) is None
+    assert storage.metrics()["pending"] == 0
+
+
+async def test_expired_without_cleanup_call():
+    storage = PendingTransactionStorage(MemoryPendingBackend(ttl_seconds=0, max_per_user=5))
+    ids = [await storage.add(user_id, dict(TX)) for user_id in range(100)]
+
+    assert await storage.get(ids[-1]) is None
+    assert storage.metrics()["pending"] == 0
+    assert storage.metrics()["heap"] == 0
+
+
+async def test_per_user_cap_drops_oldest():
+    storage = PendingTransactionStorage(MemoryPendingBackend(ttl_seconds=60, max_per_user=2))
+    first, second, third = [await storage.add(1, dict(TX)) for _ in range(3)]
+    other = await storage.add(2, dict(TX))
+
+    assert await storage.get(first) is None
+    assert await storage.get(second) and await storage.get(third) and await storage.get(other)
+    assert storage.metrics()["evicted"] == 1
+
+
+async def test_redis_backend_shared_between_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+
+    def worker():
+        backend = RedisPendingBackend("redis://localhost", ttl_seconds=60, max_per_user=2)
+        backend._redis = fakeredis.FakeAsyncRedis(server=server)
+        return PendingTransactionStorage(backend)
+
+    first, second = worker(), worker()
+    oldest = await first.add(1, dict(TX))
+    ids = [await first.add(1, dict(TX)) for _ in range(2)]
+
+    assert await second.get(oldest) is None  # Over the per-user cap
+    pending = await second.get(ids[0])
+    assert pending["tx_data"] == TX
+    pending["tx_data"]["amount"] = 20000
+    await second.update(ids[0], pending)
+    assert (await first.get(ids[0]))["tx_data"]["amount"] == 20000
+    assert 0 < await first.backend._redis.ttl(f"pending:tx:{ids[0]}") <= 60
+
+    await second.remove(ids[0])
+    assert await first.get(ids[0]) is None
+
+
+async def test_redis_outage_falls_back_to_memory():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    backend = RedisPendingBackend("redis://localhost", ttl_seconds=60, max_per_user=2)
+    backend._redis = fakeredis.FakeAsyncRedis(server=server)
+    storage = PendingTransactionStorage(backend)
+    stored = await storage.add(1, dict(TX))
+
+    server.connected = False
+    assert await storage.get(stored) is None  # Unreachable, not raised
+    tx_id = await storage.add(1, dict(TX))
+    pending = await storage.get(tx_id)
+    assert pending["tx_data"] == TX
+    pending["tx_data"]["amount"] = 20000
+    await storage.update(tx_id, pending)
+    await storage.update(stored, pending)
+    assert (await storage.get(tx_id))["tx_data"]["amount"] == 20000
+    await storage.remove(tx_id)
+    await storage.remove(stored)
+    assert await storage.get(tx_id) is None
+
+    metrics = storage.metrics()
+    assert metrics["fallback_added"] == 1
+    assert metrics["errors"] >= 4
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from bot import request_context
+from bot.request_context import UpdateContext
+
+
+class FakeApi:
+    def __init__(self, fail: bool = False):
+        self.calls = 0
+        self.fail = fail
+
+    async def get_subscription_status(self, telegram_id=None):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("API down")
+        return {"subscription_type": "pro", "is_premium": True}
+
+    async def get_categories(self):
+        self.calls += 1
+        return [{"slug": "taxi"}]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    request_context._cache.clear()
+    yield
+    request_context._cache.clear()
+
+
+async def test_concurrent_lookups_share_one_call():
+    api = FakeApi()
+    ctx = UpdateContext(1, api)
+
+    tiers = await asyncio.gather(ctx.tier(), ctx.tier(), ctx.subscription())
+
+    assert tiers[:2] == ["pro", "pro"]
+    assert api.calls == 1
+    assert (ctx.lookups, ctx.api_calls) == (3, 1)
+
+
+async def test_cached_across_updates_until_invalidated():
+    api = FakeApi()
+    await UpdateContext(1, api).categories()
+    second = UpdateContext(1, api)
+    await second.categories()
+    assert api.calls == 1
+    assert second.api_calls == 0
+
+    second.invalidate("categories")
+    await second.categories()
+    assert api.calls == 2
+    # Other users are unaffected
+    await UpdateContext(2, api).categories()
+    assert api.calls == 3
+
+
+async def test_failures_are_not_cached():
+    api = FakeApi(fail=True)
+    ctx = UpdateContext(1, api)
+    with pytest.raises(RuntimeError):
+        await ctx.subscription()
+
+    api.fail = False
+    assert await ctx.tier() == "pro"
+    assert api.calls == 2
+
+
+async def test_cache_drops_expired_and_least_recent_users(monkeypatch):
+    monkeypatch.setattr(request_context, "CACHE_MAX_USERS", 2)
+    monkeypatch.setitem(request_context.CACHE_SECONDS, "categories", 0)
+    api = FakeApi()
+    for user_id in (1, 2):
+        await UpdateContext(user_id, api).categories()  # Expire immediately
+
+    monkeypatch.setitem(request_context.CACHE_SECONDS, "categories", 600)
+    for user_id in (3, 4, 5):
+        await UpdateContext(user_id, api).categories()
+
+    assert list(request_context._cache) == [4, 5]
+
+
+async def test_derived_value_rebuilt_only_when_source_changes():
+    api = FakeApi()
+    ctx = UpdateContext(1, api)
+    builds = []
+
+    def build(categories):
+        builds.append(categories)
+        return ", ".join(c["slug"] for c in categories)
+
+    categories = await ctx.categories()
+    assert ctx.derived("category_section", categories, build) == "taxi"
+    assert UpdateContext(1, api).derived("category_section", categories, build) == "taxi"
+    assert len(builds) == 1
+
+    refreshed = await ctx.refresh_categories()
+    ctx.derived("category_section", refreshed, build)
+    assert len(builds) == 2
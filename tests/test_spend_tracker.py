@@ -0,0 +1,187 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+from api.services.limits import check_limit_thresholds
+from api.services.spend_tracker import SpendTracker, month_key, spend_tracker
+
+
+def test_apply_delta_moves_hot_counters_only():
+    """Deltas update seeded keys and ignore cold ones."""
+    tracker = SpendTracker(ttl_seconds=60, max_entries=10)
+    user_id, category_id = uuid4(), uuid4()
+    key = month_key(user_id, category_id, date(2026, 3, 14))
+
+    tracker.apply_delta(user_id, category_id, date(2026, 3, 14), Decimal("10"))
+    assert tracker.get(key) is None
+
+    tracker.seed(key, Decimal("100"), "Food", Decimal("40"))
+    tracker.apply_delta(user_id, category_id, date(2026, 3, 31), Decimal("25"))
+    tracker.apply_delta(user_id, category_id, date(2026, 4, 1), Decimal("1000"))  # Other month
+    assert tracker.get(key).spent == Decimal("65")
+
+
+def test_ttl_and_lru_bounds():
+    """Entries expire after the TTL and the oldest are evicted beyond max_entries."""
+    expired = SpendTracker(ttl_seconds=0, max_entries=10)
+    key = month_key(uuid4(), uuid4(), date(2026, 1, 1))
+    expired.seed(key, None, None, Decimal("0"))
+    assert expired.get(key) is None
+    assert len(expired) == 0
+
+    tracker = SpendTracker(ttl_seconds=60, max_entries=2)
+    keys = [month_key(uuid4(), uuid4(), date(2026, 1, 1)) for _ in range(3)]
+    tracker.seed(keys[0], None, None, Decimal("0"))
+    tracker.seed(keys[1], None, None, Decimal("0"))
+    tracker.get(keys[0])  # keys[1] is now least recently used
+    tracker.seed(keys[2], None, None, Decimal("0"))
+
+    assert tracker.get(keys[1]) is None
+    assert tracker.get(keys[0]) is not None
+    assert tracker.stats["evictions"] == 1
+
+
+def test_invalidate_by_category():
+    tracker = SpendTracker(ttl_seconds=60, max_entries=10)
+    user_id, food, transport = uuid4(), uuid4(), uuid4()
+    for category_id in (food, transport):
+        tracker.seed(month_key(user_id, category_id, date(2026, 5, 1)), Decimal("1"), None, Decimal("0"))
+
+    tracker.invalidate(user_id, food)
+
+    assert tracker.get(month_key(user_id, food, date(2026, 5, 1))) is None
+    assert tracker.get(month_key(user_id, transport, date(2026, 5, 1))) is not None
+
+
+@pytest.mark.asyncio
+async def test_threshold_check_on_hot_counter_needs_no_queries():
+    """A hot counter answers check_limit_thresholds without touching the database."""
+    db = AsyncMock()
+    user_id, category_id = uuid4(), uuid4()
+    key = month_key(user_id, category_id, date(2026, 6, 10))
+    spend_tracker.seed(key, Decimal("100000"), "Питание", Decimal("40000"))
+
+    spend_tracker.apply_delta(user_id, category_id, date(2026, 6, 10), Decimal("15000"))
+    warning = await check_limit_thresholds(db, user_id, category_id, Decimal("15000"), date(2026, 6, 10), "ru")
+
+    assert warning == "⚠️ Внимание: Питание — 55.0% (порог 50%)."
+    db.execute.assert_not_called()
+    spend_tracker.invalidate(user_id)
+
+
+def spent_result(total):
+    result = MagicMock()
+    result.scalar.return_value = total
+    return result
+
+
+@pytest.mark.asyncio
+async def test_reconcile_uses_each_limit_period():
+    """Counters are recomputed over their own limit period, not the calendar month."""
+    tracker = SpendTracker(ttl_seconds=60, max_entries=10)
+    user_id, category_id = uuid4(), uuid4()
+    key = month_key(user_id, category_id, date(2026, 7, 1))
+    tracker.seed(key, Decimal("100"), "Food", Decimal("10"), period_end=date(2026, 7, 14))
+    db = AsyncMock()
+    db.execute.return_value = spent_result(Decimal("25"))
+
+    assert await tracker.reconcile(db) == 1
+
+    statement = db.execute.call_args.args[0]
+    assert set(statement.compile().params.values()) >= {user_id, category_id, date(2026, 7, 1), date(2026, 7, 14)}
+    assert tracker.get(key).spent == Decimal("25")
+
+
+@pytest.mark.asyncio
+async def test_reconcile_keeps_delta_applied_while_querying():
+    """A delta that lands while reconcile awaits its query is not overwritten."""
+    tracker = SpendTracker(ttl_seconds=60, max_entries=10)
+    user_id, category_id = uuid4(), uuid4()
+    key = month_key(user_id, category_id, date(2026, 8, 1))
+    tracker.seed(key, Decimal("100"), "Food", Decimal("40"))
+
+    async def execute(statement):
+        tracker.apply_delta(user_id, category_id, date(2026, 8, 5), Decimal("15"))
+        return spent_result(Decimal("30"))
+
+    db = AsyncMock()
+    db.execute.side_effect = execute
+
+    assert await tracker.reconcile(db) == 0
+    assert tracker.get(key).spent == Decimal("55")
+
+
+def limit_result(amount, period_start, period_end, name):
+    result = MagicMock()
+    result.first.return_value = SimpleNamespace(
+        amount=amount, period_start=period_start, period_end=period_end, name=name
+    )
+    return result
+
+
+@pytest.mark.asyncio
+async def test_cold_seed_not_cached_when_a_write_overlaps_it():
+    """
+    Writer A's check seeds a cold key while writer B commits (so the snapshot
+    includes B) and applies B's delta only after the seed: B counts once.
+    """
+    tracker = SpendTracker(ttl_seconds=60, max_entries=10)
+    user_id, category_id = uuid4(), uuid4()
+    day = date(2026, 9, 10)
+    key = month_key(user_id, category_id, day)
+    writer_b = tracker.writing(user_id)
+
+    async def execute(statement):
+        if db.execute.await_count == 1:
+            writer_b.__enter__()  # B commits 20 between the limit and the spent query
+            return limit_result(Decimal("100"), date(2026, 9, 1), date(2026, 9, 30), "Food")
+        return spent_result(Decimal("60"))  # A's 40 + B's 20
+
+    db = AsyncMock()
+    db.execute.side_effect = execute
+
+    with tracker.writing(user_id):  # Writer A: key is cold, so this is a no-op
+        tracker.apply_delta(user_id, category_id, day, Decimal("40"))
+    with patch("api.services.limits.spend_tracker", tracker):
+        warning = await check_limit_thresholds(db, user_id, category_id, Decimal("40"), day, "en")
+    tracker.apply_delta(user_id, category_id, day, Decimal("20"))  # B's delta lands after the seed
+    writer_b.__exit__(None, None, None)
+
+    assert warning == "⚠️ Limit alert: Food is at 60.0% (50% threshold)."
+    assert tracker.get(key) is None  # Left cold instead of 80
+    assert tracker.stats["seed_conflicts"] == 1
+
+    db.execute.side_effect = [
+        limit_result(Decimal("100"), date(2026, 9, 1), date(2026, 9, 30), "Food"),
+        spent_result(Decimal("60")),
+    ]
+    with patch("api.services.limits.spend_tracker", tracker):
+        await check_limit_thresholds(db, user_id, category_id, Decimal("0"), day, "en")
+    with tracker.writing(user_id):  # A later write moves the now cached counter
+        tracker.apply_delta(user_id, category_id, day, Decimal("5"))
+    assert tracker.get(key).spent == Decimal("65")
+
+
+@pytest.mark.asyncio
+async def test_reconcile_skips_user_writing_while_querying():
+    """A write committed during the reconcile query, delta applied after it, is not counted twice."""
+    tracker = SpendTracker(ttl_seconds=60, max_entries=10)
+    user_id, category_id = uuid4(), uuid4()
+    key = month_key(user_id, category_id, date(2026, 10, 1))
+    tracker.seed(key, Decimal("100"), "Food", Decimal("40"))
+    writer = tracker.writing(user_id)
+
+    async def execute(statement):
+        writer.__enter__()
+        return spent_result(Decimal("55"))  # Includes the write's 15
+
+    db = AsyncMock()
+    db.execute.side_effect = execute
+
+    assert await tracker.reconcile(db) == 0
+    tracker.apply_delta(user_id, category_id, date(2026, 10, 2), Decimal("15"))
+    writer.__exit__(None, None, None)
+    assert tracker.get(key).spent == Decimal("55")
@@ -1,6 +1,8 @@
 """
 Test transaction endpoints.
 """
+import base64
+
 import pytest
 from httpx import AsyncClient
 from decimal import Decimal
@@ -58,6 +60,41 @@ async def test_list_transactions(client: AsyncClient, auth_headers: dict, defaul
     assert len(data["items"]) == 3
 
 
+@pytest.mark.asyncio
+async def test_list_transactions_cursor_pagination(client: AsyncClient, auth_headers: dict, default_categories):
+    """Test keyset pagination walks every transaction exactly once."""
+    for i in range(5):
+        await client.post(
+            "/transactions",
+            headers=auth_headers,
+            json={"type": "expense", "amount": str(1000 * (i + 1)), "currency": "uzs"}
+        )
+    
+    # First page in page mode still returns the total and a cursor
+    response = await client.get("/transactions?page_size=2", headers=auth_headers)
+    data = response.json()
+    assert data["total"] == 5
+    seen = [item["id"] for item in data["items"]]
+    cursor = data["next_cursor"]
+    
+    while cursor:
+        data = (await client.get(f"/transactions?page_size=2&cursor={cursor}", headers=auth_headers)).json()
+        assert data["total"] is None
+        seen.extend(item["id"] for item in data["items"])
+        cursor = data["next_cursor"]
+    
+    assert len(seen) == len(set(seen)) == 5
+    
+    # Malformed cursor
+    response = await client.get("/transactions?cursor=not-a-cursor", headers=auth_headers)
+    assert response.status_code == 400
+    
+    # Well-formed JSON with the wrong element types
+    tampered = base64.urlsafe_b64encode(b'["x",1]').decode().rstrip("=")
+    response = await client.get(f"/transactions?cursor={tampered}", headers=auth_headers)
+    assert response.status_code == 400
+
+
 @pytest.mark.asyncio
 async def test_filter_transactions_by_type(client: AsyncClient, auth_headers: dict, default_categories):
     """Test filtering transactions by type."""
@@ -158,3 +195,112 @@ async def test_delete_transaction(client: AsyncClient, auth_headers: dict, defau
     # Verify deleted
     get_response = await client.get(f"/transactions/{tx_id}", headers=auth_headers)
     assert get_response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_daily_rollup_follows_writes(client: AsyncClient, auth_headers: dict, default_categories, db_session):
+    """Test that create/update/delete keep user_daily_totals in sync with transactions."""
+    from api.services.rollup import find_rollup_drift
+    
+    food_category = next(cat for cat in default_categories if cat.slug == "food")
+    transport_category = next(cat for cat in default_categories if cat.slug == "transport")
+    
+    first = await client.post(
+        "/transactions",
+        headers=auth_headers,
+        json={"type": "expense", "amount": "50000", "currency": "uzs", "category_id": str(food_category.id)}
+    )
+    second = await client.post(
+        "/transactions",
+        headers=auth_headers,
+        json={"type": "income", "amount": "200000", "currency": "uzs"}
+    )
+    assert await find_rollup_drift(db_session) == []
+    
+    # Move the expense to another category with a new amount
+    await client.patch(
+        f"/transactions/{first.json()['id']}",
+        headers=auth_headers,
+        json={"amount": "75000", "category_id": str(transport_category.id)}
+    )
+    assert await find_rollup_drift(db_session) == []
+    
+    await client.delete(f"/transactions/{second.json()['id']}", headers=auth_headers)
+    assert await find_rollup_drift(db_session) == []
+    
+    balance = await client.get("/analytics/balance?period=month", headers=auth_headers)
+    assert Decimal(balance.json()["total_expense"]) == Decimal("75000")
+    assert Decimal(balance.json()["total_income"]) == Decimal("0")
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_transactions(client: AsyncClient, auth_headers: dict, default_categories, db_session):
+    """Test bulk creation is all-or-nothing and keeps the rollup in sync."""
+    from uuid import uuid4
+    from api.services.rollup import find_rollup_drift
+    
+    food_category = next(cat for cat in default_categories if cat.slug == "food")
+    items = [
+        {"type": "expense", "amount": str(1000 * (i + 1)), "currency": "uzs", "category_id": str(food_category.id)}
+        for i in range(10)
+    ]
+    
+    # One unknown category rejects the whole batch
+    response = await client.post(
+        "/transactions/bulk",
+        headers=auth_headers,
+        json={"items": items + [{"type": "expense", "amount": "1", "category_id": str(uuid4())}]}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"][0]["index"] == 10
+    
+    response = await client.post("/transactions/bulk", headers=auth_headers, json={"items": items})
+    assert response.status_code == 201
+    assert response.json()["created"] == 10
+    
+    listing = (await client.get("/transactions", headers=auth_headers)).json()
+    assert listing["total"] == 10
+    assert await find_rollup_drift(db_session) == []
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_transactions_csv(client: AsyncClient, auth_headers: dict, default_categories):
+    """Test CSV import resolves category slugs and reports bad rows."""
+    content = (
+        "type,amount,currency,description,category,transaction_date\n"
+        "expense,25000,uzs,Lunch,food,2026-01-15T12:00:00+00:00\n"
+        "income,900000,uzs,Salary,salary,\n"
+    )
+    response = await client.post(
+        "/transactions/bulk/csv",
+        headers=auth_headers,
+        files={"file": ("history.csv", content.encode(), "text/csv")}
+    )
+    assert response.status_code == 201
+    assert response.json()["created"] == 2
+    
+    response = await client.post(
+        "/transactions/bulk/csv",
+        headers=auth_headers,
+        files={"file": ("bad.csv", b"type,amount,category\nexpense,-5,food\nexpense,10,nope\n", "text/csv")}
+    )
+    assert response.status_code == 400
+    assert [error["row"] for error in response.json()["detail"]] == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_prefers_own_category_over_default(db_session, test_user, default_categories):
+    """A user category sharing a slug with a default is the one imports resolve to."""
+    from api.models.category import Category
+    from api.services.bulk_import import fetch_user_categories
+
+    own = Category(name="Еда", slug="food", type="expense", user_id=test_user.id, is_default=False)
+    db_session.add(own)
+    await db_session.commit()
+    await db_session.refresh(own)
+
+    lookup = await fetch_user_categories(db_session, test_user.id)
+
+    assert lookup["food"] == own.id
+    assert lookup["transport"] == default_categories[1].id
+    assert lookup[str(default_categories[0].id)] == default_categories[0].id
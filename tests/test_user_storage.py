@@ -0,0 +1,87 @@
+import json
+import time
+
+import pytest
+
+from bot.user_storage import JSONFileBackend, SQLiteBackend, UserStorage
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, tmp_path):
+    store = UserStorage(str(tmp_path), backend=request.param)
+    yield store
+    store.close()
+
+
+def test_token_language_and_logout(storage):
+    storage.set_user_language(1, "ru")
+    assert not storage.is_user_authorized(1)
+
+    storage.save_user_token(1, "tok", "ali")
+    assert storage.get_user_token(1) == "tok"
+    assert storage.get_user_language(1) == "ru"  # Kept across logins
+
+    storage.save_pending_transaction(1, {"amount": 50000})
+    storage.logout_user(1)
+    assert not storage.is_user_authorized(1)
+    assert storage.get_pending_transaction(1) is None
+    assert storage.get_user_language(1) == "ru"
+    assert storage.get_user_language(2) == "uz"
+    assert set(storage.get_all_users()) == {"1"}
+
+
+def test_sqlite_imports_existing_json(tmp_path):
+    users = {"7": {"token": "a", "username": "x", "language": "en"}, "8": {"language": "ru"}}
+    (tmp_path / "users.json").write_text(json.dumps(users))
+    (tmp_path / "pending.json").write_text(json.dumps({"7": {"amount": 1}}))
+
+    storage = UserStorage(str(tmp_path), backend="sqlite")
+    assert storage.get_user_token(7) == "a"
+    assert storage.get_user_language(8) == "ru"
+    assert not storage.is_user_authorized(8)
+    assert storage.get_pending_transaction(7) == {"amount": 1}
+    storage.set_user_language(7, "uz")
+    storage.close()
+
+    # Later starts keep the database, the JSON is not imported again
+    reopened = UserStorage(str(tmp_path), backend="sqlite")
+    assert reopened.get_user_language(7) == "uz"
+    reopened.close()
+
+
+def test_sqlite_rejects_unknown_fields(tmp_path):
+    backend = SQLiteBackend(tmp_path / "users.db")
+    with pytest.raises(ValueError):
+        backend.update_user("1", token="t", password="x")
+    backend.close()
+
+
+def test_write_behind_coalesces_and_flushes_on_close(tmp_path):
+    backend = JSONFileBackend(tmp_path, flush_interval=60, fsync=False)
+    for i in range(100):
+        backend.update_user(str(i), token=f"t{i}", language="ru")
+    backend.set_pending("1", {"amount": 5})
+
+    assert not (tmp_path / "users.json").exists()  # Nothing written yet
+    assert backend.metrics()["dirty_entries"] == 101
+
+    backend.close()
+    users = json.loads((tmp_path / "users.json").read_text())
+    assert len(users) == 100 and users["7"] == {"token": "t7", "language": "ru"}
+    assert json.loads((tmp_path / "pending.json").read_text()) == {"1": {"amount": 5}}
+    assert not list(tmp_path.glob("*.tmp"))
+    metrics = backend.metrics()
+    assert (metrics["writes"], metrics["flushes"], metrics["dirty_entries"]) == (101, 1, 0)
+
+
+def test_write_behind_flushes_after_interval(tmp_path):
+    backend = JSONFileBackend(tmp_path, flush_interval=0.05, fsync=True)
+    backend.update_user("1", language="en")
+    backend.update_user("1", token="t")
+
+    deadline = time.monotonic() + 2
+    while backend.metrics()["flushes"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert json.loads((tmp_path / "users.json").read_text()) == {"1": {"language": "en", "token": "t"}}
+    backend.close()